@@ -57,12 +57,12 @@ void atomget(atom *atom, char element[3], double *x, double *y, double *z) {
  * pointer is not allocated, the function prints an error message to standard error and exits the program.
  *
  * @param bond Pointer to the bond structure to be modified.
- * @param a1 Pointer to an unsigned short value representing the index of the first atom in the bond.
- * @param a2 Pointer to an unsigned short value representing the index of the second atom in the bond.
+ * @param a1 Pointer to an unsigned int value representing the index of the first atom in the bond.
+ * @param a2 Pointer to an unsigned int value representing the index of the second atom in the bond.
  * @param atoms Pointer to an atom array containing the atom structures involved in the bond.
  * @param epairs Pointer to an unsigned char value representing the number of electron pairs in the bond.
  */
-void bondset(bond *bond, unsigned short *a1, unsigned short *a2, atom **atoms, unsigned char *epairs) {
+void bondset(bond *bond, unsigned int *a1, unsigned int *a2, atom **atoms, unsigned char *epairs) {
     if(bond == NULL) {
         fprintf(stderr, "bondset(): bond is not malloc'd.");
         exit(EXIT_FAILURE);
@@ -83,12 +83,12 @@ void bondset(bond *bond, unsigned short *a1, unsigned short *a2, atom **atoms, u
  * prints an error message to standard error and exits the program.
  *
  * @param bond Pointer to the bond structure from which properties are to be retrieved.
- * @param a1 Pointer to an unsigned short value where the index of the first atom in the bond will be stored.
- * @param a2 Pointer to an unsigned short value where the index of the second atom in the bond will be stored.
+ * @param a1 Pointer to an unsigned int value where the index of the first atom in the bond will be stored.
+ * @param a2 Pointer to an unsigned int value where the index of the second atom in the bond will be stored.
  * @param atoms Pointer to an atom array pointer where the address of the atom structures involved in the bond will be stored.
  * @param epairs Pointer to an unsigned char value where the number of electron pairs in the bond will be stored.
  */
-void bondget(bond *bond, unsigned short *a1, unsigned short *a2, atom **atoms, unsigned char *epairs) {
+void bondget(bond *bond, unsigned int *a1, unsigned int *a2, atom **atoms, unsigned char *epairs) {
     if(bond == NULL) {
         fprintf(stderr, "bondget(): bond is not malloc'd.");
         exit(EXIT_FAILURE);
@@ -139,7 +139,7 @@ void compute_coords(bond *bond) {
  * @param bond_max The maximum number of bonds allowed in the molecule.
  * @return Pointer to the allocated and initialized molecule structure.
  */
-molecule *molmalloc(unsigned short atom_max, unsigned short bond_max) {
+molecule *molmalloc(unsigned int atom_max, unsigned int bond_max) {
     molecule *mol = malloc(sizeof(molecule));
 
     mol->atom_max = atom_max;
@@ -180,10 +180,10 @@ molecule *molcopy(molecule *src) {
 
     molecule *dst = molmalloc(src->atom_max, src->bond_max);
 
-    for(int i = 0; i < src->atom_no; i++) {
+    for(unsigned int i = 0; i < src->atom_no; i++) {
         molappend_atom(dst, &src->atoms[i]);
     }
-    for(int i = 0; i < src->bond_no; i++) {
+    for(unsigned int i = 0; i < src->bond_no; i++) {
         molappend_bond(dst, &src->bonds[i]);
     }
 
@@ -215,14 +215,68 @@ void molfree(molecule *ptr) {
     free(ptr);
 }
 
+/**
+ * @brief Grows the capacity of a molecule structure to hold at least the given number of atoms and bonds.
+ * 
+ * This function reallocates the atoms and bonds arrays and their corresponding pointer arrays, each
+ * at most once, so that later appends up to the given capacity do not reallocate. Because the arrays
+ * may move, every pointer into them is updated, which resets the pointer arrays to insertion order.
+ * A capacity smaller than the current one is left unchanged. If the molecule pointer is not allocated
+ * or the reallocation fails, the function prints an error message to standard error and exits the program.
+ *
+ * @param molecule Pointer to the molecule structure whose capacity should be grown.
+ * @param atom_max The number of atoms the molecule should be able to hold.
+ * @param bond_max The number of bonds the molecule should be able to hold.
+ */
+void molreserve(molecule *molecule, unsigned int atom_max, unsigned int bond_max) {
+    if(molecule == NULL) {
+        fprintf(stderr, "molreserve(): molecule is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+
+    if(atom_max > molecule->atom_max) {
+        molecule->atom_max = atom_max;
+        molecule->atoms = realloc(molecule->atoms, sizeof(struct atom)*molecule->atom_max);
+        molecule->atom_ptrs = realloc(molecule->atom_ptrs, sizeof(struct atom*)*molecule->atom_max);
+
+        if(molecule->atoms == NULL || molecule->atom_ptrs == NULL) {
+            fprintf(stderr, "molreserve(): realloc failure.");
+            exit(EXIT_FAILURE);
+        }
+
+        for(unsigned int i = 0; i < molecule->atom_no; i++) {
+            molecule->atom_ptrs[i] = &molecule->atoms[i];
+        }
+        for(unsigned int i = 0; i < molecule->bond_no; i++) {
+            molecule->bonds[i].atoms = molecule->atoms;
+        }
+    }
+
+    if(bond_max > molecule->bond_max) {
+        molecule->bond_max = bond_max;
+        molecule->bonds = realloc(molecule->bonds, sizeof(struct bond)*molecule->bond_max);
+        molecule->bond_ptrs = realloc(molecule->bond_ptrs, sizeof(struct bond*)*molecule->bond_max);
+
+        if(molecule->bonds == NULL || molecule->bond_ptrs == NULL) {
+            fprintf(stderr, "molreserve(): realloc failure.");
+            exit(EXIT_FAILURE);
+        }
+
+        for(unsigned int i = 0; i < molecule->bond_no; i++) {
+            molecule->bond_ptrs[i] = &molecule->bonds[i];
+        }
+    }
+}
+
 /**
  * @brief Appends an atom to a molecule structure.
  * 
  * This function appends an atom to the specified molecule structure. If the molecule or atom
  * pointer is not allocated, the function prints an error message to standard error and exits the program.
- * If the maximum allowed number of atoms in the molecule is reached, the function reallocates
- * memory for the atoms array and the corresponding pointer array, doubling their size. If the reallocation
- * fails, the function prints an error message to standard error and exits the program.
+ * If the maximum allowed number of atoms in the molecule is reached, the function doubles the
+ * capacity of the atoms array and the corresponding pointer array with molreserve(), which also
+ * re-points the bonds at the moved array. If the reallocation fails, the function prints an error
+ * message to standard error and exits the program.
  *
  * @param molecule Pointer to the molecule structure to which the atom should be appended.
  * @param atom Pointer to the atom structure to be appended to the molecule.
@@ -237,24 +291,21 @@ void molappend_atom(molecule *molecule, atom *atom) {
         exit(EXIT_FAILURE);
     }
 
+    if(molecule->atom_no == UINT_MAX) {
+        fprintf(stderr, "molappend_atom(): too many atoms.");
+        exit(EXIT_FAILURE);
+    }
+
     if(molecule->atom_max == molecule->atom_no) {
+        /* Grow through molreserve() so that the atoms pointers of existing bonds follow the array */
         if(molecule->atom_max == 0) {
-            molecule->atom_max = 1; 
+            molreserve(molecule, 1, molecule->bond_max);
         }
-        else {
-            molecule->atom_max *= 2;
+        else if(molecule->atom_max > UINT_MAX / 2) {
+            molreserve(molecule, UINT_MAX, molecule->bond_max);
         }
-        
-        molecule->atoms = realloc(molecule->atoms, sizeof(struct atom)*molecule->atom_max);
-        molecule->atom_ptrs = realloc(molecule->atom_ptrs, sizeof(struct atom*)*molecule->atom_max);
-
-        if(molecule->atoms == NULL || molecule->atom_ptrs == NULL) {
-            fprintf(stderr, "molappend_atom(): realloc failure.");
-            exit(EXIT_FAILURE);
-        }
-
-        for(int i = 0; i < molecule->atom_no; i++) {
-            molecule->atom_ptrs[i] = &molecule->atoms[i];
+        else {
+            molreserve(molecule, molecule->atom_max * 2, molecule->bond_max);
         }
     }
 
@@ -285,10 +336,18 @@ void molappend_bond(molecule *molecule, bond *bond) {
         exit(EXIT_FAILURE);
     }
 
+    if(molecule->bond_no == UINT_MAX) {
+        fprintf(stderr, "molappend_bond(): too many bonds.");
+        exit(EXIT_FAILURE);
+    }
+
     if(molecule->bond_max == molecule->bond_no) {
         if(molecule->bond_max == 0) {
             molecule->bond_max = 1; 
         }
+        else if(molecule->bond_max > UINT_MAX / 2) {
+            molecule->bond_max = UINT_MAX;
+        }
         else {
             molecule->bond_max *= 2;
         }
@@ -300,7 +359,7 @@ void molappend_bond(molecule *molecule, bond *bond) {
             fprintf(stderr, "molappend_bond(): realloc failure.");
         }
 
-        for(int i = 0; i < molecule->bond_no; i++) {
+        for(unsigned int i = 0; i < molecule->bond_no; i++) {
             molecule->bond_ptrs[i] = &molecule->bonds[i];
         }
     }
@@ -310,6 +369,91 @@ void molappend_bond(molecule *molecule, bond *bond) {
     molecule->bond_no++;
 }
 
+/**
+ * @brief Appends an array of atoms to a molecule structure in one call.
+ * 
+ * This function grows the atoms array and the corresponding pointer array at most once with
+ * molreserve(), doubling the capacity until all count atoms fit, and then copies the atoms in with
+ * a single memcpy. If the molecule or atoms pointer is not allocated or the molecule would exceed
+ * UINT_MAX atoms, the function prints an error message to standard error and exits the program.
+ *
+ * @param molecule Pointer to the molecule structure to which the atoms should be appended.
+ * @param atoms Pointer to the first of count atom structures to be appended to the molecule.
+ * @param count The number of atoms to append.
+ */
+void molappend_atoms(molecule *molecule, atom *atoms, unsigned int count) {
+    if(molecule == NULL) {
+        fprintf(stderr, "molappend_atoms(): molecule is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+    if(atoms == NULL && count > 0) {
+        fprintf(stderr, "molappend_atoms(): atoms is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+
+    if(count > UINT_MAX - molecule->atom_no) {
+        fprintf(stderr, "molappend_atoms(): too many atoms.");
+        exit(EXIT_FAILURE);
+    }
+    if(molecule->atom_no + count > molecule->atom_max) {
+        unsigned int atom_max = molecule->atom_max == 0 ? 1 : molecule->atom_max;
+        while(atom_max < molecule->atom_no + count) {
+            atom_max = atom_max > UINT_MAX / 2 ? UINT_MAX : atom_max * 2;
+        }
+        molreserve(molecule, atom_max, molecule->bond_max);
+    }
+
+    memcpy(molecule->atoms + molecule->atom_no, atoms, sizeof(struct atom)*count);
+    for(unsigned int i = molecule->atom_no; i < molecule->atom_no + count; i++) {
+        molecule->atom_ptrs[i] = &molecule->atoms[i];
+    }
+    molecule->atom_no += count;
+}
+
+/**
+ * @brief Appends an array of bonds to a molecule structure in one call.
+ * 
+ * This function grows the bonds array and the corresponding pointer array at most once with
+ * molreserve(), copies the bonds in with a single memcpy and then points each new bond at the
+ * molecule's atoms and computes its coordinates. Only the a1, a2 and epairs fields of the given
+ * bonds are read. If the molecule or bonds pointer is not allocated or the molecule would exceed
+ * UINT_MAX bonds, the function prints an error message to standard error and exits the program.
+ *
+ * @param molecule Pointer to the molecule structure to which the bonds should be appended.
+ * @param bonds Pointer to the first of count bond structures to be appended to the molecule.
+ * @param count The number of bonds to append.
+ */
+void molappend_bonds(molecule *molecule, bond *bonds, unsigned int count) {
+    if(molecule == NULL) {
+        fprintf(stderr, "molappend_bonds(): molecule is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+    if(bonds == NULL && count > 0) {
+        fprintf(stderr, "molappend_bonds(): bonds is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+
+    if(count > UINT_MAX - molecule->bond_no) {
+        fprintf(stderr, "molappend_bonds(): too many bonds.");
+        exit(EXIT_FAILURE);
+    }
+    if(molecule->bond_no + count > molecule->bond_max) {
+        unsigned int bond_max = molecule->bond_max == 0 ? 1 : molecule->bond_max;
+        while(bond_max < molecule->bond_no + count) {
+            bond_max = bond_max > UINT_MAX / 2 ? UINT_MAX : bond_max * 2;
+        }
+        molreserve(molecule, molecule->atom_max, bond_max);
+    }
+
+    memcpy(molecule->bonds + molecule->bond_no, bonds, sizeof(struct bond)*count);
+    for(unsigned int i = molecule->bond_no; i < molecule->bond_no + count; i++) {
+        molecule->bonds[i].atoms = molecule->atoms;
+        compute_coords(&molecule->bonds[i]);
+        molecule->bond_ptrs[i] = &molecule->bonds[i];
+    }
+    molecule->bond_no += count;
+}
+
 /**
  * @brief Sorts the atoms and bonds of a molecule structure.
  * 
@@ -330,17 +474,49 @@ void molsort(molecule *molecule) {
     qsort(molecule->bond_ptrs, molecule->bond_no, sizeof(bond*), bond_compare);
 }
 
+/**
+ * @brief Computes the back-to-front drawing order of the atoms and bonds of a molecule.
+ * 
+ * This function sorts the molecule with molsort() and then merges the sorted atom and bond pointer
+ * arrays in a single linear pass. Each entry written to order is either the index of an atom in the
+ * atoms array, or atom_no plus the index of a bond in the bonds array. A bond is drawn before an atom
+ * with an equal z-coordinate. If the molecule pointer is not allocated, the function prints an error
+ * message to standard error and exits the program.
+ *
+ * @param molecule Pointer to the molecule structure to order.
+ * @param order Array of at least atom_no + bond_no entries that receives the drawing order.
+ */
+void molorder(molecule *molecule, unsigned int *order) {
+    unsigned int a = 0, b = 0, i = 0;
+
+    if(molecule == NULL) {
+        fprintf(stderr, "molorder(): molecule is not malloc'd.");
+        exit(EXIT_FAILURE);
+    }
+
+    molsort(molecule);
+
+    while(a < molecule->atom_no || b < molecule->bond_no) {
+        if(b < molecule->bond_no && (a == molecule->atom_no || molecule->bond_ptrs[b]->z <= molecule->atom_ptrs[a]->z)) {
+            order[i++] = molecule->atom_no + (unsigned int)(molecule->bond_ptrs[b++] - molecule->bonds);
+        } else {
+            order[i++] = (unsigned int)(molecule->atom_ptrs[a++] - molecule->atoms);
+        }
+    }
+}
+
 /**
  * @brief Compares two atoms based on their z-coordinates.
  * 
  * This function is used as a comparison function for sorting atoms in a molecule structure. It takes
  * two void pointers (which are expected to be pointers to atom pointers), dereferences them, and
  * compares the z-coordinates of the two atoms. The function returns -1 if the first atom has a
- * lower z-coordinate, 1 if the first atom has a higher z-coordinate, and 0 if their z-coordinates are equal.
+ * lower z-coordinate and 1 if the first atom has a higher z-coordinate. Atoms with equal z-coordinates
+ * are ordered by their position in the atoms array, so that the sort is deterministic.
  *
  * @param a Void pointer to the first atom pointer.
  * @param b Void pointer to the second atom pointer.
- * @return -1 if the first atom's z-coordinate is lower, 1 if higher, and 0 if equal to the second atom's z-coordinate.
+ * @return -1 if the first atom sorts before the second, 1 if after, and 0 if they are the same atom.
  */
 int atom_compare(const void *a, const void *b) {
     atom *a_ptr, *b_ptr;
@@ -350,6 +526,8 @@ int atom_compare(const void *a, const void *b) {
 
     if(a_ptr->z < b_ptr->z) return -1;
     if(a_ptr->z > b_ptr->z) return 1;
+    if(a_ptr < b_ptr) return -1;
+    if(a_ptr > b_ptr) return 1;
 
     return 0;
 }
@@ -360,11 +538,12 @@ int atom_compare(const void *a, const void *b) {
  * This function is used as a comparison function for sorting bonds in a molecule structure. It takes
  * two void pointers (which are expected to be pointers to bond pointers), dereferences them, and
  * compares the z-coordinates of the two bonds. The function returns -1 if the first bond has a
- * lower z-coordinate, 1 if the first bond has a higher z-coordinate, and 0 if their z-coordinates are equal.
+ * lower z-coordinate and 1 if the first bond has a higher z-coordinate. Bonds with equal z-coordinates
+ * are ordered by their position in the bonds array, so that the sort is deterministic.
  *
  * @param a Void pointer to the first bond pointer.
  * @param b Void pointer to the second bond pointer.
- * @return -1 if the first bond's z-coordinate is lower, 1 if higher, and 0 if equal to the second bond's z-coordinate.
+ * @return -1 if the first bond sorts before the second, 1 if after, and 0 if they are the same bond.
  */
 int bond_compare(const void *a, const void *b) {
     bond *a_ptr, *b_ptr;
@@ -374,6 +553,8 @@ int bond_compare(const void *a, const void *b) {
 
     if(a_ptr->z < b_ptr->z) return -1;
     if(a_ptr->z > b_ptr->z) return 1;
+    if(a_ptr < b_ptr) return -1;
+    if(a_ptr > b_ptr) return 1;
 
     return 0;
 }
@@ -469,7 +650,7 @@ void mol_xform(molecule *molecule, xform_matrix matrix) {
         exit(EXIT_FAILURE);
     }
 
-    for(int a = 0; a < molecule->atom_no; a++) {
+    for(unsigned int a = 0; a < molecule->atom_no; a++) {
         double vector[3][1] = {{molecule->atoms[a].x}, {molecule->atoms[a].y}, {molecule->atoms[a].z}};
         double xformed[3][1] = {{0},{0},{0}};
         for (int i = 0; i < 3; i++) {
@@ -482,7 +663,7 @@ void mol_xform(molecule *molecule, xform_matrix matrix) {
         molecule->atoms[a].z = xformed[2][0];
     }
 
-    for(int b = 0; b < molecule->bond_no; b++) {
+    for(unsigned int b = 0; b < molecule->bond_no; b++) {
         compute_coords(&molecule->bonds[b]);
     }
 }
@@ -10,6 +10,7 @@
 #include <stdlib.h>
 #include <string.h>
 #include <math.h>
+#include <limits.h>
 
 /* STRUCTURES */
 typedef struct atom {
@@ -18,16 +19,16 @@ typedef struct atom {
 } atom;
 
 typedef struct bond {  
-    unsigned short a1, a2; 
+    unsigned int a1, a2; 
     unsigned char epairs; 
     atom *atoms; 
     double x1, x2, y1, y2, z, len, dx, dy; 
 } bond;
 
 typedef struct molecule {
-    unsigned short atom_max, atom_no;
+    unsigned int atom_max, atom_no;
     atom *atoms, **atom_ptrs;
-    unsigned short bond_max, bond_no;
+    unsigned int bond_max, bond_no;
     bond *bonds, **bond_ptrs;
 } molecule;
 
@@ -36,15 +37,19 @@ typedef double xform_matrix[3][3];
 /* FUNCTION PROTOTYPES */
 void atomset(atom *atom, char element[3], double *x, double *y, double *z);
 void atomget(atom *atom, char element[3], double *x, double *y, double *z);
-void bondset(bond *bond, unsigned short *a1, unsigned short *a2, atom **atoms, unsigned char *epairs);
-void bondget(bond *bond, unsigned short *a1, unsigned short *a2, atom **atoms, unsigned char *epairs);
+void bondset(bond *bond, unsigned int *a1, unsigned int *a2, atom **atoms, unsigned char *epairs);
+void bondget(bond *bond, unsigned int *a1, unsigned int *a2, atom **atoms, unsigned char *epairs);
 void compute_coords(bond *bond);
-molecule *molmalloc(unsigned short atom_max, unsigned short bond_max);
+molecule *molmalloc(unsigned int atom_max, unsigned int bond_max);
 molecule *molcopy(molecule *src);
 void molfree(molecule *ptr);
+void molreserve(molecule *molecule, unsigned int atom_max, unsigned int bond_max);
 void molappend_atom(molecule *molecule, atom *atom);
 void molappend_bond(molecule *molecule, bond *bond);
+void molappend_atoms(molecule *molecule, atom *atoms, unsigned int count);
+void molappend_bonds(molecule *molecule, bond *bonds, unsigned int count);
 void molsort(molecule *molecule);
+void molorder(molecule *molecule, unsigned int *order);
 int atom_compare(const void *a, const void *b);
 int bond_compare(const void *a, const void *b);
 void xrotation(xform_matrix xform_matrix, unsigned short deg);
@@ -1,10 +1,49 @@
 %module molecule
 %{
     #include "molecule.h"
+    #include "sdfparse.h"
+    #include "spatial.h"
 %}
 
+%include <pybuffer.i>
+
+// Buffers of packed atom and bond structs, as produced by mol_display.ATOM_DTYPE and BOND_DTYPE
+%pybuffer_binary(const char *data, size_t size);
+
 %include "molecule.h"
 
+%constant size_t ATOM_SIZE = sizeof(atom);
+%constant size_t BOND_SIZE = sizeof(bond);
+%constant unsigned int SDF_PERCEIVE_BONDS = SDF_PERCEIVE_BONDS;
+
+// Grids are built and queried through the spatial_grid methods below, which return indices as bytes
+%ignore gridbuild;
+%ignore gridfree;
+%ignore gridradius;
+%ignore gridbox;
+%ignore perceive_bonds;
+%ignore spatial_grid::starts;
+%ignore spatial_grid::indices;
+%ignore spatial_grid::xyz;
+%immutable spatial_grid::cell;
+%immutable spatial_grid::min_x;
+%immutable spatial_grid::min_y;
+%immutable spatial_grid::min_z;
+%immutable spatial_grid::nx;
+%immutable spatial_grid::ny;
+%immutable spatial_grid::nz;
+%immutable spatial_grid::atom_no;
+
+%include "spatial.h"
+
+%exception spatial_grid::spatial_grid {
+    $action
+    if(result == NULL) {
+        PyErr_NoMemory();
+        SWIG_fail;
+    }
+}
+
 %extend atom {
     // Constructor for atom with given element and coordinates
     atom(char element[3], double x, double y, double z) {
@@ -28,10 +67,10 @@
 };
 
 %extend molecule {
-    // Constructor for molecule with no initial atoms and bonds
-    molecule() {
+    // Constructor for molecule with no initial atoms and bonds, optionally with room for atom_max atoms and bond_max bonds
+    molecule(unsigned int atom_max = 0, unsigned int bond_max = 0) {
         molecule *mol;
-        mol = molmalloc(0, 0);
+        mol = molmalloc(atom_max, bond_max);
         return mol;
     }
 
@@ -40,6 +79,11 @@
         molfree($self);
     }
 
+    // Grows the molecule so that it holds atom_max atoms and bond_max bonds without reallocating
+    void reserve(unsigned int atom_max, unsigned int bond_max) {
+        molreserve($self, atom_max, bond_max);
+    }
+
     // Appends an atom with given element and coordinates to the molecule
     void append_atom(char element[3], double x, double y, double z) {
         atom a1;
@@ -52,7 +96,7 @@
     }
 
     // Appends a bond with given atom indices and electron pair count to the molecule
-    void append_bond(unsigned short a1, unsigned short a2, unsigned char epairs) {
+    void append_bond(unsigned int a1, unsigned int a2, unsigned char epairs) {
         bond b1;
         b1.a1 = a1;
         b1.a2 = a2;
@@ -64,17 +108,187 @@
     }
 
     // Returns a pointer to the atom at the specified index
-    atom *get_atom(unsigned short i) {
+    atom *get_atom(unsigned int i) {
         return $self->atom_ptrs[i];
     }
 
      // Returns a pointer to the bond at the specified index
-    bond *get_bond(unsigned short i) {
+    bond *get_bond(unsigned int i) {
         return $self->bond_ptrs[i];
     }
 
+    // Returns a pointer to the atom at the specified index in insertion order, which bond indices refer to
+    atom *get_stored_atom(unsigned int i) {
+        return &$self->atoms[i];
+    }
+
+    // Returns a writable memoryview over the atoms in insertion order, valid until the next append
+    PyObject *atom_buffer() {
+        static char empty;
+        char *mem = $self->atoms != NULL ? (char *)$self->atoms : &empty;
+        return PyMemoryView_FromMemory(mem, sizeof(atom)*$self->atom_no, PyBUF_WRITE);
+    }
+
+    // Returns a writable memoryview over the bonds in insertion order, valid until the next append
+    PyObject *bond_buffer() {
+        static char empty;
+        char *mem = $self->bonds != NULL ? (char *)$self->bonds : &empty;
+        return PyMemoryView_FromMemory(mem, sizeof(bond)*$self->bond_no, PyBUF_WRITE);
+    }
+
+    // Appends a buffer of packed atom structs to the molecule in one call
+    PyObject *append_atom_buffer(const char *data, size_t size) {
+        size_t count = size / sizeof(atom);
+        if(size % sizeof(atom) != 0) {
+            PyErr_SetString(PyExc_ValueError, "append_atom_buffer(): buffer is not a whole number of atoms");
+            return NULL;
+        }
+        if(count > UINT_MAX - $self->atom_no) {
+            PyErr_SetString(PyExc_ValueError, "append_atom_buffer(): too many atoms");
+            return NULL;
+        }
+        molappend_atoms($self, (atom *)data, (unsigned int)count);
+        Py_RETURN_NONE;
+    }
+
+    // Appends a buffer of packed bond structs to the molecule in one call, reading only a1, a2 and epairs
+    PyObject *append_bond_buffer(const char *data, size_t size) {
+        const bond *bonds = (const bond *)data;
+        size_t count = size / sizeof(bond);
+        if(size % sizeof(bond) != 0) {
+            PyErr_SetString(PyExc_ValueError, "append_bond_buffer(): buffer is not a whole number of bonds");
+            return NULL;
+        }
+        if(count > UINT_MAX - $self->bond_no) {
+            PyErr_SetString(PyExc_ValueError, "append_bond_buffer(): too many bonds");
+            return NULL;
+        }
+        for(size_t i = 0; i < count; i++) {
+            if(bonds[i].a1 >= $self->atom_no || bonds[i].a2 >= $self->atom_no) {
+                PyErr_SetString(PyExc_IndexError, "append_bond_buffer(): bond references a missing atom");
+                return NULL;
+            }
+        }
+        molappend_bonds($self, (bond *)bonds, (unsigned int)count);
+        Py_RETURN_NONE;
+    }
+
+    // Rotates the molecule xrot degrees about the x axis, then yrot about y, then zrot about z
+    void rotate(unsigned short xrot, unsigned short yrot, unsigned short zrot) {
+        xform_matrix matrix;
+        if(xrot % 360 != 0) {
+            xrotation(matrix, xrot % 360);
+            mol_xform($self, matrix);
+        }
+        if(yrot % 360 != 0) {
+            yrotation(matrix, yrot % 360);
+            mol_xform($self, matrix);
+        }
+        if(zrot % 360 != 0) {
+            zrotation(matrix, zrot % 360);
+            mol_xform($self, matrix);
+        }
+    }
+
+    // Applies a 3x3 transformation matrix, given as a buffer of nine row-major doubles, to the molecule
+    PyObject *xform_buffer(const char *data, size_t size) {
+        xform_matrix matrix;
+        if(size != sizeof(xform_matrix)) {
+            PyErr_SetString(PyExc_ValueError, "xform_buffer(): matrix must be nine doubles");
+            return NULL;
+        }
+        memcpy(matrix, data, sizeof(xform_matrix));
+        mol_xform($self, matrix);
+        Py_RETURN_NONE;
+    }
+
     // Sorts the atoms and bonds of the molecule
     void sort() {
         molsort($self);
     }
+
+    // Parses the SD record at offset in a buffer into the molecule, see sdfparse(); returns (name bytes or None, next offset)
+    PyObject *parse_buffer(const char *data, size_t size, size_t offset, const char *name_field, unsigned int flags = 0) {
+        char name[1024], error[256];
+        int status;
+        if(offset > size) {
+            PyErr_SetString(PyExc_ValueError, "parse_buffer(): offset is past the end of the buffer");
+            return NULL;
+        }
+        status = sdfparse(data, size, &offset, $self, name_field, name, sizeof(name), error, sizeof(error), flags);
+        if(status == SDF_ERROR) {
+            PyErr_SetString(PyExc_ValueError, error);
+            return NULL;
+        }
+        if(status == SDF_END) {
+            return Py_BuildValue("(On)", Py_None, (Py_ssize_t)offset);
+        }
+        return Py_BuildValue("(yn)", name, (Py_ssize_t)offset);
+    }
+
+    // Sorts the molecule and returns its drawing order as bytes of unsigned ints, see molorder()
+    PyObject *z_order_buffer() {
+        PyObject *order;
+        if((size_t)$self->atom_no + $self->bond_no > UINT_MAX) {
+            PyErr_SetString(PyExc_OverflowError, "z_order_buffer(): too many atoms and bonds");
+            return NULL;
+        }
+        order = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*($self->atom_no + $self->bond_no));
+        if(order != NULL) {
+            molorder($self, (unsigned int *)PyBytes_AS_STRING(order));
+        }
+        return order;
+    }
 };
+
+%extend spatial_grid {
+    // Indexes the atoms of a molecule, in insertion order, with a uniform grid of cubic cells, see gridbuild()
+    spatial_grid(molecule *mol, double cell) {
+        return gridbuild(mol->atoms, mol->atom_no, cell);
+    }
+
+    // Destructor for spatial_grid
+    ~spatial_grid() {
+        gridfree($self);
+    }
+
+    // Returns the indices of the atoms within radius of a point as bytes of unsigned ints, see gridradius()
+    PyObject *radius_buffer(double x, double y, double z, double radius) {
+        size_t count = gridradius($self, x, y, z, radius, NULL, 0);
+        PyObject *found = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*count);
+        if(found != NULL) {
+            gridradius($self, x, y, z, radius, (unsigned int *)PyBytes_AS_STRING(found), count);
+        }
+        return found;
+    }
+
+    // Returns the indices of the atoms inside a box as bytes of unsigned ints, see gridbox()
+    PyObject *box_buffer(double x1, double y1, double z1, double x2, double y2, double z2) {
+        double low[3] = {x1, y1, z1}, high[3] = {x2, y2, z2};
+        size_t count = gridbox($self, low, high, NULL, 0);
+        PyObject *found = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*count);
+        if(found != NULL) {
+            gridbox($self, low, high, (unsigned int *)PyBytes_AS_STRING(found), count);
+        }
+        return found;
+    }
+};
+
+%inline %{
+    // Returns the offsets of the records of an SD file held in a buffer, see sdfindex()
+    PyObject *sdf_offsets(const char *data, size_t size) {
+        size_t count = sdfindex(data, size, NULL, 0);
+        size_t *offsets = malloc(sizeof(size_t)*(count > 0 ? count : 1));
+        PyObject *list;
+        if(offsets == NULL) {
+            return PyErr_NoMemory();
+        }
+        sdfindex(data, size, offsets, count);
+        list = PyList_New((Py_ssize_t)count);
+        for(size_t i = 0; list != NULL && i < count; i++) {
+            PyList_SET_ITEM(list, (Py_ssize_t)i, PyLong_FromSize_t(offsets[i]));
+        }
+        free(offsets);
+        return list;
+    }
+%}
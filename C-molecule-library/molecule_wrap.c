@@ -2987,10 +2987,11 @@ SWIG_Python_NonDynamicSetAttr(PyObject *obj, PyObject *name, PyObject *value) {
 #define SWIGTYPE_p_molecule swig_types[6]
 #define SWIGTYPE_p_p_atom swig_types[7]
 #define SWIGTYPE_p_p_bond swig_types[8]
-#define SWIGTYPE_p_unsigned_char swig_types[9]
-#define SWIGTYPE_p_unsigned_short swig_types[10]
-static swig_type_info *swig_types[12];
-static swig_module_info swig_module = {swig_types, 11, 0, 0, 0, 0};
+#define SWIGTYPE_p_spatial_grid swig_types[9]
+#define SWIGTYPE_p_unsigned_char swig_types[10]
+#define SWIGTYPE_p_unsigned_int swig_types[11]
+static swig_type_info *swig_types[13];
+static swig_module_info swig_module = {swig_types, 12, 0, 0, 0, 0};
 #define SWIG_TypeQuery(name) SWIG_TypeQueryModule(&swig_module, &swig_module, name)
 #define SWIG_MangledTypeQuery(name) SWIG_MangledTypeQueryModule(&swig_module, &swig_module, name)
 
@@ -3018,6 +3019,8 @@ static swig_module_info swig_module = {swig_types, 11, 0, 0, 0, 0};
 
 
     #include "molecule.h"
+    #include "sdfparse.h"
+    #include "spatial.h"
 
 
   #define SWIG_From_double   PyFloat_FromDouble 
@@ -3362,36 +3365,25 @@ SWIG_AsVal_unsigned_SS_long (PyObject *obj, unsigned long *val)
 
 
 SWIGINTERN int
-SWIG_AsVal_unsigned_SS_short (PyObject * obj, unsigned short *val)
+SWIG_AsVal_unsigned_SS_int (PyObject * obj, unsigned int *val)
 {
   unsigned long v;
   int res = SWIG_AsVal_unsigned_SS_long (obj, &v);
   if (SWIG_IsOK(res)) {
-    if ((v > USHRT_MAX)) {
+    if ((v > UINT_MAX)) {
       return SWIG_OverflowError;
     } else {
-      if (val) *val = (unsigned short)(v);
+      if (val) *val = (unsigned int)(v);
     }
   }  
   return res;
 }
 
 
-  #define SWIG_From_long   PyInt_FromLong 
-
-
-SWIGINTERNINLINE PyObject* 
-SWIG_From_unsigned_SS_long  (unsigned long value)
+SWIGINTERNINLINE PyObject*
+  SWIG_From_unsigned_SS_int  (unsigned int value)
 {
-  return (value > LONG_MAX) ?
-    PyLong_FromUnsignedLong(value) : PyInt_FromLong((long)(value));
-}
-
-
-SWIGINTERNINLINE PyObject *
-SWIG_From_unsigned_SS_short  (unsigned short value)
-{    
-  return SWIG_From_unsigned_SS_long  (value);
+  return PyInt_FromSize_t((size_t) value);
 }
 
 
@@ -3411,6 +3403,17 @@ SWIG_AsVal_unsigned_SS_char (PyObject * obj, unsigned char *val)
 }
 
 
+  #define SWIG_From_long   PyInt_FromLong 
+
+
+SWIGINTERNINLINE PyObject* 
+SWIG_From_unsigned_SS_long  (unsigned long value)
+{
+  return (value > LONG_MAX) ?
+    PyLong_FromUnsignedLong(value) : PyInt_FromLong((long)(value));
+}
+
+
 SWIGINTERNINLINE PyObject *
 SWIG_From_unsigned_SS_char  (unsigned char value)
 {    
@@ -3420,14 +3423,17 @@ SWIG_From_unsigned_SS_char  (unsigned char value)
 SWIGINTERN struct bond *new_bond(bond *bond){
         return bond;
     }
-SWIGINTERN struct molecule *new_molecule(void){
+SWIGINTERN struct molecule *new_molecule(unsigned int atom_max,unsigned int bond_max){
         molecule *mol;
-        mol = molmalloc(0, 0);
+        mol = molmalloc(atom_max, bond_max);
         return mol;
     }
 SWIGINTERN void delete_molecule(struct molecule *self){
         molfree(self);
     }
+SWIGINTERN void molecule_reserve(struct molecule *self,unsigned int atom_max,unsigned int bond_max){
+        molreserve(self, atom_max, bond_max);
+    }
 SWIGINTERN void molecule_append_atom(struct molecule *self,char element[3],double x,double y,double z){
         atom a1;
         strcpy(a1.element, element);
@@ -3437,7 +3443,7 @@ SWIGINTERN void molecule_append_atom(struct molecule *self,char element[3],doubl
 
         molappend_atom(self, &a1);
     }
-SWIGINTERN void molecule_append_bond(struct molecule *self,unsigned short a1,unsigned short a2,unsigned char epairs){
+SWIGINTERN void molecule_append_bond(struct molecule *self,unsigned int a1,unsigned int a2,unsigned char epairs){
         bond b1;
         b1.a1 = a1;
         b1.a2 = a2;
@@ -3447,15 +3453,268 @@ SWIGINTERN void molecule_append_bond(struct molecule *self,unsigned short a1,uns
 
         molappend_bond(self, &b1);
     }
-SWIGINTERN atom *molecule_get_atom(struct molecule *self,unsigned short i){
+SWIGINTERN atom *molecule_get_atom(struct molecule *self,unsigned int i){
         return self->atom_ptrs[i];
     }
-SWIGINTERN bond *molecule_get_bond(struct molecule *self,unsigned short i){
+SWIGINTERN bond *molecule_get_bond(struct molecule *self,unsigned int i){
         return self->bond_ptrs[i];
     }
+SWIGINTERN atom *molecule_get_stored_atom(struct molecule *self,unsigned int i){
+        return &self->atoms[i];
+    }
+SWIGINTERN PyObject *molecule_atom_buffer(struct molecule *self){
+        static char empty;
+        char *mem = self->atoms != NULL ? (char *)self->atoms : &empty;
+        return PyMemoryView_FromMemory(mem, sizeof(atom)*self->atom_no, PyBUF_WRITE);
+    }
+SWIGINTERN PyObject *molecule_bond_buffer(struct molecule *self){
+        static char empty;
+        char *mem = self->bonds != NULL ? (char *)self->bonds : &empty;
+        return PyMemoryView_FromMemory(mem, sizeof(bond)*self->bond_no, PyBUF_WRITE);
+    }
+
+
+
+
+#if defined(LLONG_MAX) && !defined(SWIG_LONG_LONG_AVAILABLE)
+#  define SWIG_LONG_LONG_AVAILABLE
+#endif
+
+
+#ifdef SWIG_LONG_LONG_AVAILABLE
+SWIGINTERN int
+SWIG_AsVal_unsigned_SS_long_SS_long (PyObject *obj, unsigned long long *val)
+{
+  int res = SWIG_TypeError;
+  if (PyLong_Check(obj)) {
+    unsigned long long v = PyLong_AsUnsignedLongLong(obj);
+    if (!PyErr_Occurred()) {
+      if (val) *val = v;
+      return SWIG_OK;
+    } else {
+      PyErr_Clear();
+      res = SWIG_OverflowError;
+    }
+  } else {
+    unsigned long v;
+    res = SWIG_AsVal_unsigned_SS_long (obj,&v);
+    if (SWIG_IsOK(res)) {
+      if (val) *val = v;
+      return res;
+    }
+  }
+#ifdef SWIG_PYTHON_CAST_MODE
+  {
+    const double mant_max = 1LL << DBL_MANT_DIG;
+    double d;
+    res = SWIG_AsVal_double (obj,&d);
+    if (SWIG_IsOK(res) && !SWIG_CanCastAsInteger(&d, 0, mant_max))
+      return SWIG_OverflowError;
+    if (SWIG_IsOK(res) && SWIG_CanCastAsInteger(&d, 0, mant_max)) {
+      if (val) *val = (unsigned long long)(d);
+      return SWIG_AddCast(res);
+    }
+    res = SWIG_TypeError;
+  }
+#endif
+  return res;
+}
+#endif
+
+
+SWIGINTERNINLINE int
+SWIG_AsVal_size_t (PyObject * obj, size_t *val)
+{
+  int res = SWIG_TypeError;
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  if (sizeof(size_t) <= sizeof(unsigned long)) {
+#endif
+    unsigned long v;
+    res = SWIG_AsVal_unsigned_SS_long (obj, val ? &v : 0);
+    if (SWIG_IsOK(res) && val) *val = (size_t)(v);
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  } else if (sizeof(size_t) <= sizeof(unsigned long long)) {
+    unsigned long long v;
+    res = SWIG_AsVal_unsigned_SS_long_SS_long (obj, val ? &v : 0);
+    if (SWIG_IsOK(res) && val) *val = (size_t)(v);
+  }
+#endif
+  return res;
+}
+
+SWIGINTERN PyObject *molecule_append_atom_buffer(struct molecule *self,char const *data,size_t size){
+        size_t count = size / sizeof(atom);
+        if(size % sizeof(atom) != 0) {
+            PyErr_SetString(PyExc_ValueError, "append_atom_buffer(): buffer is not a whole number of atoms");
+            return NULL;
+        }
+        if(count > UINT_MAX - self->atom_no) {
+            PyErr_SetString(PyExc_ValueError, "append_atom_buffer(): too many atoms");
+            return NULL;
+        }
+        molappend_atoms(self, (atom *)data, (unsigned int)count);
+        Py_RETURN_NONE;
+    }
+SWIGINTERN PyObject *molecule_append_bond_buffer(struct molecule *self,char const *data,size_t size){
+        const bond *bonds = (const bond *)data;
+        size_t count = size / sizeof(bond);
+        if(size % sizeof(bond) != 0) {
+            PyErr_SetString(PyExc_ValueError, "append_bond_buffer(): buffer is not a whole number of bonds");
+            return NULL;
+        }
+        if(count > UINT_MAX - self->bond_no) {
+            PyErr_SetString(PyExc_ValueError, "append_bond_buffer(): too many bonds");
+            return NULL;
+        }
+        for(size_t i = 0; i < count; i++) {
+            if(bonds[i].a1 >= self->atom_no || bonds[i].a2 >= self->atom_no) {
+                PyErr_SetString(PyExc_IndexError, "append_bond_buffer(): bond references a missing atom");
+                return NULL;
+            }
+        }
+        molappend_bonds(self, (bond *)bonds, (unsigned int)count);
+        Py_RETURN_NONE;
+    }
+
+SWIGINTERN int
+SWIG_AsVal_unsigned_SS_short (PyObject * obj, unsigned short *val)
+{
+  unsigned long v;
+  int res = SWIG_AsVal_unsigned_SS_long (obj, &v);
+  if (SWIG_IsOK(res)) {
+    if ((v > USHRT_MAX)) {
+      return SWIG_OverflowError;
+    } else {
+      if (val) *val = (unsigned short)(v);
+    }
+  }  
+  return res;
+}
+
+SWIGINTERN void molecule_rotate(struct molecule *self,unsigned short xrot,unsigned short yrot,unsigned short zrot){
+        xform_matrix matrix;
+        if(xrot % 360 != 0) {
+            xrotation(matrix, xrot % 360);
+            mol_xform(self, matrix);
+        }
+        if(yrot % 360 != 0) {
+            yrotation(matrix, yrot % 360);
+            mol_xform(self, matrix);
+        }
+        if(zrot % 360 != 0) {
+            zrotation(matrix, zrot % 360);
+            mol_xform(self, matrix);
+        }
+    }
+SWIGINTERN PyObject *molecule_xform_buffer(struct molecule *self,char const *data,size_t size){
+        xform_matrix matrix;
+        if(size != sizeof(xform_matrix)) {
+            PyErr_SetString(PyExc_ValueError, "xform_buffer(): matrix must be nine doubles");
+            return NULL;
+        }
+        memcpy(matrix, data, sizeof(xform_matrix));
+        mol_xform(self, matrix);
+        Py_RETURN_NONE;
+    }
 SWIGINTERN void molecule_sort(struct molecule *self){
         molsort(self);
     }
+SWIGINTERN PyObject *molecule_parse_buffer(struct molecule *self,char const *data,size_t size,size_t offset,char const *name_field,unsigned int flags){
+        char name[1024], error[256];
+        int status;
+        if(offset > size) {
+            PyErr_SetString(PyExc_ValueError, "parse_buffer(): offset is past the end of the buffer");
+            return NULL;
+        }
+        status = sdfparse(data, size, &offset, self, name_field, name, sizeof(name), error, sizeof(error), flags);
+        if(status == SDF_ERROR) {
+            PyErr_SetString(PyExc_ValueError, error);
+            return NULL;
+        }
+        if(status == SDF_END) {
+            return Py_BuildValue("(On)", Py_None, (Py_ssize_t)offset);
+        }
+        return Py_BuildValue("(yn)", name, (Py_ssize_t)offset);
+    }
+SWIGINTERN PyObject *molecule_z_order_buffer(struct molecule *self){
+        PyObject *order;
+        if((size_t)self->atom_no + self->bond_no > UINT_MAX) {
+            PyErr_SetString(PyExc_OverflowError, "z_order_buffer(): too many atoms and bonds");
+            return NULL;
+        }
+        order = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*(self->atom_no + self->bond_no));
+        if(order != NULL) {
+            molorder(self, (unsigned int *)PyBytes_AS_STRING(order));
+        }
+        return order;
+    }
+
+#ifdef SWIG_LONG_LONG_AVAILABLE
+SWIGINTERNINLINE PyObject* 
+SWIG_From_unsigned_SS_long_SS_long  (unsigned long long value)
+{
+  return (value > LONG_MAX) ?
+    PyLong_FromUnsignedLongLong(value) : PyInt_FromLong((long)(value));
+}
+#endif
+
+
+SWIGINTERNINLINE PyObject *
+SWIG_From_size_t  (size_t value)
+{    
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  if (sizeof(size_t) <= sizeof(unsigned long)) {
+#endif
+    return SWIG_From_unsigned_SS_long  ((unsigned long)(value));
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  } else {
+    /* assume sizeof(size_t) <= sizeof(unsigned long long) */
+    return SWIG_From_unsigned_SS_long_SS_long  ((unsigned long long)(value));
+  }
+#endif
+}
+
+SWIGINTERN struct spatial_grid *new_spatial_grid(molecule *mol,double cell){
+        return gridbuild(mol->atoms, mol->atom_no, cell);
+    }
+SWIGINTERN void delete_spatial_grid(struct spatial_grid *self){
+        gridfree(self);
+    }
+SWIGINTERN PyObject *spatial_grid_radius_buffer(struct spatial_grid *self,double x,double y,double z,double radius){
+        size_t count = gridradius(self, x, y, z, radius, NULL, 0);
+        PyObject *found = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*count);
+        if(found != NULL) {
+            gridradius(self, x, y, z, radius, (unsigned int *)PyBytes_AS_STRING(found), count);
+        }
+        return found;
+    }
+SWIGINTERN PyObject *spatial_grid_box_buffer(struct spatial_grid *self,double x1,double y1,double z1,double x2,double y2,double z2){
+        double low[3] = {x1, y1, z1}, high[3] = {x2, y2, z2};
+        size_t count = gridbox(self, low, high, NULL, 0);
+        PyObject *found = PyBytes_FromStringAndSize(NULL, sizeof(unsigned int)*count);
+        if(found != NULL) {
+            gridbox(self, low, high, (unsigned int *)PyBytes_AS_STRING(found), count);
+        }
+        return found;
+    }
+
+    // Returns the offsets of the records of an SD file held in a buffer, see sdfindex()
+    PyObject *sdf_offsets(const char *data, size_t size) {
+        size_t count = sdfindex(data, size, NULL, 0);
+        size_t *offsets = malloc(sizeof(size_t)*(count > 0 ? count : 1));
+        PyObject *list;
+        if(offsets == NULL) {
+            return PyErr_NoMemory();
+        }
+        sdfindex(data, size, offsets, count);
+        list = PyList_New((Py_ssize_t)count);
+        for(size_t i = 0; list != NULL && i < count; i++) {
+            PyList_SET_ITEM(list, (Py_ssize_t)i, PyLong_FromSize_t(offsets[i]));
+        }
+        free(offsets);
+        return list;
+    }
+
 #ifdef __cplusplus
 extern "C" {
 #endif
@@ -3756,10 +4015,10 @@ SWIGINTERN PyObject *atom_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *arg
 SWIGINTERN PyObject *_wrap_bond_a1_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct bond *arg1 = (struct bond *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -3769,11 +4028,11 @@ SWIGINTERN PyObject *_wrap_bond_a1_set(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bond_a1_set" "', argument " "1"" of type '" "struct bond *""'"); 
   }
   arg1 = (struct bond *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "bond_a1_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "bond_a1_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->a1 = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -3788,7 +4047,7 @@ SWIGINTERN PyObject *_wrap_bond_a1_get(PyObject *self, PyObject *args) {
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -3797,8 +4056,8 @@ SWIGINTERN PyObject *_wrap_bond_a1_get(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bond_a1_get" "', argument " "1"" of type '" "struct bond *""'"); 
   }
   arg1 = (struct bond *)(argp1);
-  result = (unsigned short) ((arg1)->a1);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->a1);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -3808,10 +4067,10 @@ fail:
 SWIGINTERN PyObject *_wrap_bond_a2_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct bond *arg1 = (struct bond *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -3821,11 +4080,11 @@ SWIGINTERN PyObject *_wrap_bond_a2_set(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bond_a2_set" "', argument " "1"" of type '" "struct bond *""'"); 
   }
   arg1 = (struct bond *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "bond_a2_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "bond_a2_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->a2 = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -3840,7 +4099,7 @@ SWIGINTERN PyObject *_wrap_bond_a2_get(PyObject *self, PyObject *args) {
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -3849,8 +4108,8 @@ SWIGINTERN PyObject *_wrap_bond_a2_get(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bond_a2_get" "', argument " "1"" of type '" "struct bond *""'"); 
   }
   arg1 = (struct bond *)(argp1);
-  result = (unsigned short) ((arg1)->a2);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->a2);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -4436,10 +4695,10 @@ SWIGINTERN PyObject *bond_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *arg
 SWIGINTERN PyObject *_wrap_molecule_atom_max_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -4449,11 +4708,11 @@ SWIGINTERN PyObject *_wrap_molecule_atom_max_set(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_atom_max_set" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_atom_max_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_atom_max_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->atom_max = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -4468,7 +4727,7 @@ SWIGINTERN PyObject *_wrap_molecule_atom_max_get(PyObject *self, PyObject *args)
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -4477,8 +4736,8 @@ SWIGINTERN PyObject *_wrap_molecule_atom_max_get(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_atom_max_get" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  result = (unsigned short) ((arg1)->atom_max);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->atom_max);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -4488,10 +4747,10 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_atom_no_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -4501,11 +4760,11 @@ SWIGINTERN PyObject *_wrap_molecule_atom_no_set(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_atom_no_set" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_atom_no_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_atom_no_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->atom_no = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -4520,7 +4779,7 @@ SWIGINTERN PyObject *_wrap_molecule_atom_no_get(PyObject *self, PyObject *args)
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -4529,8 +4788,8 @@ SWIGINTERN PyObject *_wrap_molecule_atom_no_get(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_atom_no_get" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  result = (unsigned short) ((arg1)->atom_no);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->atom_no);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -4644,10 +4903,10 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_bond_max_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -4657,11 +4916,11 @@ SWIGINTERN PyObject *_wrap_molecule_bond_max_set(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_bond_max_set" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_bond_max_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_bond_max_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->bond_max = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -4676,7 +4935,7 @@ SWIGINTERN PyObject *_wrap_molecule_bond_max_get(PyObject *self, PyObject *args)
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -4685,8 +4944,8 @@ SWIGINTERN PyObject *_wrap_molecule_bond_max_get(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_bond_max_get" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  result = (unsigned short) ((arg1)->bond_max);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->bond_max);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -4696,10 +4955,10 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_bond_no_set(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   
@@ -4709,11 +4968,11 @@ SWIGINTERN PyObject *_wrap_molecule_bond_no_set(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_bond_no_set" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_bond_no_set" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_bond_no_set" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   if (arg1) (arg1)->bond_no = arg2;
   resultobj = SWIG_Py_Void();
   return resultobj;
@@ -4728,7 +4987,7 @@ SWIGINTERN PyObject *_wrap_molecule_bond_no_get(PyObject *self, PyObject *args)
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[1] ;
-  unsigned short result;
+  unsigned int result;
   
   if (!args) SWIG_fail;
   swig_obj[0] = args;
@@ -4737,8 +4996,8 @@ SWIGINTERN PyObject *_wrap_molecule_bond_no_get(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_bond_no_get" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  result = (unsigned short) ((arg1)->bond_no);
-  resultobj = SWIG_From_unsigned_SS_short((unsigned short)(result));
+  result = (unsigned int) ((arg1)->bond_no);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
   return resultobj;
 fail:
   return NULL;
@@ -4851,10 +5110,31 @@ fail:
 
 SWIGINTERN PyObject *_wrap_new_molecule(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
+  unsigned int arg1 = (unsigned int) 0 ;
+  unsigned int arg2 = (unsigned int) 0 ;
+  unsigned int val1 ;
+  int ecode1 = 0 ;
+  unsigned int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
   struct molecule *result = 0 ;
   
-  if (!SWIG_Python_UnpackTuple(args, "new_molecule", 0, 0, 0)) SWIG_fail;
-  result = (struct molecule *)new_molecule();
+  if (!SWIG_Python_UnpackTuple(args, "new_molecule", 0, 2, swig_obj)) SWIG_fail;
+  if (swig_obj[0]) {
+    ecode1 = SWIG_AsVal_unsigned_SS_int(swig_obj[0], &val1);
+    if (!SWIG_IsOK(ecode1)) {
+      SWIG_exception_fail(SWIG_ArgError(ecode1), "in method '" "new_molecule" "', argument " "1"" of type '" "unsigned int""'");
+    } 
+    arg1 = (unsigned int)(val1);
+  }
+  if (swig_obj[1]) {
+    ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
+    if (!SWIG_IsOK(ecode2)) {
+      SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "new_molecule" "', argument " "2"" of type '" "unsigned int""'");
+    } 
+    arg2 = (unsigned int)(val2);
+  }
+  result = (struct molecule *)new_molecule(arg1,arg2);
   resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_molecule, SWIG_POINTER_NEW |  0 );
   return resultobj;
 fail:
@@ -4884,6 +5164,43 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_molecule_reserve(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  unsigned int arg2 ;
+  unsigned int arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  unsigned int val2 ;
+  int ecode2 = 0 ;
+  unsigned int val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_reserve", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_reserve" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_reserve" "', argument " "2"" of type '" "unsigned int""'");
+  } 
+  arg2 = (unsigned int)(val2);
+  ecode3 = SWIG_AsVal_unsigned_SS_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molecule_reserve" "', argument " "3"" of type '" "unsigned int""'");
+  } 
+  arg3 = (unsigned int)(val3);
+  molecule_reserve(arg1,arg2,arg3);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGINTERN PyObject *_wrap_molecule_append_atom(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
@@ -4940,14 +5257,14 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_append_bond(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
-  unsigned short arg3 ;
+  unsigned int arg2 ;
+  unsigned int arg3 ;
   unsigned char arg4 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
-  unsigned short val3 ;
+  unsigned int val3 ;
   int ecode3 = 0 ;
   unsigned char val4 ;
   int ecode4 = 0 ;
@@ -4959,16 +5276,16 @@ SWIGINTERN PyObject *_wrap_molecule_append_bond(PyObject *self, PyObject *args)
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_append_bond" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_append_bond" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_append_bond" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
-  ecode3 = SWIG_AsVal_unsigned_SS_short(swig_obj[2], &val3);
+  arg2 = (unsigned int)(val2);
+  ecode3 = SWIG_AsVal_unsigned_SS_int(swig_obj[2], &val3);
   if (!SWIG_IsOK(ecode3)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molecule_append_bond" "', argument " "3"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molecule_append_bond" "', argument " "3"" of type '" "unsigned int""'");
   } 
-  arg3 = (unsigned short)(val3);
+  arg3 = (unsigned int)(val3);
   ecode4 = SWIG_AsVal_unsigned_SS_char(swig_obj[3], &val4);
   if (!SWIG_IsOK(ecode4)) {
     SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "molecule_append_bond" "', argument " "4"" of type '" "unsigned char""'");
@@ -4985,10 +5302,10 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_get_atom(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   atom *result = 0 ;
@@ -4999,11 +5316,11 @@ SWIGINTERN PyObject *_wrap_molecule_get_atom(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_get_atom" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_get_atom" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_get_atom" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   result = (atom *)molecule_get_atom(arg1,arg2);
   resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_atom, 0 |  0 );
   return resultobj;
@@ -5015,10 +5332,10 @@ fail:
 SWIGINTERN PyObject *_wrap_molecule_get_bond(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
-  unsigned short arg2 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   bond *result = 0 ;
@@ -5029,11 +5346,11 @@ SWIGINTERN PyObject *_wrap_molecule_get_bond(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_get_bond" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_get_bond" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_get_bond" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   result = (bond *)molecule_get_bond(arg1,arg2);
   resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_bond, 0 |  0 );
   return resultobj;
@@ -5042,64 +5359,389 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_molecule_sort(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_molecule_get_stored_atom(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   struct molecule *arg1 = (struct molecule *) 0 ;
+  unsigned int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[1] ;
+  unsigned int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  atom *result = 0 ;
   
-  if (!args) SWIG_fail;
-  swig_obj[0] = args;
+  if (!SWIG_Python_UnpackTuple(args, "molecule_get_stored_atom", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_sort" "', argument " "1"" of type '" "struct molecule *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_get_stored_atom" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
   arg1 = (struct molecule *)(argp1);
-  molecule_sort(arg1);
-  resultobj = SWIG_Py_Void();
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_get_stored_atom" "', argument " "2"" of type '" "unsigned int""'");
+  } 
+  arg2 = (unsigned int)(val2);
+  result = (atom *)molecule_get_stored_atom(arg1,arg2);
+  resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_atom, 0 |  0 );
   return resultobj;
 fail:
   return NULL;
 }
 
 
-SWIGINTERN PyObject *molecule_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
-  PyObject *obj;
-  if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
-  SWIG_TypeNewClientData(SWIGTYPE_p_molecule, SWIG_NewClientData(obj));
-  return SWIG_Py_Void();
-}
-
-SWIGINTERN PyObject *molecule_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
-  return SWIG_Python_InitShadowInstance(args);
-}
-
-SWIGINTERN PyObject *_wrap_atomset(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_molecule_atom_buffer(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
-  atom *arg1 = (atom *) 0 ;
-  char *arg2 ;
-  double *arg3 = (double *) 0 ;
-  double *arg4 = (double *) 0 ;
-  double *arg5 = (double *) 0 ;
+  struct molecule *arg1 = (struct molecule *) 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  char temp2[3] ;
-  int res2 ;
-  void *argp3 = 0 ;
-  int res3 = 0 ;
-  void *argp4 = 0 ;
-  int res4 = 0 ;
-  void *argp5 = 0 ;
-  int res5 = 0 ;
-  PyObject *swig_obj[5] ;
+  PyObject *swig_obj[1] ;
+  PyObject *result = 0 ;
   
-  if (!SWIG_Python_UnpackTuple(args, "atomset", 5, 5, swig_obj)) SWIG_fail;
-  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_atom, 0 |  0 );
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "atomset" "', argument " "1"" of type '" "atom *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_atom_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
   }
-  arg1 = (atom *)(argp1);
+  arg1 = (struct molecule *)(argp1);
+  result = (PyObject *)molecule_atom_buffer(arg1);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_bond_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  PyObject *result = 0 ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_bond_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  result = (PyObject *)molecule_bond_buffer(arg1);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_append_atom_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  char *arg2 = (char *) 0 ;
+  size_t arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_append_atom_buffer", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_append_atom_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  {
+    int res; Py_ssize_t size = 0; const void *buf = 0;
+    Py_buffer view;
+    res = PyObject_GetBuffer(swig_obj[1], &view, PyBUF_CONTIG_RO);
+    if (res < 0) {
+      PyErr_Clear();
+      SWIG_exception_fail(SWIG_ArgError(res), "in method '" "molecule_append_atom_buffer" "', argument " "2"" of type '" "(const char *data, size_t size)""'");
+    }
+    size = view.len;
+    buf = view.buf;
+    PyBuffer_Release(&view);
+    arg2 = (char *) buf;
+    arg3 = (size_t) (size / sizeof(char const));
+  }
+  result = (PyObject *)molecule_append_atom_buffer(arg1,(char const *)arg2,arg3);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_append_bond_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  char *arg2 = (char *) 0 ;
+  size_t arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_append_bond_buffer", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_append_bond_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  {
+    int res; Py_ssize_t size = 0; const void *buf = 0;
+    Py_buffer view;
+    res = PyObject_GetBuffer(swig_obj[1], &view, PyBUF_CONTIG_RO);
+    if (res < 0) {
+      PyErr_Clear();
+      SWIG_exception_fail(SWIG_ArgError(res), "in method '" "molecule_append_bond_buffer" "', argument " "2"" of type '" "(const char *data, size_t size)""'");
+    }
+    size = view.len;
+    buf = view.buf;
+    PyBuffer_Release(&view);
+    arg2 = (char *) buf;
+    arg3 = (size_t) (size / sizeof(char const));
+  }
+  result = (PyObject *)molecule_append_bond_buffer(arg1,(char const *)arg2,arg3);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_rotate(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  unsigned short arg2 ;
+  unsigned short arg3 ;
+  unsigned short arg4 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  unsigned short val2 ;
+  int ecode2 = 0 ;
+  unsigned short val3 ;
+  int ecode3 = 0 ;
+  unsigned short val4 ;
+  int ecode4 = 0 ;
+  PyObject *swig_obj[4] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_rotate", 4, 4, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_rotate" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molecule_rotate" "', argument " "2"" of type '" "unsigned short""'");
+  } 
+  arg2 = (unsigned short)(val2);
+  ecode3 = SWIG_AsVal_unsigned_SS_short(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molecule_rotate" "', argument " "3"" of type '" "unsigned short""'");
+  } 
+  arg3 = (unsigned short)(val3);
+  ecode4 = SWIG_AsVal_unsigned_SS_short(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "molecule_rotate" "', argument " "4"" of type '" "unsigned short""'");
+  } 
+  arg4 = (unsigned short)(val4);
+  molecule_rotate(arg1,arg2,arg3,arg4);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_xform_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  char *arg2 = (char *) 0 ;
+  size_t arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_xform_buffer", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_xform_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  {
+    int res; Py_ssize_t size = 0; const void *buf = 0;
+    Py_buffer view;
+    res = PyObject_GetBuffer(swig_obj[1], &view, PyBUF_CONTIG_RO);
+    if (res < 0) {
+      PyErr_Clear();
+      SWIG_exception_fail(SWIG_ArgError(res), "in method '" "molecule_xform_buffer" "', argument " "2"" of type '" "(const char *data, size_t size)""'");
+    }
+    size = view.len;
+    buf = view.buf;
+    PyBuffer_Release(&view);
+    arg2 = (char *) buf;
+    arg3 = (size_t) (size / sizeof(char const));
+  }
+  result = (PyObject *)molecule_xform_buffer(arg1,(char const *)arg2,arg3);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_sort(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_sort" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  molecule_sort(arg1);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_parse_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  char *arg2 = (char *) 0 ;
+  size_t arg3 ;
+  size_t arg4 ;
+  char *arg5 = (char *) 0 ;
+  unsigned int arg6 = (unsigned int) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  size_t val4 ;
+  int ecode4 = 0 ;
+  int res5 ;
+  char *buf5 = 0 ;
+  int alloc5 = 0 ;
+  unsigned int val6 ;
+  int ecode6 = 0 ;
+  PyObject *swig_obj[5] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molecule_parse_buffer", 4, 5, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_parse_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  {
+    int res; Py_ssize_t size = 0; const void *buf = 0;
+    Py_buffer view;
+    res = PyObject_GetBuffer(swig_obj[1], &view, PyBUF_CONTIG_RO);
+    if (res < 0) {
+      PyErr_Clear();
+      SWIG_exception_fail(SWIG_ArgError(res), "in method '" "molecule_parse_buffer" "', argument " "2"" of type '" "(const char *data, size_t size)""'");
+    }
+    size = view.len;
+    buf = view.buf;
+    PyBuffer_Release(&view);
+    arg2 = (char *) buf;
+    arg3 = (size_t) (size / sizeof(char const));
+  }
+  ecode4 = SWIG_AsVal_size_t(swig_obj[2], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "molecule_parse_buffer" "', argument " "4"" of type '" "size_t""'");
+  } 
+  arg4 = (size_t)(val4);
+  res5 = SWIG_AsCharPtrAndSize(swig_obj[3], &buf5, NULL, &alloc5);
+  if (!SWIG_IsOK(res5)) {
+    SWIG_exception_fail(SWIG_ArgError(res5), "in method '" "molecule_parse_buffer" "', argument " "5"" of type '" "char const *""'");
+  }
+  arg5 = (char *)(buf5);
+  if (swig_obj[4]) {
+    ecode6 = SWIG_AsVal_unsigned_SS_int(swig_obj[4], &val6);
+    if (!SWIG_IsOK(ecode6)) {
+      SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "molecule_parse_buffer" "', argument " "6"" of type '" "unsigned int""'");
+    } 
+    arg6 = (unsigned int)(val6);
+  }
+  result = (PyObject *)molecule_parse_buffer(arg1,(char const *)arg2,arg3,arg4,(char const *)arg5,arg6);
+  resultobj = result;
+  if (alloc5 == SWIG_NEWOBJ) free((char*)buf5);
+  return resultobj;
+fail:
+  if (alloc5 == SWIG_NEWOBJ) free((char*)buf5);
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molecule_z_order_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct molecule *arg1 = (struct molecule *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  PyObject *result = 0 ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molecule_z_order_buffer" "', argument " "1"" of type '" "struct molecule *""'"); 
+  }
+  arg1 = (struct molecule *)(argp1);
+  result = (PyObject *)molecule_z_order_buffer(arg1);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *molecule_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *obj;
+  if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
+  SWIG_TypeNewClientData(SWIGTYPE_p_molecule, SWIG_NewClientData(obj));
+  return SWIG_Py_Void();
+}
+
+SWIGINTERN PyObject *molecule_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  return SWIG_Python_InitShadowInstance(args);
+}
+
+SWIGINTERN PyObject *_wrap_atomset(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  atom *arg1 = (atom *) 0 ;
+  char *arg2 ;
+  double *arg3 = (double *) 0 ;
+  double *arg4 = (double *) 0 ;
+  double *arg5 = (double *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  char temp2[3] ;
+  int res2 ;
+  void *argp3 = 0 ;
+  int res3 = 0 ;
+  void *argp4 = 0 ;
+  int res4 = 0 ;
+  void *argp5 = 0 ;
+  int res5 = 0 ;
+  PyObject *swig_obj[5] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "atomset", 5, 5, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_atom, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "atomset" "', argument " "1"" of type '" "atom *""'"); 
+  }
+  arg1 = (atom *)(argp1);
   res2 = SWIG_AsCharArray(swig_obj[1], temp2, 3);
   if (!SWIG_IsOK(res2)) {
     SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "atomset" "', argument " "2"" of type '" "char [3]""'");
@@ -5184,8 +5826,8 @@ fail:
 SWIGINTERN PyObject *_wrap_bondset(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   bond *arg1 = (bond *) 0 ;
-  unsigned short *arg2 = (unsigned short *) 0 ;
-  unsigned short *arg3 = (unsigned short *) 0 ;
+  unsigned int *arg2 = (unsigned int *) 0 ;
+  unsigned int *arg3 = (unsigned int *) 0 ;
   atom **arg4 = (atom **) 0 ;
   unsigned char *arg5 = (unsigned char *) 0 ;
   void *argp1 = 0 ;
@@ -5206,16 +5848,16 @@ SWIGINTERN PyObject *_wrap_bondset(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bondset" "', argument " "1"" of type '" "bond *""'"); 
   }
   arg1 = (bond *)(argp1);
-  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_unsigned_short, 0 |  0 );
+  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_unsigned_int, 0 |  0 );
   if (!SWIG_IsOK(res2)) {
-    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "bondset" "', argument " "2"" of type '" "unsigned short *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "bondset" "', argument " "2"" of type '" "unsigned int *""'"); 
   }
-  arg2 = (unsigned short *)(argp2);
-  res3 = SWIG_ConvertPtr(swig_obj[2], &argp3,SWIGTYPE_p_unsigned_short, 0 |  0 );
+  arg2 = (unsigned int *)(argp2);
+  res3 = SWIG_ConvertPtr(swig_obj[2], &argp3,SWIGTYPE_p_unsigned_int, 0 |  0 );
   if (!SWIG_IsOK(res3)) {
-    SWIG_exception_fail(SWIG_ArgError(res3), "in method '" "bondset" "', argument " "3"" of type '" "unsigned short *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res3), "in method '" "bondset" "', argument " "3"" of type '" "unsigned int *""'"); 
   }
-  arg3 = (unsigned short *)(argp3);
+  arg3 = (unsigned int *)(argp3);
   res4 = SWIG_ConvertPtr(swig_obj[3], &argp4,SWIGTYPE_p_p_atom, 0 |  0 );
   if (!SWIG_IsOK(res4)) {
     SWIG_exception_fail(SWIG_ArgError(res4), "in method '" "bondset" "', argument " "4"" of type '" "atom **""'"); 
@@ -5237,8 +5879,8 @@ fail:
 SWIGINTERN PyObject *_wrap_bondget(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   bond *arg1 = (bond *) 0 ;
-  unsigned short *arg2 = (unsigned short *) 0 ;
-  unsigned short *arg3 = (unsigned short *) 0 ;
+  unsigned int *arg2 = (unsigned int *) 0 ;
+  unsigned int *arg3 = (unsigned int *) 0 ;
   atom **arg4 = (atom **) 0 ;
   unsigned char *arg5 = (unsigned char *) 0 ;
   void *argp1 = 0 ;
@@ -5259,16 +5901,16 @@ SWIGINTERN PyObject *_wrap_bondget(PyObject *self, PyObject *args) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "bondget" "', argument " "1"" of type '" "bond *""'"); 
   }
   arg1 = (bond *)(argp1);
-  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_unsigned_short, 0 |  0 );
+  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_unsigned_int, 0 |  0 );
   if (!SWIG_IsOK(res2)) {
-    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "bondget" "', argument " "2"" of type '" "unsigned short *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "bondget" "', argument " "2"" of type '" "unsigned int *""'"); 
   }
-  arg2 = (unsigned short *)(argp2);
-  res3 = SWIG_ConvertPtr(swig_obj[2], &argp3,SWIGTYPE_p_unsigned_short, 0 |  0 );
+  arg2 = (unsigned int *)(argp2);
+  res3 = SWIG_ConvertPtr(swig_obj[2], &argp3,SWIGTYPE_p_unsigned_int, 0 |  0 );
   if (!SWIG_IsOK(res3)) {
-    SWIG_exception_fail(SWIG_ArgError(res3), "in method '" "bondget" "', argument " "3"" of type '" "unsigned short *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res3), "in method '" "bondget" "', argument " "3"" of type '" "unsigned int *""'"); 
   }
-  arg3 = (unsigned short *)(argp3);
+  arg3 = (unsigned int *)(argp3);
   res4 = SWIG_ConvertPtr(swig_obj[3], &argp4,SWIGTYPE_p_p_atom, 0 |  0 );
   if (!SWIG_IsOK(res4)) {
     SWIG_exception_fail(SWIG_ArgError(res4), "in method '" "bondget" "', argument " "4"" of type '" "atom **""'"); 
@@ -5311,26 +5953,26 @@ fail:
 
 SWIGINTERN PyObject *_wrap_molmalloc(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
-  unsigned short arg1 ;
-  unsigned short arg2 ;
-  unsigned short val1 ;
+  unsigned int arg1 ;
+  unsigned int arg2 ;
+  unsigned int val1 ;
   int ecode1 = 0 ;
-  unsigned short val2 ;
+  unsigned int val2 ;
   int ecode2 = 0 ;
   PyObject *swig_obj[2] ;
   molecule *result = 0 ;
   
   if (!SWIG_Python_UnpackTuple(args, "molmalloc", 2, 2, swig_obj)) SWIG_fail;
-  ecode1 = SWIG_AsVal_unsigned_SS_short(swig_obj[0], &val1);
+  ecode1 = SWIG_AsVal_unsigned_SS_int(swig_obj[0], &val1);
   if (!SWIG_IsOK(ecode1)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode1), "in method '" "molmalloc" "', argument " "1"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode1), "in method '" "molmalloc" "', argument " "1"" of type '" "unsigned int""'");
   } 
-  arg1 = (unsigned short)(val1);
-  ecode2 = SWIG_AsVal_unsigned_SS_short(swig_obj[1], &val2);
+  arg1 = (unsigned int)(val1);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
   if (!SWIG_IsOK(ecode2)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molmalloc" "', argument " "2"" of type '" "unsigned short""'");
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molmalloc" "', argument " "2"" of type '" "unsigned int""'");
   } 
-  arg2 = (unsigned short)(val2);
+  arg2 = (unsigned int)(val2);
   result = (molecule *)molmalloc(arg1,arg2);
   resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_molecule, 0 |  0 );
   return resultobj;
@@ -5384,6 +6026,43 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_molreserve(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  molecule *arg1 = (molecule *) 0 ;
+  unsigned int arg2 ;
+  unsigned int arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  unsigned int val2 ;
+  int ecode2 = 0 ;
+  unsigned int val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molreserve", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molreserve" "', argument " "1"" of type '" "molecule *""'"); 
+  }
+  arg1 = (molecule *)(argp1);
+  ecode2 = SWIG_AsVal_unsigned_SS_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "molreserve" "', argument " "2"" of type '" "unsigned int""'");
+  } 
+  arg2 = (unsigned int)(val2);
+  ecode3 = SWIG_AsVal_unsigned_SS_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molreserve" "', argument " "3"" of type '" "unsigned int""'");
+  } 
+  arg3 = (unsigned int)(val3);
+  molreserve(arg1,arg2,arg3);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGINTERN PyObject *_wrap_molappend_atom(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   molecule *arg1 = (molecule *) 0 ;
@@ -5442,22 +6121,125 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_molsort(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_molappend_atoms(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   molecule *arg1 = (molecule *) 0 ;
+  atom *arg2 = (atom *) 0 ;
+  unsigned int arg3 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[1] ;
+  void *argp2 = 0 ;
+  int res2 = 0 ;
+  unsigned int val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
   
-  if (!args) SWIG_fail;
-  swig_obj[0] = args;
+  if (!SWIG_Python_UnpackTuple(args, "molappend_atoms", 3, 3, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molsort" "', argument " "1"" of type '" "molecule *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molappend_atoms" "', argument " "1"" of type '" "molecule *""'"); 
   }
   arg1 = (molecule *)(argp1);
-  molsort(arg1);
-  resultobj = SWIG_Py_Void();
+  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_atom, 0 |  0 );
+  if (!SWIG_IsOK(res2)) {
+    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "molappend_atoms" "', argument " "2"" of type '" "atom *""'"); 
+  }
+  arg2 = (atom *)(argp2);
+  ecode3 = SWIG_AsVal_unsigned_SS_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molappend_atoms" "', argument " "3"" of type '" "unsigned int""'");
+  } 
+  arg3 = (unsigned int)(val3);
+  molappend_atoms(arg1,arg2,arg3);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molappend_bonds(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  molecule *arg1 = (molecule *) 0 ;
+  bond *arg2 = (bond *) 0 ;
+  unsigned int arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  void *argp2 = 0 ;
+  int res2 = 0 ;
+  unsigned int val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molappend_bonds", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molappend_bonds" "', argument " "1"" of type '" "molecule *""'"); 
+  }
+  arg1 = (molecule *)(argp1);
+  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_bond, 0 |  0 );
+  if (!SWIG_IsOK(res2)) {
+    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "molappend_bonds" "', argument " "2"" of type '" "bond *""'"); 
+  }
+  arg2 = (bond *)(argp2);
+  ecode3 = SWIG_AsVal_unsigned_SS_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "molappend_bonds" "', argument " "3"" of type '" "unsigned int""'");
+  } 
+  arg3 = (unsigned int)(val3);
+  molappend_bonds(arg1,arg2,arg3);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molsort(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  molecule *arg1 = (molecule *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molsort" "', argument " "1"" of type '" "molecule *""'"); 
+  }
+  arg1 = (molecule *)(argp1);
+  molsort(arg1);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_molorder(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  molecule *arg1 = (molecule *) 0 ;
+  unsigned int *arg2 = (unsigned int *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  void *argp2 = 0 ;
+  int res2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "molorder", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "molorder" "', argument " "1"" of type '" "molecule *""'"); 
+  }
+  arg1 = (molecule *)(argp1);
+  res2 = SWIG_ConvertPtr(swig_obj[1], &argp2,SWIGTYPE_p_unsigned_int, 0 |  0 );
+  if (!SWIG_IsOK(res2)) {
+    SWIG_exception_fail(SWIG_ArgError(res2), "in method '" "molorder" "', argument " "2"" of type '" "unsigned int *""'"); 
+  }
+  arg2 = (unsigned int *)(argp2);
+  molorder(arg1,arg2);
+  resultobj = SWIG_Py_Void();
   return resultobj;
 fail:
   return NULL;
@@ -5632,6 +6414,437 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_spatial_grid_cell_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  double result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_cell_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (double) ((arg1)->cell);
+  resultobj = SWIG_From_double((double)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_min_x_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  double result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_min_x_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (double) ((arg1)->min_x);
+  resultobj = SWIG_From_double((double)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_min_y_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  double result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_min_y_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (double) ((arg1)->min_y);
+  resultobj = SWIG_From_double((double)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_min_z_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  double result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_min_z_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (double) ((arg1)->min_z);
+  resultobj = SWIG_From_double((double)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_nx_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  unsigned int result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_nx_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (unsigned int) ((arg1)->nx);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_ny_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  unsigned int result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_ny_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (unsigned int) ((arg1)->ny);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_nz_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  unsigned int result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_nz_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (unsigned int) ((arg1)->nz);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_atom_no_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  unsigned int result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_atom_no_get" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  result = (unsigned int) ((arg1)->atom_no);
+  resultobj = SWIG_From_unsigned_SS_int((unsigned int)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_new_spatial_grid(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  molecule *arg1 = (molecule *) 0 ;
+  double arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  double val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  struct spatial_grid *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "new_spatial_grid", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_molecule, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "new_spatial_grid" "', argument " "1"" of type '" "molecule *""'"); 
+  }
+  arg1 = (molecule *)(argp1);
+  ecode2 = SWIG_AsVal_double(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "new_spatial_grid" "', argument " "2"" of type '" "double""'");
+  } 
+  arg2 = (double)(val2);
+  {
+    result = (struct spatial_grid *)new_spatial_grid(arg1,arg2);
+    if(result == NULL) {
+      PyErr_NoMemory();
+      SWIG_fail;
+    }
+  }
+  resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_spatial_grid, SWIG_POINTER_NEW |  0 );
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_delete_spatial_grid(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, SWIG_POINTER_DISOWN |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "delete_spatial_grid" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  delete_spatial_grid(arg1);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_radius_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  double arg2 ;
+  double arg3 ;
+  double arg4 ;
+  double arg5 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  double val2 ;
+  int ecode2 = 0 ;
+  double val3 ;
+  int ecode3 = 0 ;
+  double val4 ;
+  int ecode4 = 0 ;
+  double val5 ;
+  int ecode5 = 0 ;
+  PyObject *swig_obj[5] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "spatial_grid_radius_buffer", 5, 5, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_radius_buffer" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  ecode2 = SWIG_AsVal_double(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "spatial_grid_radius_buffer" "', argument " "2"" of type '" "double""'");
+  } 
+  arg2 = (double)(val2);
+  ecode3 = SWIG_AsVal_double(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "spatial_grid_radius_buffer" "', argument " "3"" of type '" "double""'");
+  } 
+  arg3 = (double)(val3);
+  ecode4 = SWIG_AsVal_double(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "spatial_grid_radius_buffer" "', argument " "4"" of type '" "double""'");
+  } 
+  arg4 = (double)(val4);
+  ecode5 = SWIG_AsVal_double(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "spatial_grid_radius_buffer" "', argument " "5"" of type '" "double""'");
+  } 
+  arg5 = (double)(val5);
+  result = (PyObject *)spatial_grid_radius_buffer(arg1,arg2,arg3,arg4,arg5);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_spatial_grid_box_buffer(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  struct spatial_grid *arg1 = (struct spatial_grid *) 0 ;
+  double arg2 ;
+  double arg3 ;
+  double arg4 ;
+  double arg5 ;
+  double arg6 ;
+  double arg7 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  double val2 ;
+  int ecode2 = 0 ;
+  double val3 ;
+  int ecode3 = 0 ;
+  double val4 ;
+  int ecode4 = 0 ;
+  double val5 ;
+  int ecode5 = 0 ;
+  double val6 ;
+  int ecode6 = 0 ;
+  double val7 ;
+  int ecode7 = 0 ;
+  PyObject *swig_obj[7] ;
+  PyObject *result = 0 ;
+  
+  if (!SWIG_Python_UnpackTuple(args, "spatial_grid_box_buffer", 7, 7, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_spatial_grid, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "spatial_grid_box_buffer" "', argument " "1"" of type '" "struct spatial_grid *""'"); 
+  }
+  arg1 = (struct spatial_grid *)(argp1);
+  ecode2 = SWIG_AsVal_double(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "spatial_grid_box_buffer" "', argument " "2"" of type '" "double""'");
+  } 
+  arg2 = (double)(val2);
+  ecode3 = SWIG_AsVal_double(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "spatial_grid_box_buffer" "', argument " "3"" of type '" "double""'");
+  } 
+  arg3 = (double)(val3);
+  ecode4 = SWIG_AsVal_double(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "spatial_grid_box_buffer" "', argument " "4"" of type '" "double""'");
+  } 
+  arg4 = (double)(val4);
+  ecode5 = SWIG_AsVal_double(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "spatial_grid_box_buffer" "', argument " "5"" of type '" "double""'");
+  } 
+  arg5 = (double)(val5);
+  ecode6 = SWIG_AsVal_double(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "spatial_grid_box_buffer" "', argument " "6"" of type '" "double""'");
+  } 
+  arg6 = (double)(val6);
+  ecode7 = SWIG_AsVal_double(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "spatial_grid_box_buffer" "', argument " "7"" of type '" "double""'");
+  } 
+  arg7 = (double)(val7);
+  result = (PyObject *)spatial_grid_box_buffer(arg1,arg2,arg3,arg4,arg5,arg6,arg7);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *spatial_grid_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *obj;
+  if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
+  SWIG_TypeNewClientData(SWIGTYPE_p_spatial_grid, SWIG_NewClientData(obj));
+  return SWIG_Py_Void();
+}
+
+SWIGINTERN PyObject *spatial_grid_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  return SWIG_Python_InitShadowInstance(args);
+}
+
+SWIGINTERN PyObject *_wrap_covalent_radius(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  char *arg1 ;
+  char temp1[3] ;
+  int res1 ;
+  PyObject *swig_obj[1] ;
+  double result;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_AsCharArray(swig_obj[0], temp1, 3);
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "covalent_radius" "', argument " "1"" of type '" "char const [3]""'");
+  }
+  arg1 = (char *)(temp1);
+  result = (double)covalent_radius((char const (*))arg1);
+  resultobj = SWIG_From_double((double)(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_sdf_offsets(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  char *arg1 = (char *) 0 ;
+  size_t arg2 ;
+  PyObject *swig_obj[1] ;
+  PyObject *result = 0 ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  {
+    int res; Py_ssize_t size = 0; const void *buf = 0;
+    Py_buffer view;
+    res = PyObject_GetBuffer(swig_obj[0], &view, PyBUF_CONTIG_RO);
+    if (res < 0) {
+      PyErr_Clear();
+      SWIG_exception_fail(SWIG_ArgError(res), "in method '" "sdf_offsets" "', argument " "1"" of type '" "(const char *data, size_t size)""'");
+    }
+    size = view.len;
+    buf = view.buf;
+    PyBuffer_Release(&view);
+    arg1 = (char *) buf;
+    arg2 = (size_t) (size / sizeof(char const));
+  }
+  result = (PyObject *)sdf_offsets((char const *)arg1,arg2);
+  resultobj = result;
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 static PyMethodDef SwigMethods[] = {
 	 { "atom_element_set", _wrap_atom_element_set, METH_VARARGS, NULL},
 	 { "atom_element_get", _wrap_atom_element_get, METH_O, NULL},
@@ -5689,13 +6902,23 @@ static PyMethodDef SwigMethods[] = {
 	 { "molecule_bonds_get", _wrap_molecule_bonds_get, METH_O, NULL},
 	 { "molecule_bond_ptrs_set", _wrap_molecule_bond_ptrs_set, METH_VARARGS, NULL},
 	 { "molecule_bond_ptrs_get", _wrap_molecule_bond_ptrs_get, METH_O, NULL},
-	 { "new_molecule", _wrap_new_molecule, METH_NOARGS, NULL},
+	 { "new_molecule", _wrap_new_molecule, METH_VARARGS, NULL},
 	 { "delete_molecule", _wrap_delete_molecule, METH_O, NULL},
+	 { "molecule_reserve", _wrap_molecule_reserve, METH_VARARGS, NULL},
 	 { "molecule_append_atom", _wrap_molecule_append_atom, METH_VARARGS, NULL},
 	 { "molecule_append_bond", _wrap_molecule_append_bond, METH_VARARGS, NULL},
 	 { "molecule_get_atom", _wrap_molecule_get_atom, METH_VARARGS, NULL},
 	 { "molecule_get_bond", _wrap_molecule_get_bond, METH_VARARGS, NULL},
+	 { "molecule_get_stored_atom", _wrap_molecule_get_stored_atom, METH_VARARGS, NULL},
+	 { "molecule_atom_buffer", _wrap_molecule_atom_buffer, METH_O, NULL},
+	 { "molecule_bond_buffer", _wrap_molecule_bond_buffer, METH_O, NULL},
+	 { "molecule_append_atom_buffer", _wrap_molecule_append_atom_buffer, METH_VARARGS, NULL},
+	 { "molecule_append_bond_buffer", _wrap_molecule_append_bond_buffer, METH_VARARGS, NULL},
+	 { "molecule_rotate", _wrap_molecule_rotate, METH_VARARGS, NULL},
+	 { "molecule_xform_buffer", _wrap_molecule_xform_buffer, METH_VARARGS, NULL},
 	 { "molecule_sort", _wrap_molecule_sort, METH_O, NULL},
+	 { "molecule_parse_buffer", _wrap_molecule_parse_buffer, METH_VARARGS, NULL},
+	 { "molecule_z_order_buffer", _wrap_molecule_z_order_buffer, METH_O, NULL},
 	 { "molecule_swigregister", molecule_swigregister, METH_O, NULL},
 	 { "molecule_swiginit", molecule_swiginit, METH_VARARGS, NULL},
 	 { "atomset", _wrap_atomset, METH_VARARGS, NULL},
@@ -5706,15 +6929,35 @@ static PyMethodDef SwigMethods[] = {
 	 { "molmalloc", _wrap_molmalloc, METH_VARARGS, NULL},
 	 { "molcopy", _wrap_molcopy, METH_O, NULL},
 	 { "molfree", _wrap_molfree, METH_O, NULL},
+	 { "molreserve", _wrap_molreserve, METH_VARARGS, NULL},
 	 { "molappend_atom", _wrap_molappend_atom, METH_VARARGS, NULL},
 	 { "molappend_bond", _wrap_molappend_bond, METH_VARARGS, NULL},
+	 { "molappend_atoms", _wrap_molappend_atoms, METH_VARARGS, NULL},
+	 { "molappend_bonds", _wrap_molappend_bonds, METH_VARARGS, NULL},
 	 { "molsort", _wrap_molsort, METH_O, NULL},
+	 { "molorder", _wrap_molorder, METH_VARARGS, NULL},
 	 { "atom_compare", _wrap_atom_compare, METH_VARARGS, NULL},
 	 { "bond_compare", _wrap_bond_compare, METH_VARARGS, NULL},
 	 { "xrotation", _wrap_xrotation, METH_VARARGS, NULL},
 	 { "yrotation", _wrap_yrotation, METH_VARARGS, NULL},
 	 { "zrotation", _wrap_zrotation, METH_VARARGS, NULL},
 	 { "mol_xform", _wrap_mol_xform, METH_VARARGS, NULL},
+	 { "spatial_grid_cell_get", _wrap_spatial_grid_cell_get, METH_O, NULL},
+	 { "spatial_grid_min_x_get", _wrap_spatial_grid_min_x_get, METH_O, NULL},
+	 { "spatial_grid_min_y_get", _wrap_spatial_grid_min_y_get, METH_O, NULL},
+	 { "spatial_grid_min_z_get", _wrap_spatial_grid_min_z_get, METH_O, NULL},
+	 { "spatial_grid_nx_get", _wrap_spatial_grid_nx_get, METH_O, NULL},
+	 { "spatial_grid_ny_get", _wrap_spatial_grid_ny_get, METH_O, NULL},
+	 { "spatial_grid_nz_get", _wrap_spatial_grid_nz_get, METH_O, NULL},
+	 { "spatial_grid_atom_no_get", _wrap_spatial_grid_atom_no_get, METH_O, NULL},
+	 { "new_spatial_grid", _wrap_new_spatial_grid, METH_VARARGS, NULL},
+	 { "delete_spatial_grid", _wrap_delete_spatial_grid, METH_O, NULL},
+	 { "spatial_grid_radius_buffer", _wrap_spatial_grid_radius_buffer, METH_VARARGS, NULL},
+	 { "spatial_grid_box_buffer", _wrap_spatial_grid_box_buffer, METH_VARARGS, NULL},
+	 { "spatial_grid_swigregister", spatial_grid_swigregister, METH_O, NULL},
+	 { "spatial_grid_swiginit", spatial_grid_swiginit, METH_VARARGS, NULL},
+	 { "covalent_radius", _wrap_covalent_radius, METH_O, NULL},
+	 { "sdf_offsets", _wrap_sdf_offsets, METH_O, NULL},
 	 { NULL, NULL, 0, NULL }
 };
 
@@ -5730,8 +6973,9 @@ static swig_type_info _swigt__p_double = {"_p_double", "double *", 0, 0, (void*)
 static swig_type_info _swigt__p_molecule = {"_p_molecule", "molecule *|struct molecule *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_p_atom = {"_p_p_atom", "atom **|struct atom **", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_p_bond = {"_p_p_bond", "bond **|struct bond **", 0, 0, (void*)0, 0};
+static swig_type_info _swigt__p_spatial_grid = {"_p_spatial_grid", "spatial_grid *|struct spatial_grid *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_unsigned_char = {"_p_unsigned_char", "unsigned char *", 0, 0, (void*)0, 0};
-static swig_type_info _swigt__p_unsigned_short = {"_p_unsigned_short", "unsigned short *", 0, 0, (void*)0, 0};
+static swig_type_info _swigt__p_unsigned_int = {"_p_unsigned_int", "unsigned int *", 0, 0, (void*)0, 0};
 
 static swig_type_info *swig_type_initial[] = {
   &_swigt__p_a_3__a_3__double,
@@ -5743,8 +6987,9 @@ static swig_type_info *swig_type_initial[] = {
   &_swigt__p_molecule,
   &_swigt__p_p_atom,
   &_swigt__p_p_bond,
+  &_swigt__p_spatial_grid,
   &_swigt__p_unsigned_char,
-  &_swigt__p_unsigned_short,
+  &_swigt__p_unsigned_int,
 };
 
 static swig_cast_info _swigc__p_a_3__a_3__double[] = {  {&_swigt__p_a_3__a_3__double, 0, 0, 0},{0, 0, 0, 0}};
@@ -5756,8 +7001,9 @@ static swig_cast_info _swigc__p_double[] = {  {&_swigt__p_double, 0, 0, 0},{0, 0
 static swig_cast_info _swigc__p_molecule[] = {  {&_swigt__p_molecule, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_p_atom[] = {  {&_swigt__p_p_atom, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_p_bond[] = {  {&_swigt__p_p_bond, 0, 0, 0},{0, 0, 0, 0}};
+static swig_cast_info _swigc__p_spatial_grid[] = {  {&_swigt__p_spatial_grid, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_unsigned_char[] = {  {&_swigt__p_unsigned_char, 0, 0, 0},{0, 0, 0, 0}};
-static swig_cast_info _swigc__p_unsigned_short[] = {  {&_swigt__p_unsigned_short, 0, 0, 0},{0, 0, 0, 0}};
+static swig_cast_info _swigc__p_unsigned_int[] = {  {&_swigt__p_unsigned_int, 0, 0, 0},{0, 0, 0, 0}};
 
 static swig_cast_info *swig_cast_initial[] = {
   _swigc__p_a_3__a_3__double,
@@ -5769,8 +7015,9 @@ static swig_cast_info *swig_cast_initial[] = {
   _swigc__p_molecule,
   _swigc__p_p_atom,
   _swigc__p_p_bond,
+  _swigc__p_spatial_grid,
   _swigc__p_unsigned_char,
-  _swigc__p_unsigned_short,
+  _swigc__p_unsigned_int,
 };
 
 
@@ -6239,6 +7486,13 @@ SWIG_init(void) {
   
   SWIG_Python_SetConstant(d, "PI",SWIG_From_double((double)(3.14159265358979323846)));
   SWIG_Python_SetConstant(d, "EXIT_FAILURE",SWIG_From_int((int)(1)));
+  SWIG_Python_SetConstant(d, "ATOM_SIZE",SWIG_From_size_t((size_t)(sizeof(atom))));
+  SWIG_Python_SetConstant(d, "BOND_SIZE",SWIG_From_size_t((size_t)(sizeof(bond))));
+  SWIG_Python_SetConstant(d, "SDF_PERCEIVE_BONDS",SWIG_From_unsigned_SS_int((unsigned int)(SDF_PERCEIVE_BONDS)));
+  SWIG_Python_SetConstant(d, "BOND_TOLERANCE",SWIG_From_double((double)(0.45)));
+  SWIG_Python_SetConstant(d, "BOND_MIN_DISTANCE",SWIG_From_double((double)(0.4)));
+  SWIG_Python_SetConstant(d, "DEFAULT_COVALENT_RADIUS",SWIG_From_double((double)(1.0)));
+  SWIG_Python_SetConstant(d, "GRID_CELLS_PER_ATOM",SWIG_From_int((int)(8)));
 #if PY_VERSION_HEX >= 0x03000000
   return m;
 #else
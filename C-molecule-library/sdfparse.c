@@ -0,0 +1,634 @@
+#include "sdfparse.h"
+#include "spatial.h"
+#include <stdarg.h>
+#include <ctype.h>
+
+/* Growable buffer holding one NUL-terminated line, or one joined V3000 logical line */
+typedef struct line_buffer {
+    char *text;
+    size_t length, capacity;
+} line_buffer;
+
+/**
+ * @brief Reads the next line of a buffer.
+ *
+ * This function finds the line starting at *pos, stopping at end, and advances *pos past its line
+ * terminator. A trailing carriage return is not included in the line.
+ *
+ * @param data Pointer to the buffer being read.
+ * @param end Offset in data at which reading stops.
+ * @param pos Pointer to the offset of the next line, which is advanced past the line read.
+ * @param line Pointer that receives the start of the line.
+ * @param length Pointer that receives the length of the line.
+ * @return 1 if a line was read, or 0 if *pos is already at end.
+ */
+static int next_line(const char *data, size_t end, size_t *pos, const char **line, size_t *length) {
+    const char *start, *newline;
+    size_t n;
+
+    if(*pos >= end) return 0;
+
+    start = data + *pos;
+    newline = memchr(start, '\n', end - *pos);
+    n = newline != NULL ? (size_t)(newline - start) : end - *pos;
+    *pos += newline != NULL ? n + 1 : n;
+
+    if(n > 0 && start[n - 1] == '\r') n--;
+
+    *line = start;
+    *length = n;
+    return 1;
+}
+
+/**
+ * @brief Checks whether a byte range contains only whitespace.
+ *
+ * @param data Pointer to the first byte of the range.
+ * @param length The number of bytes in the range.
+ * @return 1 if every byte is whitespace, otherwise 0.
+ */
+static int is_blank(const char *data, size_t length) {
+    for(size_t i = 0; i < length; i++) {
+        if(!isspace((unsigned char)data[i])) return 0;
+    }
+    return 1;
+}
+
+/**
+ * @brief Checks whether a line is a '$$$$' record delimiter.
+ *
+ * @param line Pointer to the start of the line.
+ * @param length The length of the line.
+ * @return 1 if the line is a delimiter, otherwise 0.
+ */
+static int is_delimiter(const char *line, size_t length) {
+    return length >= 4 && memcmp(line, "$$$$", 4) == 0 && is_blank(line + 4, length - 4);
+}
+
+/**
+ * @brief Checks whether a line contains a NUL-terminated string.
+ *
+ * @param line Pointer to the start of the line.
+ * @param length The length of the line.
+ * @param text The string to search for.
+ * @return 1 if text occurs in the line, otherwise 0.
+ */
+static int contains(const char *line, size_t length, const char *text) {
+    size_t n = strlen(text);
+
+    for(size_t i = 0; i + n <= length; i++) {
+        if(memcmp(line + i, text, n) == 0) return 1;
+    }
+    return 0;
+}
+
+/**
+ * @brief Formats an error message into a caller-supplied buffer.
+ *
+ * @param error Buffer that receives the message, or NULL to discard it.
+ * @param error_size The size of the error buffer.
+ * @param format A printf() format string followed by its arguments.
+ * @return SDF_ERROR, so that callers can return the result directly.
+ */
+static int fail(char *error, size_t error_size, const char *format, ...) {
+    va_list args;
+
+    if(error != NULL && error_size > 0) {
+        va_start(args, format);
+        vsnprintf(error, error_size, format, args);
+        va_end(args);
+    }
+    return SDF_ERROR;
+}
+
+/**
+ * @brief Appends bytes to a line buffer, growing it as needed and keeping it NUL-terminated.
+ *
+ * @param buffer Pointer to the line buffer.
+ * @param text Pointer to the bytes to append.
+ * @param length The number of bytes to append.
+ * @return 1 on success, or 0 if the buffer could not be grown.
+ */
+static int buffer_append(line_buffer *buffer, const char *text, size_t length) {
+    if(buffer->length + length + 1 > buffer->capacity) {
+        size_t capacity = buffer->capacity == 0 ? 128 : buffer->capacity;
+        char *grown;
+
+        while(capacity < buffer->length + length + 1) {
+            capacity *= 2;
+        }
+        grown = realloc(buffer->text, capacity);
+        if(grown == NULL) return 0;
+        buffer->text = grown;
+        buffer->capacity = capacity;
+    }
+
+    memcpy(buffer->text + buffer->length, text, length);
+    buffer->length += length;
+    buffer->text[buffer->length] = '\0';
+    return 1;
+}
+
+/**
+ * @brief Parses a fixed-width integer field of a line.
+ *
+ * This function parses the width characters starting at column start, which may be padded with
+ * spaces and may run past the end of the line. The field must contain exactly one integer.
+ *
+ * @param line Pointer to the start of the line.
+ * @param length The length of the line.
+ * @param start The column of the first character of the field.
+ * @param width The width of the field.
+ * @param value Pointer that receives the parsed integer.
+ * @return 1 on success, or 0 if the field is empty or not an integer.
+ */
+static int parse_field(const char *line, size_t length, size_t start, size_t width, long *value) {
+    char field[16], *end;
+
+    if(start >= length || width >= sizeof(field)) return 0;
+    if(start + width > length) width = length - start;
+
+    memcpy(field, line + start, width);
+    field[width] = '\0';
+
+    *value = strtol(field, &end, 10);
+    return end != field && is_blank(end, strlen(end));
+}
+
+/**
+ * @brief Reads the next whitespace-separated token of a NUL-terminated string.
+ *
+ * @param cursor Pointer to the current position in the string, which is advanced past the token.
+ * @param length Pointer that receives the length of the token.
+ * @return Pointer to the start of the token, or NULL if there are no more tokens.
+ */
+static const char *next_token(const char **cursor, size_t *length) {
+    const char *start = *cursor;
+
+    while(*start != '\0' && isspace((unsigned char)*start)) start++;
+    if(*start == '\0') return NULL;
+
+    *cursor = start;
+    while(**cursor != '\0' && !isspace((unsigned char)**cursor)) (*cursor)++;
+    *length = (size_t)(*cursor - start);
+    return start;
+}
+
+/**
+ * @brief Parses a whitespace-separated integer token.
+ *
+ * @param cursor Pointer to the current position in a NUL-terminated string, which is advanced past the token.
+ * @param value Pointer that receives the parsed integer.
+ * @return 1 on success, or 0 if there is no token or it is not an integer.
+ */
+static int parse_long(const char **cursor, long *value) {
+    char *end;
+    size_t length;
+    const char *token = next_token(cursor, &length);
+
+    if(token == NULL) return 0;
+    *value = strtol(token, &end, 10);
+    return end == token + length;
+}
+
+/**
+ * @brief Parses a whitespace-separated floating point token.
+ *
+ * @param cursor Pointer to the current position in a NUL-terminated string, which is advanced past the token.
+ * @param value Pointer that receives the parsed number.
+ * @return 1 on success, or 0 if there is no token or it is not a number.
+ */
+static int parse_double(const char **cursor, double *value) {
+    char *end;
+    size_t length;
+    const char *token = next_token(cursor, &length);
+
+    if(token == NULL) return 0;
+    *value = strtod(token, &end);
+    return end == token + length;
+}
+
+/**
+ * @brief Parses an element symbol token into an atom structure.
+ *
+ * @param cursor Pointer to the current position in a NUL-terminated string, which is advanced past the token.
+ * @param atom Pointer to the atom structure that receives the symbol.
+ * @return 1 on success, or 0 if there is no token or it is longer than 2 characters.
+ */
+static int parse_element(const char **cursor, atom *atom) {
+    size_t length;
+    const char *token = next_token(cursor, &length);
+
+    if(token == NULL || length > 2) return 0;
+    memset(atom->element, 0, sizeof(atom->element));
+    memcpy(atom->element, token, length);
+    return 1;
+}
+
+/**
+ * @brief Allocates the temporary atom and bond arrays of a record.
+ *
+ * @param atoms Pointer that receives the atom array, or NULL if atom_count is 0.
+ * @param atom_count The number of atoms.
+ * @param bonds Pointer that receives the bond array, or NULL if bond_count is 0.
+ * @param bond_count The number of bonds.
+ * @return 1 on success, or 0 if an allocation failed.
+ */
+static int alloc_arrays(atom **atoms, long atom_count, bond **bonds, long bond_count) {
+    *atoms = atom_count > 0 ? calloc((size_t)atom_count, sizeof(atom)) : NULL;
+    *bonds = bond_count > 0 ? calloc((size_t)bond_count, sizeof(bond)) : NULL;
+    return (atom_count == 0 || *atoms != NULL) && (bond_count == 0 || *bonds != NULL);
+}
+
+/**
+ * @brief Parses the atom and bond blocks of a V2000 record.
+ *
+ * This function reads the counts line and then one fixed-format line per atom and per bond,
+ * starting at *pos. On success the atom and bond arrays are allocated and filled, with zero-based
+ * atom indices in the bonds, and *pos is left after the last bond line.
+ *
+ * @param data Pointer to the buffer being parsed.
+ * @param end Offset in data at which the record ends.
+ * @param pos Pointer to the offset of the first atom line, which is advanced as lines are read.
+ * @param counts The NUL-terminated counts line.
+ * @param buffer Line buffer used to hold each line.
+ * @param atoms Pointer that receives the atom array.
+ * @param atom_count Pointer that receives the number of atoms.
+ * @param bonds Pointer that receives the bond array.
+ * @param bond_count Pointer that receives the number of bonds.
+ * @param error Buffer that receives an error message.
+ * @param error_size The size of the error buffer.
+ * @return SDF_OK on success, or SDF_ERROR with a message in error.
+ */
+static int parse_v2000(const char *data, size_t end, size_t *pos, const char *counts, line_buffer *buffer,
+                       atom **atoms, long *atom_count, bond **bonds, long *bond_count, char *error, size_t error_size) {
+    const char *line, *cursor;
+    size_t length;
+
+    if(!parse_field(counts, strlen(counts), 0, 3, atom_count) || !parse_field(counts, strlen(counts), 3, 3, bond_count) ||
+       *atom_count < 0 || *bond_count < 0) {
+        return fail(error, error_size, "malformed counts line");
+    }
+    if(!alloc_arrays(atoms, *atom_count, bonds, *bond_count)) {
+        return fail(error, error_size, "out of memory");
+    }
+
+    for(long i = 0; i < *atom_count; i++) {
+        if(!next_line(data, end, pos, &line, &length)) {
+            return fail(error, error_size, "record declares %ld atoms and %ld bonds but is truncated", *atom_count, *bond_count);
+        }
+        buffer->length = 0;
+        if(!buffer_append(buffer, line, length)) return fail(error, error_size, "out of memory");
+
+        cursor = buffer->text;
+        if(!parse_double(&cursor, &(*atoms)[i].x) || !parse_double(&cursor, &(*atoms)[i].y) ||
+           !parse_double(&cursor, &(*atoms)[i].z) || !parse_element(&cursor, &(*atoms)[i])) {
+            return fail(error, error_size, "atom %ld is malformed", i + 1);
+        }
+    }
+
+    for(long i = 0; i < *bond_count; i++) {
+        long a1, a2, epairs;
+
+        if(!next_line(data, end, pos, &line, &length)) {
+            return fail(error, error_size, "record declares %ld atoms and %ld bonds but is truncated", *atom_count, *bond_count);
+        }
+        if(!parse_field(line, length, 0, 3, &a1) || !parse_field(line, length, 3, 3, &a2) ||
+           !parse_field(line, length, 6, 3, &epairs) || epairs < 0 || epairs > UCHAR_MAX) {
+            return fail(error, error_size, "bond %ld is malformed", i + 1);
+        }
+        if(a1 < 1 || a1 > *atom_count || a2 < 1 || a2 > *atom_count) {
+            return fail(error, error_size, "bond references atom outside 1..%ld", *atom_count);
+        }
+        (*bonds)[i].a1 = (unsigned int)(a1 - 1);
+        (*bonds)[i].a2 = (unsigned int)(a2 - 1);
+        (*bonds)[i].epairs = (unsigned char)epairs;
+    }
+
+    return SDF_OK;
+}
+
+/**
+ * @brief Reads the next logical line of a V3000 connection table.
+ *
+ * This function reads an 'M  V30 ' line starting at *pos, joining any continuation lines that
+ * end in '-', and stores its content without the prefix in buffer.
+ *
+ * @param data Pointer to the buffer being parsed.
+ * @param end Offset in data at which the record ends.
+ * @param pos Pointer to the offset of the next line, which is advanced past the lines read.
+ * @param buffer Line buffer that receives the content of the logical line.
+ * @return 1 if a line was read, 0 if the record ended, or -1 if a line is not a V3000 line or memory ran out.
+ */
+static int next_v30(const char *data, size_t end, size_t *pos, line_buffer *buffer) {
+    const char *line;
+    size_t length;
+
+    buffer->length = 0;
+    for(;;) {
+        if(!next_line(data, end, pos, &line, &length)) return buffer->length > 0 ? -1 : 0;
+        if(length < 7 || memcmp(line, "M  V30 ", 7) != 0) return -1;
+        if(!buffer_append(buffer, line + 7, length - 7)) return -1;
+
+        if(buffer->length == 0 || buffer->text[buffer->length - 1] != '-') return 1;
+        buffer->text[--buffer->length] = '\0';
+    }
+}
+
+/**
+ * @brief Checks whether a NUL-terminated V3000 line starts with the given keyword.
+ *
+ * @param text The content of the logical line.
+ * @param keyword The keyword to compare against, such as "BEGIN ATOM".
+ * @return 1 if the line starts with the keyword followed by whitespace or the end of the line, otherwise 0.
+ */
+static int is_keyword(const char *text, const char *keyword) {
+    size_t n = strlen(keyword);
+
+    while(isspace((unsigned char)*text)) text++;
+    return strncmp(text, keyword, n) == 0 && (text[n] == '\0' || isspace((unsigned char)text[n]));
+}
+
+/**
+ * @brief Parses the connection table of a V3000 record.
+ *
+ * This function reads 'M  V30' lines starting at *pos up to END CTAB. The COUNTS line sizes the
+ * atom and bond arrays, which are then filled from the ATOM and BOND blocks; any other blocks are
+ * skipped. Atom indices must run from 1 in order. On success *pos is left after the END CTAB line.
+ *
+ * @param data Pointer to the buffer being parsed.
+ * @param end Offset in data at which the record ends.
+ * @param pos Pointer to the offset of the line after the counts line, which is advanced as lines are read.
+ * @param buffer Line buffer used to hold each logical line.
+ * @param atoms Pointer that receives the atom array.
+ * @param atom_count Pointer that receives the number of atoms.
+ * @param bonds Pointer that receives the bond array.
+ * @param bond_count Pointer that receives the number of bonds.
+ * @param error Buffer that receives an error message.
+ * @param error_size The size of the error buffer.
+ * @return SDF_OK on success, or SDF_ERROR with a message in error.
+ */
+static int parse_v3000(const char *data, size_t end, size_t *pos, line_buffer *buffer,
+                       atom **atoms, long *atom_count, bond **bonds, long *bond_count, char *error, size_t error_size) {
+    const char *cursor, *token;
+    size_t length;
+    int status, counted = 0, atoms_seen = 0, bonds_seen = 0;
+    long index, a1, a2, epairs;
+
+    while((status = next_v30(data, end, pos, buffer)) == 1) {
+        cursor = buffer->text;
+
+        if(is_keyword(cursor, "END CTAB")) {
+            if(!counted) return fail(error, error_size, "V3000 connection table has no COUNTS line");
+            /* The arrays are zeroed when COUNTS is read, so a missing block would pass as blank atoms or self-bonds */
+            if(!atoms_seen && *atom_count > 0) return fail(error, error_size, "V3000 atom block is missing");
+            if(!bonds_seen && *bond_count > 0) return fail(error, error_size, "V3000 bond block is missing");
+            return SDF_OK;
+        }
+        else if(is_keyword(cursor, "COUNTS")) {
+            next_token(&cursor, &length);
+            if(counted || !parse_long(&cursor, atom_count) || !parse_long(&cursor, bond_count) ||
+               *atom_count < 0 || *bond_count < 0) {
+                return fail(error, error_size, "malformed V3000 COUNTS line");
+            }
+            /* Every atom and bond needs a line of its own, which bounds the allocation by the record size */
+            if((size_t)*atom_count + (size_t)*bond_count > end - *pos) {
+                return fail(error, error_size, "record declares %ld atoms and %ld bonds but is truncated", *atom_count, *bond_count);
+            }
+            if(!alloc_arrays(atoms, *atom_count, bonds, *bond_count)) {
+                return fail(error, error_size, "out of memory");
+            }
+            counted = 1;
+        }
+        else if(counted && is_keyword(cursor, "BEGIN ATOM")) {
+            for(long i = 0; i < *atom_count; i++) {
+                if(next_v30(data, end, pos, buffer) != 1) {
+                    return fail(error, error_size, "record declares %ld atoms and %ld bonds but is truncated", *atom_count, *bond_count);
+                }
+                cursor = buffer->text;
+                if(!parse_long(&cursor, &index) || index != i + 1) {
+                    return fail(error, error_size, "atom %ld is out of order or malformed", i + 1);
+                }
+                if(!parse_element(&cursor, &(*atoms)[i]) || !parse_double(&cursor, &(*atoms)[i].x) ||
+                   !parse_double(&cursor, &(*atoms)[i].y) || !parse_double(&cursor, &(*atoms)[i].z)) {
+                    return fail(error, error_size, "atom %ld is malformed", i + 1);
+                }
+            }
+            if(next_v30(data, end, pos, buffer) != 1 || !is_keyword(buffer->text, "END ATOM")) {
+                return fail(error, error_size, "V3000 atom block does not match its COUNTS line");
+            }
+            atoms_seen = 1;
+        }
+        else if(counted && is_keyword(cursor, "BEGIN BOND")) {
+            for(long i = 0; i < *bond_count; i++) {
+                if(next_v30(data, end, pos, buffer) != 1) {
+                    return fail(error, error_size, "record declares %ld atoms and %ld bonds but is truncated", *atom_count, *bond_count);
+                }
+                cursor = buffer->text;
+                if(!parse_long(&cursor, &index) || !parse_long(&cursor, &epairs) || !parse_long(&cursor, &a1) ||
+                   !parse_long(&cursor, &a2) || epairs < 0 || epairs > UCHAR_MAX) {
+                    return fail(error, error_size, "bond %ld is malformed", i + 1);
+                }
+                if(a1 < 1 || a1 > *atom_count || a2 < 1 || a2 > *atom_count) {
+                    return fail(error, error_size, "bond references atom outside 1..%ld", *atom_count);
+                }
+                (*bonds)[i].a1 = (unsigned int)(a1 - 1);
+                (*bonds)[i].a2 = (unsigned int)(a2 - 1);
+                (*bonds)[i].epairs = (unsigned char)epairs;
+            }
+            if(next_v30(data, end, pos, buffer) != 1 || !is_keyword(buffer->text, "END BOND")) {
+                return fail(error, error_size, "V3000 bond block does not match its COUNTS line");
+            }
+            bonds_seen = 1;
+        }
+        else if(is_keyword(cursor, "BEGIN CTAB")) {
+            continue;
+        }
+        else if(is_keyword(cursor, "BEGIN")) {
+            /* Skip blocks such as SGROUP and COLLECTION up to their END line */
+            next_token(&cursor, &length);
+            token = next_token(&cursor, &length);
+            if(token == NULL) return fail(error, error_size, "malformed V3000 BEGIN line");
+
+            char block[64] = "END ";
+            if(length > sizeof(block) - 5) length = sizeof(block) - 5;
+            strncat(block, token, length);
+
+            while((status = next_v30(data, end, pos, buffer)) == 1 && !is_keyword(buffer->text, block));
+            if(status != 1) return fail(error, error_size, "V3000 %s block is not closed", block + 4);
+        }
+    }
+
+    if(status == -1) return fail(error, error_size, "malformed V3000 connection table");
+    return fail(error, error_size, "V3000 connection table is not closed");
+}
+
+/**
+ * @brief Parses the next record of an in-memory SD file into a molecule structure.
+ *
+ * This function parses the V2000 or V3000 record starting at *offset, skipping records that are
+ * blank, and appends its atoms and bonds to the molecule with a single reservation. The molecule
+ * name is taken from the data item called name_field, falling back to the first line of the record,
+ * and is empty if neither is present. With SDF_PERCEIVE_BONDS in flags, a record that has several
+ * atoms but no bonds is given the single bonds perceive_bonds() infers from its atom distances.
+ * Whether or not parsing succeeds, *offset is advanced to the start of the following record, so
+ * that callers can skip a malformed record and carry on. On failure the molecule is left unchanged
+ * and a message is written to error instead of exiting the program.
+ *
+ * @param data Pointer to the SD file contents.
+ * @param size The size of data in bytes.
+ * @param offset Pointer to the offset of the record to parse, which is advanced to the next record.
+ * @param molecule Pointer to the molecule structure that receives the atoms and bonds.
+ * @param name_field The name of the data item holding the molecule name, such as "NAME".
+ * @param name Buffer that receives the NUL-terminated molecule name, truncated to fit.
+ * @param name_size The size of the name buffer.
+ * @param error Buffer that receives an error message on failure.
+ * @param error_size The size of the error buffer.
+ * @param flags Zero, or SDF_PERCEIVE_BONDS.
+ * @return SDF_OK if a record was parsed, SDF_END if there are no more records, or SDF_ERROR.
+ */
+int sdfparse(const char *data, size_t size, size_t *offset, molecule *molecule, const char *name_field,
+             char *name, size_t name_size, char *error, size_t error_size, unsigned int flags) {
+    const char *line, *title = NULL;
+    size_t length, title_length = 0, start, end, pos;
+    line_buffer buffer = {NULL, 0, 0};
+    atom *atoms = NULL;
+    bond *bonds = NULL;
+    long atom_count = 0, bond_count = 0;
+    int status;
+
+    if(molecule == NULL || offset == NULL) {
+        return fail(error, error_size, "sdfparse(): molecule is not malloc'd");
+    }
+
+    /* Find the extent of the next non-blank record and move *offset past it */
+    do {
+        if(*offset >= size || is_blank(data + *offset, size - *offset)) {
+            *offset = size;
+            return SDF_END;
+        }
+        start = pos = *offset;
+        end = size;
+        while(next_line(data, size, &pos, &line, &length)) {
+            if(is_delimiter(line, length)) {
+                end = (size_t)(line - data);
+                break;
+            }
+        }
+        *offset = pos;
+    } while(is_blank(data + start, end - start));
+
+    /* Header block: name, program and comment lines, then the counts line */
+    pos = start;
+    for(int i = 0; i < 4; i++) {
+        if(!next_line(data, end, &pos, &line, &length)) {
+            return fail(error, error_size, "record is missing its header or counts line");
+        }
+        if(i == 0) {
+            title = line;
+            title_length = length;
+        }
+    }
+    if(!buffer_append(&buffer, line, length)) {
+        return fail(error, error_size, "out of memory");
+    }
+
+    if(strstr(buffer.text, "V3000") != NULL) {
+        status = parse_v3000(data, end, &pos, &buffer, &atoms, &atom_count, &bonds, &bond_count, error, error_size);
+    } else {
+        char counts[128];
+        snprintf(counts, sizeof(counts), "%s", buffer.text);
+        status = parse_v2000(data, end, &pos, counts, &buffer, &atoms, &atom_count, &bonds, &bond_count, error, error_size);
+    }
+
+    if(status == SDF_OK && ((unsigned long)atom_count > UINT_MAX - molecule->atom_no ||
+                            (unsigned long)bond_count > UINT_MAX - molecule->bond_no)) {
+        status = fail(error, error_size, "too many atoms or bonds");
+    }
+
+    /* A record with several atoms but no bond block gets the bonds implied by its atom distances */
+    if(status == SDF_OK && (flags & SDF_PERCEIVE_BONDS) && bond_count == 0 && atom_count > 1) {
+        free(bonds);
+        bond_count = perceive_bonds(atoms, (unsigned int)atom_count, BOND_TOLERANCE, &bonds);
+        if(bond_count < 0) {
+            status = fail(error, error_size, "out of memory");
+        } else if((unsigned long)bond_count > UINT_MAX - molecule->bond_no) {
+            status = fail(error, error_size, "too many atoms or bonds");
+        }
+    }
+
+    if(status == SDF_OK) {
+        /* Properties block: the name data item is the line after its '> <name_field>' header */
+        char tag[128];
+        snprintf(tag, sizeof(tag), "<%s>", name_field != NULL ? name_field : "NAME");
+        while(next_line(data, end, &pos, &line, &length)) {
+            if(length > 0 && line[0] == '>' && contains(line, length, tag)) {
+                if(next_line(data, end, &pos, &title, &title_length)) break;
+            }
+        }
+
+        while(title_length > 0 && isspace((unsigned char)*title)) {
+            title++;
+            title_length--;
+        }
+        while(title_length > 0 && isspace((unsigned char)title[title_length - 1])) title_length--;
+
+        if(name != NULL && name_size > 0) {
+            if(title_length >= name_size) title_length = name_size - 1;
+            memcpy(name, title, title_length);
+            name[title_length] = '\0';
+        }
+    }
+
+    if(status == SDF_OK) {
+        unsigned int base = molecule->atom_no;
+
+        for(long i = 0; i < bond_count; i++) {
+            bonds[i].a1 += base;
+            bonds[i].a2 += base;
+        }
+        molreserve(molecule, molecule->atom_no + (unsigned int)atom_count, molecule->bond_no + (unsigned int)bond_count);
+        molappend_atoms(molecule, atoms, (unsigned int)atom_count);
+        molappend_bonds(molecule, bonds, (unsigned int)bond_count);
+    }
+
+    free(buffer.text);
+    free(atoms);
+    free(bonds);
+    return status;
+}
+
+/**
+ * @brief Finds the offsets of the records of an in-memory SD file.
+ *
+ * This function scans for '$$$$' delimiter lines and records the offset of every record that is not
+ * blank, so that callers can seek straight to a record and pass its offset to sdfparse(). At most
+ * capacity offsets are written, but every record is counted, so a first call with a capacity of 0
+ * returns the size of the array needed.
+ *
+ * @param data Pointer to the SD file contents.
+ * @param size The size of data in bytes.
+ * @param offsets Array that receives the offsets of the records, or NULL if capacity is 0.
+ * @param capacity The number of entries in offsets.
+ * @return The number of records in data.
+ */
+size_t sdfindex(const char *data, size_t size, size_t *offsets, size_t capacity) {
+    const char *line;
+    size_t length, pos = 0, start = 0, count = 0;
+
+    while(next_line(data, size, &pos, &line, &length)) {
+        if(is_delimiter(line, length)) {
+            if(!is_blank(data + start, (size_t)(line - data) - start)) {
+                if(count < capacity) offsets[count] = start;
+                count++;
+            }
+            start = pos;
+        }
+    }
+    if(!is_blank(data + start, size - start)) {
+        if(count < capacity) offsets[count] = start;
+        count++;
+    }
+
+    return count;
+}
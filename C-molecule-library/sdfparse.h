@@ -0,0 +1,19 @@
+#ifndef SDFPARSE_HEADER
+#define SDFPARSE_HEADER
+
+#include "molecule.h"
+
+/* CONSTANTS */
+#define SDF_OK 0
+#define SDF_END 1
+#define SDF_ERROR -1
+
+/* sdfparse() flags */
+#define SDF_PERCEIVE_BONDS 1
+
+/* FUNCTION PROTOTYPES */
+int sdfparse(const char *data, size_t size, size_t *offset, molecule *molecule, const char *name_field,
+             char *name, size_t name_size, char *error, size_t error_size, unsigned int flags);
+size_t sdfindex(const char *data, size_t size, size_t *offsets, size_t capacity);
+
+#endif
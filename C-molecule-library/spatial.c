@@ -0,0 +1,342 @@
+#include "spatial.h"
+
+/* Covalent radii in angstroms (Cordero et al., 2008), used to decide which atoms are bonded */
+typedef struct covalent_entry {
+    const char *element;
+    double radius;
+} covalent_entry;
+
+static const covalent_entry covalent_radii[] = {
+    {"H", 0.31}, {"He", 0.28}, {"Li", 1.28}, {"Be", 0.96}, {"B", 0.84}, {"C", 0.76}, {"N", 0.71},
+    {"O", 0.66}, {"F", 0.57}, {"Ne", 0.58}, {"Na", 1.66}, {"Mg", 1.41}, {"Al", 1.21}, {"Si", 1.11},
+    {"P", 1.07}, {"S", 1.05}, {"Cl", 1.02}, {"Ar", 1.06}, {"K", 2.03}, {"Ca", 1.76}, {"Ti", 1.60},
+    {"Cr", 1.39}, {"Mn", 1.39}, {"Fe", 1.32}, {"Co", 1.26}, {"Ni", 1.24}, {"Cu", 1.32}, {"Zn", 1.22},
+    {"Ga", 1.22}, {"Ge", 1.20}, {"As", 1.19}, {"Se", 1.20}, {"Br", 1.20}, {"Kr", 1.16}, {"Ag", 1.45},
+    {"Sn", 1.39}, {"I", 1.39}, {"Xe", 1.40}, {"Pt", 1.36}, {"Au", 1.36}, {"Hg", 1.32}, {"Pb", 1.46}
+};
+
+/**
+ * @brief Returns the grid cell along one axis that holds a coordinate.
+ *
+ * Coordinates outside the grid, including infinite ones, are clamped to its first or last cell, and
+ * NaN coordinates fall in the first cell, where no distance or box test will ever match them.
+ */
+static unsigned int cell_of(double value, double min, double cell, unsigned int n) {
+    double t = (value - min) / cell;
+    if(!(t >= 0)) return 0;
+    if(t >= n) return n - 1;
+    return (unsigned int)t;
+}
+
+/**
+ * @brief Returns the covalent radius of an element.
+ *
+ * @param element The NUL-terminated element code, such as "C" or "Cl".
+ * @return The covalent radius in angstroms, or DEFAULT_COVALENT_RADIUS for unknown elements.
+ */
+double covalent_radius(const char element[3]) {
+    for(size_t i = 0; i < sizeof(covalent_radii) / sizeof(covalent_radii[0]); i++) {
+        if(strncmp(covalent_radii[i].element, element, 3) == 0) {
+            return covalent_radii[i].radius;
+        }
+    }
+    return DEFAULT_COVALENT_RADIUS;
+}
+
+/**
+ * @brief Builds a uniform grid index over an array of atoms.
+ *
+ * The bounding box of the atoms is divided into cubic cells of the given size, and the atoms are
+ * bucketed by cell with a counting sort, so building the grid takes linear time. Each cell's atoms
+ * are stored contiguously with copies of their coordinates, so a query only reads the cells it
+ * overlaps. If the atoms are so sparse that the grid would have more than GRID_CELLS_PER_ATOM cells
+ * per atom, the cells are made larger. The grid is a snapshot: it does not follow later changes to
+ * the atoms, such as mol_xform() rotations.
+ *
+ * @param atoms Pointer to the first of atom_no atoms, in the insertion order the indices refer to.
+ * @param atom_no The number of atoms.
+ * @param cell The edge length of a cell. Queries are fastest when it is close to their radius.
+ * @return Pointer to the new grid, to be freed with gridfree(), or NULL if memory ran out.
+ */
+spatial_grid *gridbuild(const atom *atoms, unsigned int atom_no, double cell) {
+    spatial_grid *grid;
+    double min[3] = {0, 0, 0}, max[3] = {0, 0, 0}, cells, limit;
+    unsigned int *fill;
+    int bounded = 0;
+
+    grid = calloc(1, sizeof(spatial_grid));
+    if(grid == NULL) return NULL;
+
+    for(unsigned int i = 0; i < atom_no; i++) {
+        double point[3] = {atoms[i].x, atoms[i].y, atoms[i].z};
+        if(!isfinite(point[0]) || !isfinite(point[1]) || !isfinite(point[2])) continue;
+        for(int axis = 0; axis < 3; axis++) {
+            if(!bounded || point[axis] < min[axis]) min[axis] = point[axis];
+            if(!bounded || point[axis] > max[axis]) max[axis] = point[axis];
+        }
+        bounded = 1;
+    }
+
+    if(!(cell > 0) || !isfinite(cell)) cell = 1.0;
+    limit = atom_no > 0 ? (double)atom_no * GRID_CELLS_PER_ATOM : 1.0;
+    for(;;) {
+        if(!isfinite(cell)) {
+            /* Extents too large to divide, which a single cell covers */
+            grid->nx = grid->ny = grid->nz = 1;
+            cells = 1;
+            break;
+        }
+        double nx = floor((max[0] - min[0]) / cell) + 1;
+        double ny = floor((max[1] - min[1]) / cell) + 1;
+        double nz = floor((max[2] - min[2]) / cell) + 1;
+        cells = nx * ny * nz;
+        if(cells <= limit) {
+            grid->nx = (unsigned int)nx;
+            grid->ny = (unsigned int)ny;
+            grid->nz = (unsigned int)nz;
+            break;
+        }
+        cell *= cbrt(cells / limit) * 1.001;
+    }
+
+    grid->cell = cell;
+    grid->min_x = min[0];
+    grid->min_y = min[1];
+    grid->min_z = min[2];
+    grid->atom_no = atom_no;
+    grid->starts = calloc((size_t)cells + 1, sizeof(unsigned int));
+    grid->indices = malloc(sizeof(unsigned int) * (atom_no > 0 ? atom_no : 1));
+    grid->xyz = malloc(sizeof(double) * 3 * (atom_no > 0 ? atom_no : 1));
+    fill = malloc(sizeof(unsigned int) * (size_t)cells);
+    if(grid->starts == NULL || grid->indices == NULL || grid->xyz == NULL || fill == NULL) {
+        free(fill);
+        gridfree(grid);
+        return NULL;
+    }
+
+    /* Count the atoms of every cell, turn the counts into run offsets, then place the atoms */
+    for(unsigned int i = 0; i < atom_no; i++) {
+        size_t c = ((size_t)cell_of(atoms[i].z, min[2], cell, grid->nz) * grid->ny
+                    + cell_of(atoms[i].y, min[1], cell, grid->ny)) * grid->nx
+                   + cell_of(atoms[i].x, min[0], cell, grid->nx);
+        grid->starts[c + 1]++;
+    }
+    for(size_t c = 0; c < (size_t)cells; c++) {
+        grid->starts[c + 1] += grid->starts[c];
+        fill[c] = grid->starts[c];
+    }
+    for(unsigned int i = 0; i < atom_no; i++) {
+        size_t c = ((size_t)cell_of(atoms[i].z, min[2], cell, grid->nz) * grid->ny
+                    + cell_of(atoms[i].y, min[1], cell, grid->ny)) * grid->nx
+                   + cell_of(atoms[i].x, min[0], cell, grid->nx);
+        unsigned int slot = fill[c]++;
+        grid->indices[slot] = i;
+        grid->xyz[3 * (size_t)slot] = atoms[i].x;
+        grid->xyz[3 * (size_t)slot + 1] = atoms[i].y;
+        grid->xyz[3 * (size_t)slot + 2] = atoms[i].z;
+    }
+
+    free(fill);
+    return grid;
+}
+
+/**
+ * @brief Frees a grid built by gridbuild().
+ *
+ * @param grid Pointer to the grid, or NULL.
+ */
+void gridfree(spatial_grid *grid) {
+    if(grid == NULL) return;
+    free(grid->starts);
+    free(grid->indices);
+    free(grid->xyz);
+    free(grid);
+}
+
+/**
+ * @brief Finds the atoms within a distance of a point.
+ *
+ * Only the cells overlapping the cube around the sphere are read. At most capacity indices are
+ * written, but every atom found is counted, so a first call with a capacity of 0 returns the size
+ * of the array needed, as sdfindex() does.
+ *
+ * @param grid Pointer to the grid to search.
+ * @param x The x coordinate of the centre.
+ * @param y The y coordinate of the centre.
+ * @param z The z coordinate of the centre.
+ * @param radius The distance from the centre, inclusive.
+ * @param found Array that receives the insertion-order indices of the atoms, or NULL if capacity is 0.
+ * @param capacity The number of entries in found.
+ * @return The number of atoms within radius of the centre.
+ */
+size_t gridradius(const spatial_grid *grid, double x, double y, double z, double radius,
+                  unsigned int *found, size_t capacity) {
+    double squared = radius * radius;
+    size_t count = 0;
+
+    if(grid == NULL || grid->atom_no == 0 || !(radius >= 0)) return 0;
+
+    unsigned int x0 = cell_of(x - radius, grid->min_x, grid->cell, grid->nx);
+    unsigned int x1 = cell_of(x + radius, grid->min_x, grid->cell, grid->nx);
+    unsigned int y0 = cell_of(y - radius, grid->min_y, grid->cell, grid->ny);
+    unsigned int y1 = cell_of(y + radius, grid->min_y, grid->cell, grid->ny);
+    unsigned int z0 = cell_of(z - radius, grid->min_z, grid->cell, grid->nz);
+    unsigned int z1 = cell_of(z + radius, grid->min_z, grid->cell, grid->nz);
+
+    for(unsigned int cz = z0; cz <= z1; cz++) {
+        for(unsigned int cy = y0; cy <= y1; cy++) {
+            size_t row = ((size_t)cz * grid->ny + cy) * grid->nx;
+            /* The cells of one row are adjacent, so their atoms form a single run */
+            for(unsigned int slot = grid->starts[row + x0]; slot < grid->starts[row + x1 + 1]; slot++) {
+                const double *point = grid->xyz + 3 * (size_t)slot;
+                double dx = point[0] - x, dy = point[1] - y, dz = point[2] - z;
+                if(dx * dx + dy * dy + dz * dz <= squared) {
+                    if(count < capacity) found[count] = grid->indices[slot];
+                    count++;
+                }
+            }
+        }
+    }
+
+    return count;
+}
+
+/**
+ * @brief Finds the atoms inside an axis-aligned box.
+ *
+ * Bounds may be infinite, so that, for instance, a rectangle in the xy plane is searched at every
+ * depth. At most capacity indices are written, but every atom found is counted, as in gridradius().
+ *
+ * @param grid Pointer to the grid to search.
+ * @param low The lowest x, y and z coordinates of the box, inclusive.
+ * @param high The highest x, y and z coordinates of the box, inclusive.
+ * @param found Array that receives the insertion-order indices of the atoms, or NULL if capacity is 0.
+ * @param capacity The number of entries in found.
+ * @return The number of atoms inside the box.
+ */
+size_t gridbox(const spatial_grid *grid, const double low[3], const double high[3],
+               unsigned int *found, size_t capacity) {
+    size_t count = 0;
+
+    if(grid == NULL || grid->atom_no == 0) return 0;
+    if(!(low[0] <= high[0]) || !(low[1] <= high[1]) || !(low[2] <= high[2])) return 0;
+
+    unsigned int x0 = cell_of(low[0], grid->min_x, grid->cell, grid->nx);
+    unsigned int x1 = cell_of(high[0], grid->min_x, grid->cell, grid->nx);
+    unsigned int y0 = cell_of(low[1], grid->min_y, grid->cell, grid->ny);
+    unsigned int y1 = cell_of(high[1], grid->min_y, grid->cell, grid->ny);
+    unsigned int z0 = cell_of(low[2], grid->min_z, grid->cell, grid->nz);
+    unsigned int z1 = cell_of(high[2], grid->min_z, grid->cell, grid->nz);
+
+    for(unsigned int cz = z0; cz <= z1; cz++) {
+        for(unsigned int cy = y0; cy <= y1; cy++) {
+            size_t row = ((size_t)cz * grid->ny + cy) * grid->nx;
+            for(unsigned int slot = grid->starts[row + x0]; slot < grid->starts[row + x1 + 1]; slot++) {
+                const double *point = grid->xyz + 3 * (size_t)slot;
+                if(point[0] >= low[0] && point[0] <= high[0] && point[1] >= low[1] && point[1] <= high[1] &&
+                   point[2] >= low[2] && point[2] <= high[2]) {
+                    if(count < capacity) found[count] = grid->indices[slot];
+                    count++;
+                }
+            }
+        }
+    }
+
+    return count;
+}
+
+static int bond_pair_compare(const void *a, const void *b) {
+    const bond *bond1 = a, *bond2 = b;
+    if(bond1->a1 != bond2->a1) return bond1->a1 < bond2->a1 ? -1 : 1;
+    if(bond1->a2 != bond2->a2) return bond1->a2 < bond2->a2 ? -1 : 1;
+    return 0;
+}
+
+/**
+ * @brief Infers single bonds between atoms from their distances.
+ *
+ * Two atoms are bonded when they are further apart than BOND_MIN_DISTANCE and no further than the
+ * sum of their covalent radii plus tolerance. The atoms are indexed with a grid whose cells are as
+ * large as the longest possible bond, so each atom is only compared with the atoms of the cells
+ * around it and the whole pass takes time linear in the number of atoms rather than quadratic.
+ *
+ * @param atoms Pointer to the first of atom_no atoms.
+ * @param atom_no The number of atoms.
+ * @param tolerance The distance allowed beyond the sum of the covalent radii, such as BOND_TOLERANCE.
+ * @param bonds Receives a malloc'd array of the bonds found, sorted by a1 and then a2, with only
+ *              a1, a2 and epairs set, as molappend_bonds() expects; the caller frees it.
+ * @return The number of bonds found, or -1 if memory ran out.
+ */
+long perceive_bonds(const atom *atoms, unsigned int atom_no, double tolerance, bond **bonds) {
+    spatial_grid *grid;
+    double *radii, max_radius = 0, min_squared = BOND_MIN_DISTANCE * BOND_MIN_DISTANCE;
+    unsigned int *found;
+    size_t found_max = 64, bond_max = (size_t)atom_no + 16;
+    long bond_no = 0;
+
+    *bonds = NULL;
+    if(atom_no < 2) return 0;
+
+    radii = malloc(sizeof(double) * atom_no);
+    if(radii == NULL) return -1;
+    for(unsigned int i = 0; i < atom_no; i++) {
+        radii[i] = covalent_radius(atoms[i].element);
+        if(radii[i] > max_radius) max_radius = radii[i];
+    }
+
+    grid = gridbuild(atoms, atom_no, 2 * max_radius + tolerance);
+    found = malloc(sizeof(unsigned int) * found_max);
+    *bonds = malloc(sizeof(bond) * bond_max);
+    if(grid == NULL || found == NULL || *bonds == NULL) goto fail;
+
+    for(unsigned int i = 0; i < atom_no; i++) {
+        size_t count = gridradius(grid, atoms[i].x, atoms[i].y, atoms[i].z, radii[i] + max_radius + tolerance,
+                                  found, found_max);
+        if(count > found_max) {
+            unsigned int *grown = realloc(found, sizeof(unsigned int) * count);
+            if(grown == NULL) goto fail;
+            found = grown;
+            found_max = count;
+            gridradius(grid, atoms[i].x, atoms[i].y, atoms[i].z, radii[i] + max_radius + tolerance, found, found_max);
+        }
+
+        for(size_t k = 0; k < count; k++) {
+            unsigned int j = found[k];
+            double dx, dy, dz, squared, reach;
+            if(j <= i) continue;
+
+            dx = atoms[j].x - atoms[i].x;
+            dy = atoms[j].y - atoms[i].y;
+            dz = atoms[j].z - atoms[i].z;
+            squared = dx * dx + dy * dy + dz * dz;
+            reach = radii[i] + radii[j] + tolerance;
+            if(squared <= min_squared || squared > reach * reach) continue;
+
+            if((size_t)bond_no == bond_max) {
+                bond *grown = realloc(*bonds, sizeof(bond) * bond_max * 2);
+                if(grown == NULL) goto fail;
+                *bonds = grown;
+                bond_max *= 2;
+            }
+            memset(&(*bonds)[bond_no], 0, sizeof(bond));
+            (*bonds)[bond_no].a1 = i;
+            (*bonds)[bond_no].a2 = j;
+            (*bonds)[bond_no].epairs = 1;
+            bond_no++;
+        }
+    }
+
+    qsort(*bonds, (size_t)bond_no, sizeof(bond), bond_pair_compare);
+    gridfree(grid);
+    free(found);
+    free(radii);
+    return bond_no;
+
+fail:
+    gridfree(grid);
+    free(found);
+    free(radii);
+    free(*bonds);
+    *bonds = NULL;
+    return -1;
+}
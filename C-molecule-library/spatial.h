@@ -0,0 +1,36 @@
+#ifndef SPATIAL_HEADER
+#define SPATIAL_HEADER
+
+#include "molecule.h"
+
+/* CONSTANTS */
+/* Distance, in the units of the atom coordinates, allowed beyond the sum of two covalent radii for a perceived bond */
+#define BOND_TOLERANCE 0.45
+/* Atoms closer than this are taken to overlap rather than bond */
+#define BOND_MIN_DISTANCE 0.4
+/* Covalent radius assumed for elements missing from the radius table */
+#define DEFAULT_COVALENT_RADIUS 1.0
+/* The grid never has more than this many cells per atom, however sparse the atoms are */
+#define GRID_CELLS_PER_ATOM 8
+
+/* STRUCTURES */
+typedef struct spatial_grid {
+    double cell, min_x, min_y, min_z;
+    unsigned int nx, ny, nz;
+    unsigned int atom_no;
+    unsigned int *starts;   /* nx*ny*nz + 1 offsets into indices, one run per cell */
+    unsigned int *indices;  /* atom indices in insertion order, grouped by cell */
+    double *xyz;            /* coordinates of the atoms in the order of indices */
+} spatial_grid;
+
+/* FUNCTION PROTOTYPES */
+spatial_grid *gridbuild(const atom *atoms, unsigned int atom_no, double cell);
+void gridfree(spatial_grid *grid);
+size_t gridradius(const spatial_grid *grid, double x, double y, double z, double radius,
+                  unsigned int *found, size_t capacity);
+size_t gridbox(const spatial_grid *grid, const double low[3], const double high[3],
+               unsigned int *found, size_t capacity);
+double covalent_radius(const char element[3]);
+long perceive_bonds(const atom *atoms, unsigned int atom_no, double tolerance, bond **bonds);
+
+#endif
@@ -0,0 +1,556 @@
+from quart import Quart, Response, request, send_from_directory, jsonify, abort, g
+import io
+import os
+import json
+import asyncio
+from molsql import Database
+from molsql_async import AsyncDatabase, create_pool
+import sdf_import
+import render_pool as workers
+from render_pool import RenderPool, RenderPoolBusy, RenderPoolTimeout
+from render_cache import RenderCache, MoleculeCache
+import metrics
+from http_common import (SVG_MAX_AGE, MOLECULES_MAX_AGE, LOD_AUTO, sdf_name, parse_rotation, resolve_detail,
+                         parse_frames, parse_listing, listing_page, parse_search, search_page, select_encoding,
+                         compress, make_etag, cache_headers)
+
+app = Quart(__name__)
+
+# Seconds a request waits for a pooled database connection before failing with 503
+DATABASE_POOL_TIMEOUT = float(os.environ.get("DATABASE_POOL_TIMEOUT", 5.0))
+
+db_pool = None
+
+render_pool = RenderPool(workers=int(os.environ.get("RENDER_WORKERS", 0)) or None,
+                         max_queue=int(os.environ.get("RENDER_QUEUE_DEPTH", 0)) or None,
+                         timeout=float(os.environ.get("RENDER_TIMEOUT", 30.0)))
+
+svg_cache = RenderCache(max_bytes=int(os.environ.get("SVG_CACHE_BYTES", 64*1024*1024)),
+                        disk_dir=os.environ.get("SVG_CACHE_DIR"),
+                        disk_max_bytes=int(os.environ.get("SVG_CACHE_DISK_BYTES", 256*1024*1024)))
+geometry_cache = MoleculeCache(max_entries=int(os.environ.get("MOLECULE_CACHE_ENTRIES", 32)))
+
+metrics.REGISTRY.add_collector(lambda: [
+    ("molvis_render_pool_queued", "gauge", "Render jobs queued or running in the render pool.",
+     [({}, render_pool.stats()["queued"])]),
+    ("molvis_render_pool_jobs_total", "counter", "Render pool jobs by outcome.",
+     [({"outcome": outcome}, render_pool.stats()[outcome]) for outcome in ("completed", "rejected", "timeouts")]),
+])
+metrics.REGISTRY.add_collector(metrics.cache_collector({"svg": svg_cache.stats, "molecule": geometry_cache.stats}))
+
+@app.before_serving
+async def startup():
+    """
+    Creates the database tables, opens the asyncpg connection pool and starts the render workers.
+    """
+    global db_pool
+
+    def create_tables():
+        db = Database()
+        try:
+            db.create_tables()
+        finally:
+            db.conn.close()
+
+    await asyncio.to_thread(create_tables)
+    db_pool = await create_pool(minconn=int(os.environ.get("DATABASE_POOL_MIN", 1)),
+                                maxconn=int(os.environ.get("DATABASE_POOL_MAX", 10)))
+    render_pool.start()
+
+@app.after_serving
+async def shutdown():
+    """
+    Closes the connection pool and stops the render workers.
+    """
+    await db_pool.close()
+    render_pool.shutdown()
+
+async def get_db() -> AsyncDatabase:
+    """
+    Returns the AsyncDatabase for the current request, acquiring a pooled connection on first use.
+
+    The connection is released by release_db() when the request ends.
+
+    Returns:
+        AsyncDatabase: An AsyncDatabase using a pooled connection.
+    Raises:
+        HTTPException: A 503 error if no connection becomes available before the timeout.
+    """
+    if "db" not in g:
+        try:
+            with metrics.stage("pool_checkout"):
+                g.db = AsyncDatabase(await db_pool.acquire(timeout=DATABASE_POOL_TIMEOUT))
+        except asyncio.TimeoutError:
+            abort(503, description="Database is busy")
+    return g.db
+
+@app.before_request
+async def begin_request_metrics():
+    """
+    Starts timing the request and collecting its stage breakdown, if instrumentation is enabled.
+    """
+    g.metrics_token = metrics.begin_request()
+
+@app.after_request
+async def end_request_metrics(response):
+    """
+    Records the duration of the request and logs it if it was slow, if instrumentation is enabled.
+
+    Args:
+        response (Response): The response of the request.
+
+    Returns:
+        Response: The same response.
+    """
+    metrics.end_request(g.pop("metrics_token", None), request.method,
+                        request.url_rule.rule if request.url_rule else "unmatched", response.status_code, request.path)
+    return response
+
+@app.teardown_request
+async def end_failed_request_metrics(exception):
+    """
+    Records a request that ended with an unhandled exception, which skips end_request_metrics().
+
+    Args:
+        exception (Exception): The exception that ended the request, or None.
+    """
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        metrics.end_request(token, request.method, request.url_rule.rule if request.url_rule else "unmatched",
+                            500, request.path)
+
+@app.teardown_appcontext
+async def release_db(exception):
+    """
+    Releases the current request's database connection to the pool, if one was acquired.
+
+    Args:
+        exception (Exception): The exception that ended the request, or None.
+    """
+    db = g.pop("db", None)
+    if db is not None:
+        await db_pool.release(db.conn)
+
+async def offload(fn, *args):
+    """
+    Runs a CPU-bound job in the render pool.
+
+    Args:
+        fn (callable): A picklable module-level function, such as render_pool.render().
+        *args: The arguments of fn.
+
+    Returns:
+        The return value of fn.
+    Raises:
+        HTTPException: A 503 error if the render queue is full, or a 504 error if the job times out.
+    """
+    try:
+        with metrics.stage("render_pool"):
+            return await render_pool.submit(fn, *args)
+    except RenderPoolBusy:
+        abort(503, description="Server is busy rendering, try again shortly")
+    except RenderPoolTimeout:
+        abort(504, description="Rendering took too long")
+
+@app.route('/', methods=['GET'])
+async def index():
+    """
+    Returns the contents of the 'index.html' file located in the same directory as this script.
+
+    Returns:
+        Response object: The contents of the 'index.html' file.
+    """
+    return await send_from_directory(os.path.dirname(__file__), 'index.html')
+
+@app.route('/<path:path>', methods=['GET'])
+async def static_files(path):
+    """
+    Serves a static file from the current directory based on the given relative path.
+
+    Args:
+        path (str): The relative path of the requested file.
+
+    Returns:
+        Response object: The contents of the requested file, or a 404 error if the file is not found.
+    """
+    file_path = os.path.join(os.path.dirname(__file__), path)
+    if os.path.isfile(file_path):
+        return await send_from_directory(os.path.dirname(__file__), path)
+    else:
+        abort(404, description="File not found")
+
+@app.route('/get-molecules', methods=['GET'])
+async def get_molecules():
+    """
+    Returns the name of every molecule as a JSON response, as server.get_molecules() does.
+
+    Returns:
+        Response object: A JSON list of molecule dictionaries with a "NAME" each, or a 304 response.
+    """
+    db = await get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(await db.molecules_version(), encoding)
+
+    response = await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    molecule_dicts = [{"NAME": name} for name in await db.molecule_names()]
+
+    async def body():
+        return compress(json.dumps(molecule_dicts).encode(), encoding)
+    return await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, body)
+
+@app.route('/molecules', methods=['GET'])
+async def molecules():
+    """
+    Returns one page of the molecule list, optionally filtered by name, as server.molecules() does.
+
+    Returns:
+        Response object: A JSON object with the "molecules" of the page and the "next" cursor,
+                         or a 304 response.
+    Raises:
+        HTTPException: A 400 error if the limit, match mode, sort order or cursor is malformed.
+    """
+    listing = parse_listing(request.args)
+
+    db = await get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(await db.molecules_version(), listing["limit"], listing["query"], listing["match"],
+                     listing["sort"], listing["cursor"], encoding)
+
+    response = await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    rows, following = await db.list_molecules(listing["limit"], listing["after"], listing["query"],
+                                              listing["match"], listing["sort"])
+    page = listing_page(rows, following, listing["sort"])
+
+    async def body():
+        return compress(json.dumps(page).encode(), encoding)
+    return await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, body)
+
+@app.route('/search', methods=['GET'])
+async def search():
+    """
+    Returns one page of the molecules matching a structural search, as server.search() does.
+
+    Returns:
+        Response object: A JSON object with the "molecules" of the page and the "next" cursor,
+                         or a 304 response.
+    Raises:
+        HTTPException: A 400 error if the query is malformed, or a 404 error if the similar
+                       molecule is not found.
+    """
+    search = parse_search(request.args)
+
+    db = await get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(await db.molecules_version(), request.query_string, encoding)
+
+    response = await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    reference = None
+    if search["similar"] is not None:
+        reference = await db.fingerprint(search["similar"])
+        if reference is None:
+            abort(404, description="Molecule not found")
+
+    rows, following = await db.search_molecules(search["constraints"], reference, search["threshold"],
+                                                search["limit"], search["after"])
+    page = search_page(rows, following)
+
+    async def body():
+        return compress(json.dumps(page).encode(), encoding)
+    return await cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, body)
+
+@app.route('/upload-sdf', methods=['POST'])
+async def upload_sdf():
+    """
+    Uploads a given SDF file and adds its molecule to the database, as server.upload_sdf() does.
+    The file is parsed in the render pool.
+
+    Returns:
+        str: A success message indicating that the file has been uploaded successfully.
+    Raises:
+        HTTPException: A 400 error if the SDF file is not provided or if the name already exists
+                    in the database.
+    """
+    files = await request.files
+    if 'sdf_file' not in files:
+        abort(400, description="No file provided")
+
+    sdf_content = files['sdf_file'].read().decode("utf-8", errors="replace")
+    name = sdf_name(sdf_content)
+
+    db = await get_db()
+    if await db.molecule_exists(name):
+        abort(400, description="Name already exists in the database")
+
+    atoms, bonds = await offload(workers.parse, sdf_content)
+    await db.add_geometry(name, atoms, bonds)
+    svg_cache.invalidate(name)
+    geometry_cache.invalidate(name)
+
+    return "File uploaded successfully."
+
+@app.route('/import-sdf', methods=['POST'])
+async def import_sdf():
+    """
+    Imports every record of an uploaded multi-record SDF file, as server.import_sdf() does.
+
+    The import runs sdf_import.import_sdf() on its own synchronous connection in a thread, so
+    its parsing process pool and batched inserts do not block the event loop.
+
+    Returns:
+        Response object: A JSON response summarising how many records were read and imported,
+                         with the duplicate and malformed records that were skipped.
+    Raises:
+        HTTPException: A 400 error if the SDF file is not provided.
+    """
+    files = await request.files
+    if 'sdf_file' not in files:
+        abort(400, description="No file provided")
+
+    form = await request.form
+    commit_size = form.get("commit_size", 500, type=int)
+    name_field = form.get("name_field", "NAME")
+    file = io.TextIOWrapper(files['sdf_file'].stream, encoding="utf-8", errors="replace")
+
+    def invalidate(name):
+        svg_cache.invalidate(name)
+        geometry_cache.invalidate(name)
+
+    def run_import():
+        db = Database()
+        try:
+            return sdf_import.import_sdf(file, db, commit_size=commit_size, name_field=name_field,
+                                         workers=int(os.environ.get("IMPORT_WORKERS", 2)), on_import=invalidate)
+        finally:
+            db.conn.close()
+
+    return jsonify(await asyncio.to_thread(run_import))
+
+async def load_geometry(db: AsyncDatabase, name: str) -> bytes:
+    """
+    Returns the packed geometry of a molecule, from the geometry cache when possible.
+
+    Args:
+        db (AsyncDatabase): The database to load the molecule from on a miss.
+        name (str): The name of the molecule.
+
+    Returns:
+        bytes: The packed geometry.
+    """
+    geometry = geometry_cache.get(name)
+    if geometry is None:
+        geometry = await db.load_geometry(name)
+        geometry_cache.put(name, geometry)
+    return geometry
+
+async def render_svg(db: AsyncDatabase, name: str, version: str, encoding: str="identity", **options) -> bytes:
+    """
+    Returns the SVG of a molecule with the given rotation, compressed with the given content
+    encoding, rendering and compressing it in the render pool on a render cache miss.
+
+    Args:
+        db (AsyncDatabase): The database to load the molecule from on a miss.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        encoding (str, optional): "br", "gzip" or "identity". Defaults to "identity".
+        **options: Rotation options as returned by parse_rotation().
+
+    Returns:
+        bytes: The encoded SVG.
+    """
+    key = svg_cache.key(name, version, **options)
+    encoded_key = key if encoding == "identity" else svg_cache.key(name, version, encoding=encoding, **options)
+
+    data = svg_cache.get(encoded_key)
+    if data is not None:
+        return data
+
+    svg = svg_cache.get(key) if encoding != "identity" else None
+    if svg is not None:
+        data = await offload(compress, svg, encoding)
+    else:
+        svg, data = await offload(workers.render, await load_geometry(db, name), version, options, encoding)
+        svg_cache.put(key, svg)
+
+    if encoding != "identity":
+        svg_cache.put(encoded_key, data)
+    return data
+
+def accepted_encoding() -> str:
+    """
+    Picks the content encoding of a response from the request's Accept-Encoding header.
+
+    Returns:
+        str: "br" if brotli is installed and accepted, otherwise "gzip" if accepted, otherwise "identity".
+    """
+    return select_encoding(request.accept_encodings)
+
+async def cached_response(etag: str, content_type: str, max_age: int, encoding: str, body=None) -> Response:
+    """
+    Builds a cacheable response, or a 304 response if the client already has this representation,
+    as server.cached_response() does.
+
+    Args:
+        etag (str): The strong ETag of the representation, as returned by make_etag().
+        content_type (str): The Content-Type of the body.
+        max_age (int): The Cache-Control max-age in seconds.
+        encoding (str): The content encoding of the body, as returned by accepted_encoding().
+        body (coroutine function, optional): Awaited with no arguments to produce the encoded body
+            when the client does not have it. Defaults to None, which only checks If-None-Match.
+
+    Returns:
+        Response: A 304 response if If-None-Match matches etag, a 200 response with the body
+                  otherwise, or None if the client does not have it and no body was given.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(b"", status=304)
+    elif body is None:
+        return None
+    else:
+        response = Response(await body(), content_type=content_type)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    cache_headers(response, etag, max_age)
+    return response
+
+@app.route('/svg/<path:name>', methods=['GET'])
+async def svg(name):
+    """
+    Returns the SVG rendering of a molecule as a cacheable GET response, as server.svg() does.
+
+    Args:
+        name (str): The name of the molecule.
+
+    Returns:
+        Response object: The SVG document with an image/svg+xml content type, or a 304 response.
+    Raises:
+        HTTPException: A 404 error if there is no such molecule, or a 400 error if the rotation is malformed.
+    """
+    options = parse_rotation(request.args)
+
+    db = await get_db()
+    content_hash = await db.content_hash(name)
+    if content_hash is None:
+        abort(404, description="Molecule not found")
+    if options.get("lod") == LOD_AUTO:
+        options = resolve_detail(options, await db.atom_count(name))
+
+    version = await db.elements_version()
+    svg_cache.set_version(version)
+
+    encoding = accepted_encoding()
+    etag = make_etag(content_hash, version, sorted(options.items()), encoding)
+
+    async def body():
+        return await render_svg(db, name, version, encoding, **options)
+    return await cached_response(etag, "image/svg+xml", SVG_MAX_AGE, encoding, body)
+
+@app.route('/get-svg', methods=['POST'])
+async def get_svg():
+    """
+    Returns the SVG rendering of a molecule, optionally rotated on the server, as server.get_svg() does.
+
+    Returns:
+        Response object: The SVG document with an image/svg+xml content type.
+    Raises:
+        HTTPException: A 400 error if the molecule name is not provided or the rotation is malformed,
+                       or a 404 error if there is no such molecule.
+    """
+    data = await request.get_json()
+
+    if not data or "name" not in data:
+        abort(400, description="Molecule name not provided")
+
+    molecule_name = data["name"]
+    options = parse_rotation(data)
+
+    db = await get_db()
+    atom_count = await db.atom_count(molecule_name)
+    if atom_count is None:
+        abort(404, description="Molecule not found")
+    version = await db.elements_version()
+    svg_cache.set_version(version)
+    if options.get("lod") == LOD_AUTO:
+        options = resolve_detail(options, atom_count)
+
+    svg_content = await render_svg(db, molecule_name, version, **options)
+    return svg_content, 200, {"Content-Type": "image/svg+xml"}
+
+@app.route('/get-frames', methods=['POST'])
+async def get_frames():
+    """
+    Returns a sequence of SVG frames of a molecule rotating about one axis, as server.get_frames() does.
+    Frames missing from the render cache are rendered together in one render pool job.
+
+    Returns:
+        Response object: A JSON response with the name, axis, step and the list of SVG frames.
+    Raises:
+        HTTPException: A 400 error if the molecule name is not provided or the frame options are invalid,
+                       or a 404 error if there is no such molecule.
+    """
+    data = await request.get_json()
+
+    if not data or "name" not in data:
+        abort(400, description="Molecule name not provided")
+
+    axis, step, frame_options = parse_frames(data)
+    molecule_name = data["name"]
+
+    db = await get_db()
+    if await db.atom_count(molecule_name) is None:
+        abort(404, description="Molecule not found")
+    version = await db.elements_version()
+    svg_cache.set_version(version)
+
+    keys = [svg_cache.key(molecule_name, version, **options) for options in frame_options]
+    frames = [svg_cache.get(key) for key in keys]
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+
+    if missing:
+        rendered = await offload(workers.render_frames, await load_geometry(db, molecule_name), version,
+                                 [frame_options[i] for i in missing])
+        for i, frame in zip(missing, rendered):
+            frames[i] = frame
+            svg_cache.put(keys[i], frame)
+
+    return jsonify({"name": molecule_name, "axis": axis, "step": step, "frames": [frame.decode() for frame in frames]})
+
+@app.route('/cache-stats', methods=['GET'])
+async def cache_stats():
+    """
+    Returns the statistics of the render cache, geometry cache and render pool as a JSON response.
+
+    Returns:
+        Response object: A JSON response containing the render cache statistics of this process,
+                         with the geometry cache statistics under "molecules" and the render pool
+                         queue depth and job counts under "render_pool".
+    """
+    return jsonify({**svg_cache.stats(), "molecules": geometry_cache.stats(), "render_pool": render_pool.stats()})
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    """
+    Returns the metrics of this server in the Prometheus text exposition format, as server.py does.
+
+    Rendering runs in the render pool, so its stages are reported as a single "render_pool" stage.
+
+    Returns:
+        Response object: The exposition with a text/plain content type.
+    Raises:
+        HTTPException: A 404 error if METRICS_ENABLED is not set.
+    """
+    if not metrics.METRICS_ENABLED:
+        abort(404, description="Metrics are disabled")
+    return Response(metrics.REGISTRY.expose(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 8000)))
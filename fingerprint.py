@@ -0,0 +1,137 @@
+import hashlib
+import numpy as np
+
+# Width of the folded structural fingerprint stored in Molecules.FINGERPRINT
+FINGERPRINT_BITS = 256
+
+# A feature present at least this many times sets one more bit per level, so that the fingerprint
+# also screens minimum counts
+COUNT_LEVELS = (1, 2, 4, 8)
+
+# Bond symbols by number of electron pairs, as in "C=O"
+BOND_SYMBOLS = {1: "-", 2: "=", 3: "#"}
+
+def bond_feature(element1: str, element2: str, epairs: int) -> str:
+    """
+    Returns the name of the bond pattern formed by two elements and a bond order.
+
+    The element codes are put in alphabetical order, so "O-H" and "H-O" name the same pattern.
+
+    Args:
+        element1 (str): The element code of one atom.
+        element2 (str): The element code of the other atom.
+        epairs (int): The number of electron pairs of the bond.
+
+    Returns:
+        str: The pattern name, such as "C=O", or "C~4~O" for orders without a symbol.
+    """
+    if element2 < element1:
+        element1, element2 = element2, element1
+    return element1 + BOND_SYMBOLS.get(epairs, f"~{epairs}~") + element2
+
+def parse_bond(pattern: str) -> str:
+    """
+    Parses a bond pattern such as "C=O" or "O-H" into the name bond_feature() gives it.
+
+    Args:
+        pattern (str): Two element codes joined by "-", "=", "#" or "~n~".
+
+    Returns:
+        str: The normalised pattern name.
+    Raises:
+        ValueError: If the pattern is not two element codes joined by a bond symbol.
+    """
+    for epairs, symbol in BOND_SYMBOLS.items():
+        element1, found, element2 = pattern.partition(symbol)
+        if found and element1.isalpha() and element2.isalpha():
+            return bond_feature(element1, element2, epairs)
+
+    element1, found, rest = pattern.partition("~")
+    epairs, found_end, element2 = rest.partition("~")
+    if found and found_end and epairs.isdigit() and element1.isalpha() and element2.isalpha():
+        return bond_feature(element1, element2, int(epairs))
+    raise ValueError(f"Invalid bond pattern {pattern!r}")
+
+def features(elements, pairs, epairs) -> dict:
+    """
+    Counts the elements and bond patterns of a molecule.
+
+    Args:
+        elements (sequence): The element code of every atom.
+        pairs (array_like): An (m, 2) array of zero-based atom indices.
+        epairs (sequence): The electron pair count of every bond.
+
+    Returns:
+        dict: Maps element codes and bond pattern names, as given by bond_feature(), to their counts.
+    """
+    elements = np.asarray(elements, dtype="U3").reshape(-1)
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    epairs = np.asarray(epairs).reshape(-1)
+
+    codes, inverse, counts = np.unique(elements, return_inverse=True, return_counts=True)
+    result = dict(zip(codes.tolist(), counts.tolist()))
+
+    if len(pairs):
+        # Encode each bond as one integer from its two element indices, lower first, and its order
+        first, second = inverse[pairs[:, 0]], inverse[pairs[:, 1]]
+        low, high = np.minimum(first, second), np.maximum(first, second)
+        keys = (low.astype(np.int64) * len(codes) + high) * 256 + epairs.astype(np.int64)
+        patterns, counts = np.unique(keys, return_counts=True)
+
+        names = codes.tolist()
+        for key, count in zip(patterns.tolist(), counts.tolist()):
+            pair, order = divmod(key, 256)
+            result[bond_feature(names[pair // len(names)], names[pair % len(names)], order)] = count
+
+    return result
+
+def _bit(feature: str, level: int) -> int:
+    digest = hashlib.blake2b(f"{feature}#{level}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % FINGERPRINT_BITS
+
+def fingerprint(counts: dict) -> int:
+    """
+    Folds feature counts into a FINGERPRINT_BITS-bit fingerprint.
+
+    Every feature sets one bit for each of the COUNT_LEVELS it reaches, so a molecule's fingerprint
+    contains the fingerprint of any query asking for at most its counts. Different features may
+    share bits, so containment only screens candidates; exact counts must still be checked.
+
+    Args:
+        counts (dict): Maps features to counts, as returned by features(), or to the minimum counts
+            of a query.
+
+    Returns:
+        int: The fingerprint, bit i of which is bit i of the stored bit string.
+    """
+    value = 0
+    for feature, count in counts.items():
+        for level in COUNT_LEVELS:
+            if count < level:
+                break
+            value |= 1 << _bit(feature, level)
+    return value
+
+def bit_string(value: int) -> str:
+    """
+    Returns a fingerprint as the string of FINGERPRINT_BITS zeros and ones that PostgreSQL reads as a BIT value.
+
+    Args:
+        value (int): A fingerprint as returned by fingerprint().
+
+    Returns:
+        str: The bits, bit 0 first.
+    """
+    return format(value, f"0{FINGERPRINT_BITS}b")[::-1]
+
+def from_bit_string(bits: str) -> int:
+    """
+    Returns the fingerprint held in a string of zeros and ones, as stored by bit_string().
+
+    Args:
+        bits (str): The bits, bit 0 first.
+
+    Returns:
+        int: The fingerprint.
+    """
+    return int(bits[::-1], 2) if bits else 0
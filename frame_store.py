@@ -0,0 +1,193 @@
+import gzip
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from molsql import ConnectionPool, Database
+
+class FrameStore:
+    def __init__(self, pool: ConnectionPool, render, axes: str="xyz", step: int=10, workers: int=1):
+        """
+        Initializes a new FrameStore holding pre-rendered rotation frames in the Frames table.
+
+        A molecule's standard rotation set is every multiple of step degrees about each of the
+        given axes. Frames are keyed by molecule, axis, degree and Elements table version, and
+        are stored gzip-compressed so they can be served without rendering.
+
+        Args:
+            pool (ConnectionPool): The pool background renders check their connections out of.
+            render (callable): Called as render(db, name, version, **options) to render one frame,
+                with options as returned by FrameStore.options().
+            axes (str, optional): The axes of the standard rotation set. Defaults to "xyz".
+            step (int, optional): The step between frames in whole degrees. Defaults to 10.
+            workers (int, optional): The number of background render threads. Defaults to 1.
+        """
+        self.pool = pool
+        self.render = render
+        self.axes = axes
+        self.step = step
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-store")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def frame_key(self, options: dict) -> tuple:
+        """
+        Returns the (axis, degree) key of a render if it belongs to the standard rotation set.
+
+        The unrotated render is stored once, under ("x", 0).
+
+        Args:
+            options (dict): Rotation options as returned by http_common.parse_rotation().
+
+        Returns:
+            tuple: The (axis, degree) key of the frame, or None if the render is not a standard frame.
+        """
+        if not options:
+            return ("x", 0)
+        if len(options) != 1:
+            return None
+
+        option, degree = next(iter(options.items()))
+        if option not in ("rx", "ry", "rz") or option[1] not in self.axes or degree % self.step:
+            return None
+        return (option[1], degree)
+
+    @staticmethod
+    def options(axis: str, degree: int) -> dict:
+        """
+        Returns the rotation options that render the frame with the given key.
+
+        Args:
+            axis (str): The rotation axis, "x", "y" or "z".
+            degree (int): The rotation in whole degrees.
+
+        Returns:
+            dict: Rotation options suitable for the render callable.
+        """
+        return {"r" + axis: degree} if degree else {}
+
+    def frame_keys(self) -> list:
+        """
+        Returns the (axis, degree) keys of the standard rotation set.
+
+        Returns:
+            list: The keys of every standard frame, with the unrotated frame first.
+        """
+        keys = [("x", 0)]
+        for axis in self.axes:
+            keys.extend((axis, degree) for degree in range(self.step, 360, self.step))
+        return keys
+
+    def get(self, db: Database, name: str, version: str, options: dict, compressed: bool=False) -> bytes:
+        """
+        Returns the stored frame for a render, if it is a standard frame that has been stored.
+
+        Args:
+            db (Database): The database to read the frame from.
+            name (str): The name of the molecule.
+            version (str): The current version of the Elements table.
+            options (dict): Rotation options as returned by http_common.parse_rotation().
+            compressed (bool, optional): If True, returns the stored gzip-compressed SVG as is.
+                Defaults to False.
+
+        Returns:
+            bytes: The SVG of the frame, or None if it is not stored.
+        """
+        key = self.frame_key(options)
+        if key is None:
+            return None
+
+        data = db.get_frame(name, key[0], key[1], version)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return data if compressed else gzip.decompress(data)
+
+    def warm(self, name: str):
+        """
+        Renders and stores the standard rotation set of a molecule in a background thread.
+        A molecule already queued for warming is not queued again.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            Future: The background job, or None if the molecule was already queued.
+        """
+        with self._lock:
+            if name in self._pending:
+                return None
+            self._pending.add(name)
+        return self._executor.submit(self._warm, name)
+
+    def warm_all(self) -> list:
+        """
+        Deletes frames rendered with an old version of the Elements table and queues every
+        molecule with an incomplete rotation set for warming.
+
+        Returns:
+            list: The background jobs that were queued.
+        """
+        with self.pool.connection() as db:
+            version = db.elements_version()
+            db.delete_stale_frames(version)
+            names = db.molecules_missing_frames(version, len(self.frame_keys()))
+        return [future for future in map(self.warm, names) if future is not None]
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counts of the frame store along with the number of queued molecules.
+
+        Returns:
+            dict: A dictionary of frame store statistics.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "pending": len(self._pending)}
+
+    def shutdown(self):
+        """
+        Waits for every queued background render to finish.
+        """
+        self._executor.shutdown(wait=True)
+
+    def _warm(self, name: str):
+        """
+        Renders every standard frame of a molecule that is not stored yet and stores them in one transaction.
+        """
+        try:
+            with self.pool.connection() as db:
+                version = db.elements_version()
+                frames = []
+                for axis, degree in self.frame_keys():
+                    if db.get_frame(name, axis, degree, version) is None:
+                        svg = self.render(db, name, version, **self.options(axis, degree))
+                        frames.append((axis, degree, gzip.compress(svg, mtime=0)))
+                if frames:
+                    db.add_frames(name, version, frames)
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+def main(argv: list=None):
+    """
+    Command-line entry point for scheduled runs: warms the named molecules, or every molecule with
+    an incomplete rotation set, using the render settings of the server.
+
+    Args:
+        argv (list, optional): The molecule names. Defaults to None, which uses sys.argv.
+    """
+    import server
+
+    names = sys.argv[1:] if argv is None else argv
+    futures = [server.frame_store.warm(name) for name in names] if names else server.frame_store.warm_all()
+    for future in futures:
+        if future is not None:
+            future.result()
+    print(f"warmed {len(futures)} molecules", file=sys.stderr)
+    server.frame_store.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+import os
+import gzip
+import zlib
+import math
+import json
+import base64
+import hashlib
+import binascii
+from werkzeug.exceptions import abort
+from molsql import MATCH_PREFIX, MATCH_SUBSTRING, SORT_ID, SORT_NAME
+import fingerprint
+import mol_display
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Level of detail of a render request that leaves the choice to resolve_detail()
+LOD_AUTO = "auto"
+
+# Largest pixel width a render request may give for choosing its level of detail
+MAX_PIXELS = 16384
+
+# Largest number of frames /get-frames renders in one request
+MAX_FRAMES = 360
+
+# Cache-Control max-age, in seconds, of GET /svg responses and the molecule list
+SVG_MAX_AGE = int(os.environ.get("SVG_MAX_AGE", 86400))
+MOLECULES_MAX_AGE = int(os.environ.get("MOLECULES_MAX_AGE", 0))
+
+BROTLI_QUALITY = 9
+
+# Default and largest page sizes of /molecules
+MOLECULES_PAGE_SIZE = 50
+MAX_MOLECULES_PAGE_SIZE = 500
+
+# Default lowest Tanimoto similarity of /search?similar= results
+SEARCH_THRESHOLD = 0.7
+
+def sdf_name(sdf_content: str) -> str:
+    """
+    Returns the molecule name of an uploaded SDF file, taken from the line after its <NAME> data item.
+
+    Args:
+        sdf_content (str): The text of the SDF file.
+
+    Returns:
+        str: The molecule name, or an empty string if the file has no <NAME> data item.
+    """
+    found = False
+    name = ""
+    for line in sdf_content.splitlines():
+        if found:
+            name = line.strip()
+            break
+        if "<NAME>" in line:
+            found = True
+    return name
+
+def parse_viewport(data: dict) -> dict:
+    """
+    Extracts the viewport option of a render request.
+
+    A request may give "viewport", the x, y, width and height of the region to render in the
+    screen coordinates of the full render's viewBox, as a list or, in a query string, as four
+    comma-separated numbers. Only the atoms and bonds in that region are rendered.
+
+    Args:
+        data (dict): The JSON body or query string arguments of the request.
+
+    Returns:
+        dict: {"viewport": (x, y, width, height)}, or an empty dict if no viewport was given.
+    Raises:
+        HTTPException: A 400 error if the viewport is malformed.
+    """
+    if "viewport" not in data:
+        return {}
+    try:
+        if isinstance(data["viewport"], str):
+            viewport = tuple(float(value) for value in data["viewport"].split(","))
+        else:
+            viewport = tuple(float(value) for value in data["viewport"])
+    except (TypeError, ValueError):
+        abort(400, description="Viewport must be four numbers: x, y, width and height")
+    if len(viewport) != 4 or not all(math.isfinite(value) for value in viewport) or min(viewport[2:]) <= 0:
+        abort(400, description="Viewport must be four numbers: x, y, width and height")
+    return {"viewport": viewport}
+
+def parse_detail(data: dict) -> dict:
+    """
+    Extracts the level-of-detail options of a render request.
+
+    A request may give "lod", one of mol_display.LOD_LEVELS or "auto", and "px", the pixel width
+    at which the image will be shown. Giving "px" alone also selects "auto", and "auto" alone
+    assumes mol_display.LOD_PIXELS. An automatic level is replaced by a fixed one with
+    resolve_detail() once the atom count of the molecule is known.
+
+    Args:
+        data (dict): The JSON body or query string arguments of the request.
+
+    Returns:
+        dict: {"lod": level} for a level below full detail, {"lod": "auto", "px": pixels} for an
+              automatic level, or an empty dict for full detail.
+    Raises:
+        HTTPException: A 400 error if the level or the pixel width is invalid.
+    """
+    if "lod" not in data and "px" not in data:
+        return {}
+
+    level = data.get("lod", LOD_AUTO)
+    if level != LOD_AUTO:
+        if level not in mol_display.LOD_LEVELS:
+            abort(400, description="Level of detail must be auto or one of " + ", ".join(mol_display.LOD_LEVELS))
+        return {} if level == mol_display.LOD_FULL else {"lod": level}
+
+    try:
+        pixels = int(data.get("px", mol_display.LOD_PIXELS))
+    except (TypeError, ValueError):
+        abort(400, description="Pixel width must be a whole number")
+    if not 0 < pixels <= MAX_PIXELS:
+        abort(400, description=f"Pixel width must be between 1 and {MAX_PIXELS}")
+    return {"lod": LOD_AUTO, "px": pixels}
+
+def resolve_detail(options: dict, atom_count: int) -> dict:
+    """
+    Replaces an automatic level of detail with the one mol_display.choose_detail() picks.
+
+    Render options are resolved before they key the render cache and the ETag, so every pixel width
+    that picks the same level shares one cached render.
+
+    Args:
+        options (dict): Render options as returned by parse_rotation().
+        atom_count (int): The number of atoms in the molecule, or None if there is no such molecule.
+
+    Returns:
+        dict: The options with a fixed level of detail, or none for full detail.
+    """
+    if options.get("lod") != LOD_AUTO:
+        return options
+
+    resolved = {option: value for option, value in options.items() if option not in ("lod", "px")}
+    level = mol_display.choose_detail(atom_count or 0, options["px"])
+    if level != mol_display.LOD_FULL:
+        resolved["lod"] = level
+    return resolved
+
+def parse_rotation(data: dict) -> dict:
+    """
+    Extracts the rotation, viewport and level-of-detail options of a render request.
+
+    A request may give whole-degree rotations about the x, y and z axes as "rx", "ry" and "rz",
+    which are applied in that order, or an arbitrary 3x3 transformation as "matrix", but not both.
+    In a query string the matrix is given as nine comma-separated numbers in row-major order.
+    A "viewport" is parsed by parse_viewport() and applies after the rotation, and the level of
+    detail is parsed by parse_detail().
+
+    Args:
+        data (dict): The JSON body or query string arguments of the request.
+
+    Returns:
+        dict: Render options suitable for render_svg() and RenderCache.key().
+    Raises:
+        HTTPException: A 400 error if the rotation, viewport or level of detail is malformed.
+    """
+    if "matrix" in data:
+        if any(axis in data for axis in ("rx", "ry", "rz")):
+            abort(400, description="Give either rotation angles or a matrix, not both")
+        try:
+            if isinstance(data["matrix"], str):
+                matrix = tuple(float(value) for value in data["matrix"].split(","))
+            else:
+                matrix = tuple(float(value) for row in data["matrix"] for value in row)
+        except (TypeError, ValueError):
+            abort(400, description="Matrix must be a 3x3 list of numbers")
+        if len(matrix) != 9:
+            abort(400, description="Matrix must be a 3x3 list of numbers")
+        return {"matrix": matrix, **parse_viewport(data), **parse_detail(data)}
+
+    try:
+        rotation = {axis: int(data.get(axis, 0)) % 360 for axis in ("rx", "ry", "rz")}
+    except (TypeError, ValueError):
+        abort(400, description="Rotation angles must be whole degrees")
+    options = {axis: deg for axis, deg in rotation.items() if deg}
+    options.update(parse_viewport(data))
+    options.update(parse_detail(data))
+    return options
+
+def parse_frames(data: dict) -> list:
+    """
+    Extracts the rotation options of every frame of a /get-frames request.
+
+    Args:
+        data (dict): The JSON body of the request, with optional "axis", "step" and "count".
+
+    Returns:
+        list: The axis, the step and a list of rotation options, one per frame.
+    Raises:
+        HTTPException: A 400 error if the frame options are invalid.
+    """
+    axis = data.get("axis", "y")
+    if axis not in ("x", "y", "z"):
+        abort(400, description="Axis must be x, y or z")
+    try:
+        step = int(data.get("step", 10))
+        count = int(data.get("count", 360 // step if step > 0 else 0))
+    except (TypeError, ValueError):
+        abort(400, description="Step and count must be whole numbers")
+    if step <= 0 or not 0 < count <= MAX_FRAMES:
+        abort(400, description=f"Step must be positive and count between 1 and {MAX_FRAMES}")
+
+    frames = []
+    for i in range(count):
+        deg = (i * step) % 360
+        frames.append({"r" + axis: deg} if deg else {})
+    return axis, step, frames
+
+def encode_cursor(sort: str, key) -> str:
+    """
+    Encodes the sort key of the last molecule of a page as an opaque /molecules cursor.
+
+    Args:
+        sort (str): The sort order of the listing, SORT_ID or SORT_NAME.
+        key (int or str): The MOLECULE_ID or NAME of the last molecule of the page.
+
+    Returns:
+        str: A URL-safe cursor, or None if key is None.
+    """
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps([sort, key]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    Decodes a cursor returned by encode_cursor() back to a sort key.
+
+    Args:
+        cursor (str): The cursor from the query string.
+        sort (str): The sort order of the listing the cursor is used with.
+
+    Returns:
+        int or str: The sort key of the last molecule of the previous page.
+    Raises:
+        HTTPException: A 400 error if the cursor is malformed or belongs to another sort order.
+    """
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        abort(400, description="Malformed cursor")
+    if cursor_sort != sort or not isinstance(key, int if sort == SORT_ID else str):
+        abort(400, description="Cursor does not match the sort order")
+    return key
+
+def parse_listing(args: dict) -> dict:
+    """
+    Extracts the paging and search options of a /molecules request.
+
+    Args:
+        args (MultiDict): The query string arguments of the request.
+
+    Returns:
+        dict: The "limit", "query", "match", "sort" and raw "cursor" of the request, and "after",
+              the decoded cursor or None on the first page.
+    Raises:
+        HTTPException: A 400 error if the limit, match mode, sort order or cursor is malformed.
+    """
+    limit = args.get("limit", MOLECULES_PAGE_SIZE, type=int)
+    match = args.get("match", MATCH_SUBSTRING)
+    sort = args.get("sort", SORT_ID)
+    cursor = args.get("cursor")
+
+    if limit is None or not 1 <= limit <= MAX_MOLECULES_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_MOLECULES_PAGE_SIZE}")
+    if match not in (MATCH_PREFIX, MATCH_SUBSTRING):
+        abort(400, description="match must be 'prefix' or 'substring'")
+    if sort not in (SORT_ID, SORT_NAME):
+        abort(400, description="sort must be 'id' or 'name'")
+
+    return {"limit": limit, "query": args.get("q", "").strip(), "match": match, "sort": sort,
+            "cursor": cursor, "after": decode_cursor(cursor, sort) if cursor else None}
+
+def listing_page(rows: list, following, sort: str) -> dict:
+    """
+    Builds the JSON body of a /molecules page.
+
+    Args:
+        rows (list): The (name, atom count, bond count) tuples of the page.
+        following (int or str): The sort key of the last molecule, or None on the last page.
+        sort (str): The sort order of the listing.
+
+    Returns:
+        dict: The "molecules" of the page and the "next" cursor.
+    """
+    return {
+        "molecules": [{"NAME": name, "ATOM_COUNT": atom_count, "BOND_COUNT": bond_count}
+                      for name, atom_count, bond_count in rows],
+        "next": encode_cursor(sort, following)
+    }
+
+def parse_count_range(text: str) -> tuple:
+    """
+    Parses the count range of a /search constraint: "n" (exactly n), "n-" (at least n), "-m"
+    (at most m) or "n-m".
+
+    Args:
+        text (str): The range.
+
+    Returns:
+        tuple: The minimum and the maximum count, where a maximum of None means unbounded.
+    Raises:
+        ValueError: If the range is malformed or empty.
+    """
+    low, dash, high = text.partition("-")
+    minimum = int(low) if low else 0
+    maximum = int(high) if high else (None if dash else minimum)
+    if minimum < 0 or (maximum is not None and maximum < minimum):
+        raise ValueError(f"Invalid count range {text!r}")
+    return minimum, maximum
+
+def parse_search(args: dict) -> dict:
+    """
+    Extracts the constraints and paging options of a /search request.
+
+    "elements" is a comma-separated list of element codes, each optionally followed by ":" and a
+    count range as accepted by parse_count_range(), such as "S:2-,C:1-6"; a bare code means at least
+    one. "bonds" lists bond patterns the same way, such as "C=O,O-H:2-".
+
+    Args:
+        args (MultiDict): The query string arguments of the request.
+
+    Returns:
+        dict: The "constraints", mapping features to (minimum, maximum) counts, the "similar"
+              molecule name or None, the "threshold", the "limit", the raw "cursor" and "after",
+              the decoded cursor or None on the first page.
+    Raises:
+        HTTPException: A 400 error if a constraint, the threshold, the limit or the cursor is
+                       malformed, or if the request has neither constraints nor a similar molecule.
+    """
+    constraints = {}
+    for parameter, parse_feature in (("elements", str.strip), ("bonds", fingerprint.parse_bond)):
+        for term in filter(None, (term.strip() for term in args.get(parameter, "").split(","))):
+            feature, colon, counts = term.rpartition(":")
+            if not colon:
+                feature, counts = term, "1-"
+            try:
+                feature = parse_feature(feature)
+                if not feature.isalpha() and parameter == "elements":
+                    raise ValueError(f"Invalid element code {feature!r}")
+                constraints[feature] = parse_count_range(counts)
+            except ValueError as error:
+                abort(400, description=str(error))
+
+    similar = args.get("similar", "").strip() or None
+    threshold = args.get("threshold", SEARCH_THRESHOLD, type=float)
+    limit = args.get("limit", MOLECULES_PAGE_SIZE, type=int)
+    cursor = args.get("cursor")
+
+    if not constraints and similar is None:
+        abort(400, description="Give elements, bonds or a similar molecule to search for")
+    if threshold is None or not 0.0 < threshold <= 1.0:
+        abort(400, description="threshold must be greater than 0 and at most 1")
+    if limit is None or not 1 <= limit <= MAX_MOLECULES_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_MOLECULES_PAGE_SIZE}")
+    if cursor and similar is not None:
+        abort(400, description="Similarity searches return a single page")
+
+    return {"constraints": constraints, "similar": similar, "threshold": threshold, "limit": limit,
+            "cursor": cursor, "after": decode_cursor(cursor, SORT_ID) if cursor else None}
+
+def search_page(rows: list, following) -> dict:
+    """
+    Builds the JSON body of a /search page.
+
+    Args:
+        rows (list): The (name, atom count, bond count, similarity) tuples of the page.
+        following (int): The MOLECULE_ID of the last molecule, or None on the last page.
+
+    Returns:
+        dict: The "molecules" of the page, with their "SIMILARITY" in similarity searches, and the
+              "next" cursor.
+    """
+    molecules = []
+    for name, atom_count, bond_count, similarity in rows:
+        molecule = {"NAME": name, "ATOM_COUNT": atom_count, "BOND_COUNT": bond_count}
+        if similarity is not None:
+            molecule["SIMILARITY"] = round(similarity, 4)
+        molecules.append(molecule)
+    return {"molecules": molecules, "next": encode_cursor(SORT_ID, following)}
+
+def select_encoding(accept_encodings, streamed: bool=False) -> str:
+    """
+    Picks the content encoding of a response from the request's Accept-Encoding header.
+
+    Args:
+        accept_encodings (MIMEAccept): The parsed Accept-Encoding header of the request.
+        streamed (bool, optional): Whether the body will be compressed by compress_stream(), which
+            does not support brotli. Defaults to False.
+
+    Returns:
+        str: "br" if brotli is installed and accepted, otherwise "gzip" if accepted, otherwise "identity".
+    """
+    if brotli is not None and accept_encodings["br"] and not streamed:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return "identity"
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compresses a response body with the given content encoding.
+
+    Args:
+        data (bytes): The uncompressed body.
+        encoding (str): "br", "gzip" or "identity".
+
+    Returns:
+        bytes: The encoded body.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, mtime=0)
+    return data
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compresses a response body that is produced in chunks, as it is produced.
+
+    The compressed chunks join up to exactly the bytes compress() returns for the whole body, so
+    both can be served under the same ETag.
+
+    Args:
+        chunks (iterable): The uncompressed body, as bytes chunks.
+        encoding (str): "gzip" or "identity".
+
+    Yields:
+        bytes: Consecutive pieces of the encoded body.
+    Raises:
+        ValueError: If the encoding cannot be streamed.
+    """
+    if encoding == "identity":
+        yield from chunks
+        return
+    if encoding != "gzip":
+        raise ValueError(f"compress_stream(): cannot stream {encoding} bodies")
+
+    # The settings of gzip.compress(data, mtime=0): level 9 and a gzip header and trailer
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def make_etag(*parts) -> str:
+    """
+    Builds a strong ETag from the given parts, which must identify the exact bytes of a response.
+
+    Returns:
+        str: The ETag, without quotes.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+def cache_headers(response, etag: str, max_age: int):
+    """
+    Sets the ETag, Cache-Control and Vary headers of a cacheable response.
+
+    Args:
+        response (Response): The response to update.
+        etag (str): The strong ETag of the representation, as returned by make_etag().
+        max_age (int): The Cache-Control max-age in seconds.
+    """
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    response.headers["Vary"] = "Accept-Encoding"
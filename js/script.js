@@ -29,73 +29,150 @@ form.addEventListener('submit', function(event) {
     .catch(error => console.error(error))
 })
 
+// Molecule table, loaded a page at a time from /molecules as the end of the list scrolls into view
+const PAGE_SIZE = 50;
+const SEARCH_DELAY = 250;
+
+const moleculeTable = document.getElementById("molecule-select-table");
+const listEnd = document.getElementById("molecule-list-end");
+const searchInput = document.getElementById("molecule-search");
+
+let nextCursor = null;
+let listComplete = false;
+let loading = false;
+let listGeneration = 0;
+
+function visualizeMolecule(name) {
+    fetch("/svg/" + encodeURIComponent(name))
+    .then(response => {
+        if (response.ok) {
+            return response.text();
+        } else {
+            throw new Error("Failed to fetch SVG");
+        }
+    })
+    .then(svg => {
+        const svgContainer = document.getElementById("svg-container");
+        const parser = new DOMParser();
+        const svgDoc = parser.parseFromString(svg, "image/svg+xml");
+        
+        const serializer = new XMLSerializer();
+        const modifiedSvg = serializer.serializeToString(svgDoc.documentElement);
+        
+        svgContainer.innerHTML = modifiedSvg;
+    })
+    .catch(error => console.error(error));
+}
+
+function appendMoleculeRow(molecule) {
+    const row = document.createElement("tr");
+
+    const nameCell = document.createElement("td");
+    nameCell.textContent = molecule.NAME;
+
+    const atomCell = document.createElement("td");
+    atomCell.textContent = molecule.ATOM_COUNT ?? "";
+
+    const bondCell = document.createElement("td");
+    bondCell.textContent = molecule.BOND_COUNT ?? "";
+
+    const visualizeCell = document.createElement("td");
+    
+    const visualizeButton = document.createElement("button");
+    visualizeButton.textContent = "Visualize";
+    visualizeButton.classList.add("visualize-button");
+    visualizeButton.addEventListener("click", () => visualizeMolecule(molecule.NAME));
+
+    visualizeCell.appendChild(visualizeButton);
+    row.appendChild(nameCell);
+    row.appendChild(atomCell);
+    row.appendChild(bondCell);
+    row.appendChild(visualizeCell);
+    moleculeTable.appendChild(row);
+}
+
+function listEndVisible() {
+    return listEnd.getBoundingClientRect().top <= window.innerHeight;
+}
+
+function loadNextPage() {
+    if (loading || listComplete) {
+        return;
+    }
+    loading = true;
+
+    const generation = listGeneration;
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    const query = searchInput.value.trim();
+    if (query) {
+        params.set("q", query);
+    }
+    if (nextCursor) {
+        params.set("cursor", nextCursor);
+    }
+
+    let loaded = false;
+    fetch("/molecules?" + params.toString())
+        .then(response => {
+            if (response.ok) {
+                return response.json();
+            } else {
+                throw new Error("Failed to fetch molecules");
+            }
+        })
+        .then(page => {
+            // A newer search replaced the list while this page was loading
+            if (generation !== listGeneration) {
+                return;
+            }
+            page.molecules.forEach(appendMoleculeRow);
+            nextCursor = page.next;
+            listComplete = page.next === null;
+            loaded = true;
+        })
+        .catch(error => console.error(error))
+        .finally(() => {
+            if (generation !== listGeneration) {
+                return;
+            }
+            loading = false;
+            // The observer only fires on changes, so keep filling a list that is shorter than the window.
+            // After a failed page the observer or the next search retries instead.
+            if (loaded && !listComplete && listEndVisible()) {
+                loadNextPage();
+            }
+        });
+}
+
 // Create molecule table
 function fetchMoleculesAndUpdateTable() {
-    const moleculeTable = document.getElementById("molecule-select-table");
+    listGeneration++;
+    nextCursor = null;
+    listComplete = false;
+    loading = false;
+
     moleculeTable.innerHTML = "";
-    fetch("/get-molecules")
-        .then(response => response.json())
-        .then(molecules => {
-            const headerRow = document.createElement("tr");
-
-            const nameHeader = document.createElement("th");
-            nameHeader.textContent = "Name";
-
-            const selectHeader = document.createElement("th");
-            selectHeader.textContent = "Visualize";
-
-            headerRow.appendChild(nameHeader);
-            headerRow.appendChild(selectHeader);
-            moleculeTable.appendChild(headerRow);
-
-            molecules.forEach(molecule => {
-                const row = document.createElement("tr");
-
-                const nameCell = document.createElement("td");
-                nameCell.textContent = molecule.NAME;
-
-                const visualizeCell = document.createElement("td");
-                
-                const visualizeButton = document.createElement("button");
-                visualizeButton.textContent = "Visualize";
-                visualizeButton.classList.add("visualize-button");
-
-                visualizeButton.addEventListener("click", () => {
-                    fetch("/get-svg", {
-                        method: "POST",
-                        headers: {
-                            "Content-Type": "application/json"
-                        },
-                        body: JSON.stringify({ name: molecule.NAME })
-                    })
-                    .then(response => {
-                        if (response.ok) {
-                            return response.text();
-                        } else {
-                            throw new Error("Failed to fetch SVG");
-                        }
-                    })
-                    .then(svg => {
-                        const svgContainer = document.getElementById("svg-container");
-                        const parser = new DOMParser();
-                        const svgDoc = parser.parseFromString(svg, "image/svg+xml");
-                        
-                        const serializer = new XMLSerializer();
-                        const modifiedSvg = serializer.serializeToString(svgDoc.documentElement);
-                        
-                        svgContainer.innerHTML = modifiedSvg;
-                    })
-                    .catch(error => console.error(error));
-                });
-
-                visualizeCell.appendChild(visualizeButton);
-                row.appendChild(nameCell);
-                row.appendChild(visualizeCell);
-                moleculeTable.appendChild(row);
-            })
-        })
-        .catch(error => console.error(error));
+    const headerRow = document.createElement("tr");
+    ["Name", "Atoms", "Bonds", "Visualize"].forEach(title => {
+        const header = document.createElement("th");
+        header.textContent = title;
+        headerRow.appendChild(header);
+    });
+    moleculeTable.appendChild(headerRow);
+
+    loadNextPage();
 }
 
-fetchMoleculesAndUpdateTable();
+new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) {
+        loadNextPage();
+    }
+}).observe(listEnd);
+
+let searchTimer = null;
+searchInput.addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(fetchMoleculesAndUpdateTable, SEARCH_DELAY);
+});
 
+fetchMoleculesAndUpdateTable();
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+import contextvars
+
+# Instrumentation is on when the /metrics endpoint or the slow-request log is enabled; otherwise
+# stage() returns a shared no-op context manager and nothing is recorded.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.environ["SLOW_REQUEST_MS"]) if os.environ.get("SLOW_REQUEST_MS") else None
+enabled = METRICS_ENABLED or SLOW_REQUEST_MS is not None
+
+# Histogram bucket upper bounds: latencies in seconds, molecule sizes in atoms or bonds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+
+logger = logging.getLogger("molvis.slow_requests")
+
+INF = 'le="+Inf"'
+
+def _labels(labelnames: tuple, labelvalues: tuple, extra: str="") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple=(), buckets: tuple=LATENCY_BUCKETS):
+        """
+        Initializes a new Histogram counting observations into cumulative buckets, one series per
+        combination of label values.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text of the metric.
+            labelnames (tuple, optional): The names of the labels. Defaults to no labels.
+            buckets (tuple, optional): The bucket upper bounds in ascending order. Defaults to LATENCY_BUCKETS.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value.
+            *labelvalues: The value of each label, in the order of labelnames.
+        """
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def expose(self) -> list:
+        """
+        Returns the lines of this histogram in the Prometheus text format.
+
+        Returns:
+            list: The HELP, TYPE and sample lines.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labelvalues, list(counts), total, count)
+                      for labelvalues, (counts, total, count) in sorted(self._series.items())]
+
+        for labelvalues, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, INF)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        """
+        Initializes a new Registry of histograms and of collectors that report gauges and counters
+        read from other objects, such as cache and pool statistics, when the registry is exposed.
+        """
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple=(), buckets: tuple=LATENCY_BUCKETS) -> Histogram:
+        """
+        Creates and registers a new Histogram. See Histogram for the arguments.
+
+        Returns:
+            Histogram: The new histogram.
+        """
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Registers a callable that is called whenever the registry is exposed.
+
+        Args:
+            collector (callable): Called with no arguments; returns a list of
+                (name, type, documentation, samples) tuples, where type is "gauge" or "counter"
+                and samples is a list of (labels dict, value) pairs.
+        """
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        """
+        Returns every registered metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, one line per sample.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines += metric.expose()
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("molvis_stage_seconds", "Time spent in each stage of request handling.", ("stage",))
+QUERY_SECONDS = REGISTRY.histogram("molvis_db_query_seconds", "Duration of database statements by statement type.", ("statement",))
+REQUEST_SECONDS = REGISTRY.histogram("molvis_http_request_seconds", "Duration of HTTP requests by route and status.",
+                                     ("method", "route", "status"))
+MOLECULE_ATOMS = REGISTRY.histogram("molvis_rendered_molecule_atoms", "Number of atoms of each rendered molecule.",
+                                    buckets=SIZE_BUCKETS)
+MOLECULE_BONDS = REGISTRY.histogram("molvis_rendered_molecule_bonds", "Number of bonds of each rendered molecule.",
+                                    buckets=SIZE_BUCKETS)
+
+# Stage and query breakdown of the request being handled in the current thread or task
+_request = contextvars.ContextVar("molvis_request", default=None)
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+_NOOP = contextlib.nullcontext()
+
+def stage(name: str):
+    """
+    Returns a context manager that times its block as the given stage.
+
+    Args:
+        name (str): The stage name, used as the "stage" label.
+
+    Returns:
+        A context manager, or a shared no-op one when instrumentation is disabled.
+    """
+    return _Stage(name) if enabled else _NOOP
+
+def record_stage(name: str, seconds: float):
+    """
+    Records the duration of a stage in the stage histogram and in the current request's breakdown.
+
+    Args:
+        name (str): The stage name.
+        seconds (float): The duration of the stage.
+    """
+    STAGE_SECONDS.observe(seconds, name)
+    breakdown = _request.get()
+    if breakdown is not None:
+        breakdown["stages"][name] = breakdown["stages"].get(name, 0.0) + seconds
+
+def record_query(statement, seconds: float):
+    """
+    Records the duration of a database statement, labelled with its first keyword.
+
+    Args:
+        statement (str or bytes): The statement text.
+        seconds (float): The duration of the statement.
+    """
+    if isinstance(statement, bytes):
+        statement = statement[:16].decode("ascii", "replace")
+    kind = statement.split(None, 1)[0].upper() if isinstance(statement, str) and statement.strip() else "OTHER"
+    QUERY_SECONDS.observe(seconds, kind)
+
+    breakdown = _request.get()
+    if breakdown is not None:
+        breakdown["queries"] += 1
+        breakdown["query_seconds"] += seconds
+
+def record_molecule(atom_no: int, bond_no: int):
+    """
+    Records the size of a rendered molecule.
+
+    Args:
+        atom_no (int): The number of atoms.
+        bond_no (int): The number of bonds.
+    """
+    MOLECULE_ATOMS.observe(atom_no)
+    MOLECULE_BONDS.observe(bond_no)
+
+def begin_request():
+    """
+    Starts collecting the stage breakdown of a request in the current context.
+
+    Returns:
+        tuple: A token to pass to end_request(), or None when instrumentation is disabled.
+    """
+    if not enabled:
+        return None
+    return _request.set({"stages": {}, "queries": 0, "query_seconds": 0.0}), time.perf_counter()
+
+def end_request(token, method: str, route: str, status: int, path: str=None):
+    """
+    Records the duration of a request and logs its stage breakdown if it was slower than SLOW_REQUEST_MS.
+
+    Args:
+        token (tuple): The token returned by begin_request().
+        method (str): The HTTP method.
+        route (str): The matched route rule, used as a label so that paths do not create new series.
+        status (int): The response status code.
+        path (str, optional): The request path, included in the slow-request log. Defaults to None.
+    """
+    if token is None:
+        return
+    context_token, start = token
+    seconds = time.perf_counter() - start
+    breakdown = _request.get()
+    _request.reset(context_token)
+
+    REQUEST_SECONDS.observe(seconds, method, route, status)
+
+    if SLOW_REQUEST_MS is not None and seconds * 1000 >= SLOW_REQUEST_MS:
+        logger.warning("slow request %s", json.dumps({
+            "method": method, "path": path or route, "status": status, "ms": round(seconds * 1000, 3),
+            "queries": breakdown["queries"], "query_ms": round(breakdown["query_seconds"] * 1000, 3),
+            "stages": {name: round(value * 1000, 3) for name, value in breakdown["stages"].items()},
+        }))
+
+def cache_samples(name: str, stats: dict) -> list:
+    """
+    Converts the statistics of a RenderCache, MoleculeCache or FrameStore to collector samples.
+
+    Args:
+        name (str): The cache name, used as the "cache" label.
+        stats (dict): The statistics returned by the cache's stats() method.
+
+    Returns:
+        list: (metric name, labels, value) tuples for the hits, misses, hit ratio and size.
+    """
+    labels = {"cache": name}
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    samples = [("molvis_cache_hits_total", labels, stats.get("hits", 0)),
+               ("molvis_cache_misses_total", labels, stats.get("misses", 0)),
+               ("molvis_cache_hit_ratio", labels, stats.get("hits", 0) / lookups if lookups else 0.0)]
+    if "entries" in stats:
+        samples.append(("molvis_cache_entries", labels, stats["entries"]))
+    if "bytes" in stats:
+        samples.append(("molvis_cache_bytes", labels, stats["bytes"]))
+    return samples
+
+CACHE_METRICS = [("molvis_cache_hits_total", "counter", "Cache lookups that were hits."),
+                 ("molvis_cache_misses_total", "counter", "Cache lookups that were misses."),
+                 ("molvis_cache_hit_ratio", "gauge", "Fraction of cache lookups that were hits."),
+                 ("molvis_cache_entries", "gauge", "Number of entries held by the cache."),
+                 ("molvis_cache_bytes", "gauge", "Number of bytes held by the cache.")]
+
+def cache_collector(caches: dict):
+    """
+    Returns a collector reporting the statistics of the given caches.
+
+    Args:
+        caches (dict): Maps cache names to zero-argument callables returning their stats().
+
+    Returns:
+        callable: A collector for Registry.add_collector().
+    """
+    def collect():
+        samples = [sample for name, stats in caches.items() for sample in cache_samples(name, stats())]
+        return [(name, kind, documentation, [(labels, value) for sample_name, labels, value in samples
+                                             if sample_name == name])
+                for name, kind, documentation in CACHE_METRICS]
+    return collect
@@ -0,0 +1,131 @@
+import sys
+import argparse
+from molsql import Database
+import fingerprint
+
+def migrate(db: Database, batch_size: int=100, drop_rows: bool=False, progress=None) -> int:
+    """
+    Converts every molecule stored as Atoms and Bonds rows to packed geometry in its Molecules row.
+
+    Molecules are converted batch_size at a time with Database.pack_molecule(), committing once per
+    batch, so an interrupted run can be resumed and only repeats the batch it was working on.
+    Aliases share the geometry of their original and are skipped. The run stops early if a batch
+    converts nothing, so rows pack_molecule() cannot convert are not selected forever.
+
+    Args:
+        db (Database): The database to migrate.
+        batch_size (int, optional): The number of molecules converted per transaction. Defaults to 100.
+        drop_rows (bool, optional): If True, deletes the normalized rows of every converted molecule.
+            Defaults to False.
+        progress (callable, optional): Called with the running count of converted molecules after
+            every batch. Defaults to None.
+
+    Returns:
+        int: The number of molecules converted.
+    """
+    converted = 0
+    while True:
+        db.cursor.execute("""SELECT NAME FROM Molecules WHERE GEOMETRY IS NULL AND ALIAS_OF IS NULL
+                             ORDER BY MOLECULE_ID LIMIT %s""", (batch_size,))
+        names = [row[0] for row in db.cursor.fetchall()]
+        if not names:
+            break
+
+        before = converted
+        try:
+            for name in names:
+                converted += db.pack_molecule(name, drop_rows=drop_rows)
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+            raise
+
+        if progress is not None:
+            progress(converted)
+        if converted == before:
+            break
+
+    return converted
+
+def hash_structures(db: Database, batch_size: int=100, progress=None) -> int:
+    """
+    Computes the STRUCTURE_HASH, the search features and the fingerprint of every molecule added
+    before they were stored, so that later uploads of the same structures are stored as aliases of
+    them and /search can find them.
+
+    Molecules are hashed batch_size at a time, committing once per batch. Existing duplicates are
+    left as they are.
+
+    Args:
+        db (Database): The database to update.
+        batch_size (int, optional): The number of molecules hashed per transaction. Defaults to 100.
+        progress (callable, optional): Called with the running count of hashed molecules after
+            every batch. Defaults to None.
+
+    Returns:
+        int: The number of molecules hashed.
+    """
+    hashed = 0
+    while True:
+        db.cursor.execute("""SELECT MOLECULE_ID, NAME FROM Molecules
+                             WHERE STRUCTURE_HASH IS NULL OR FINGERPRINT IS NULL
+                             ORDER BY MOLECULE_ID LIMIT %s""", (batch_size,))
+        rows = db.cursor.fetchall()
+        if not rows:
+            break
+
+        try:
+            for mol_id, name in rows:
+                mol = db.load_mol(name)
+                elements, _ = mol.atom_arrays()
+                pairs, epairs = mol.bond_arrays()
+                counts = fingerprint.features(elements, pairs, epairs)
+                bits = fingerprint.fingerprint(counts)
+
+                db.cursor.execute("""UPDATE Molecules SET STRUCTURE_HASH = COALESCE(STRUCTURE_HASH, %s),
+                                     FINGERPRINT = %s, FINGERPRINT_COUNT = %s WHERE MOLECULE_ID = %s""",
+                                  (mol.structure_hash(), fingerprint.bit_string(bits), bits.bit_count(), mol_id))
+                if counts:
+                    db.cursor.execute("""INSERT INTO MoleculeFeatures (MOLECULE_ID, FEATURE, COUNT)
+                                         SELECT %s, * FROM unnest(%s::text[], %s::int[]) ON CONFLICT DO NOTHING""",
+                                      (mol_id, list(counts), list(counts.values())))
+                hashed += 1
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+            raise
+
+        if progress is not None:
+            progress(hashed)
+
+    return hashed
+
+def main(argv: list=None):
+    """
+    Command-line entry point: migrates the database named by DATABASE_URL to packed geometry.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to None, which uses sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Convert normalized atom and bond rows to packed geometry.")
+    parser.add_argument("--batch-size", type=int, default=100, help="molecules converted per transaction")
+    parser.add_argument("--drop-rows", action="store_true", help="delete the normalized rows once converted")
+    parser.add_argument("--hash-structures", action="store_true",
+                        help="only compute the structure hashes and search features of molecules added before they were stored")
+    args = parser.parse_args(argv)
+
+    db = Database(reset=False)
+    db.create_tables()
+
+    if args.hash_structures:
+        hashed = hash_structures(db, batch_size=args.batch_size,
+                                 progress=lambda count: print(f"{count} molecules hashed", file=sys.stderr))
+        print(f"done, {hashed} molecules hashed", file=sys.stderr)
+        return
+
+    converted = migrate(db, batch_size=args.batch_size, drop_rows=args.drop_rows,
+                        progress=lambda count: print(f"{count} molecules converted", file=sys.stderr))
+    print(f"done, {converted} molecules converted", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,403 @@
-from molecule import molecule
-import re
-from xml.etree import ElementTree
+from molecule import molecule, spatial_grid, ATOM_SIZE, BOND_SIZE, SDF_PERCEIVE_BONDS
+from types import MappingProxyType
+import time
+import hashlib
+import numpy as np
+import metrics
 
 # CONSTANTS
-RADIUS = None
-ELEMENT_NAME = None
+SVG_TAG = """<svg version="1.1" width="1000" height="1000" xmlns="http://www.w3.org/2000/svg" viewBox="{}">\n"""
 
-HEADER = """<svg version="1.1" width="1000" height="1000" xmlns="http://www.w3.org/2000/svg">\n"""
- 
 FOOTER = """</svg>"""
 
+GRADIENT = """\t<radialGradient id="{}" cx="-50%" cy="-50%" r="220%" fx="20%" fy="20%">\n\t\t<stop offset="0%" stop-color="#{}"/>\n\t\t<stop offset="50%" stop-color="#{}"/>\n\t\t<stop offset="100%" stop-color="#{}"/>\n\t</radialGradient>\n"""
+
 OFFSET_X = 500 
 OFFSET_Y = 500
 
+# Screen units per unit of molecule coordinates
+SCALE = 100.0
+
+# Padding added around the outermost atom centres by the viewBox
+VIEWBOX_PADDING = 100
+
+# Edge length, in molecule coordinates, of the grid cells used to find the atoms in a viewport
+GRID_CELL = 2.0
+
+# Levels of detail of a render, from the most to the least detailed
+LOD_FULL = "full"
+LOD_NO_LABELS = "no-labels"
+LOD_NO_HYDROGENS = "no-hydrogens"
+LOD_BACKBONE = "backbone"
+LOD_OVERVIEW = "overview"
+LOD_LEVELS = (LOD_FULL, LOD_NO_LABELS, LOD_NO_HYDROGENS, LOD_BACKBONE, LOD_OVERVIEW)
+
+# The limits of each level chosen by choose_detail(): the fewest square pixels of the image per atom,
+# and the most atoms. Renders beyond the limits of every level are overviews
+LOD_LIMITS = ((LOD_FULL, 2500, 2000), (LOD_NO_LABELS, 400, 10000),
+              (LOD_NO_HYDROGENS, 100, 25000), (LOD_BACKBONE, 9, 250000))
+
+# Pixel width assumed by choose_detail() when none is requested, the width given by SVG_TAG
+LOD_PIXELS = 1000
+
+# Atoms and bonds formatted per chunk of a streamed render, see Molecule.svg_chunks()
+SVG_CHUNK_ELEMENTS = 4096
+
+# Bins along the longer side of the viewBox of an overview
+OVERVIEW_BINS = 64
+
+# Stroke widths, in screen units, of the bonds and of the atom dots of a backbone render
+BACKBONE_BOND_WIDTH = 20
+BACKBONE_ATOM_WIDTH = 40
+
+# Decimal places of coordinates compared by structure_hash(), the precision of Atoms.X, Y and Z
+COORDINATE_DECIMALS = 4
+
+# Layouts of the C atom and bond structs, for zero-copy views of a molecule's arrays
+ATOM_DTYPE = np.dtype([("element", "S3"), ("x", "f8"), ("y", "f8"), ("z", "f8")], align=True)
+BOND_DTYPE = np.dtype([("a1", "u4"), ("a2", "u4"), ("epairs", "u1"), ("atoms", np.uintp),
+                       ("x1", "f8"), ("x2", "f8"), ("y1", "f8"), ("y2", "f8"),
+                       ("z", "f8"), ("len", "f8"), ("dx", "f8"), ("dy", "f8")], align=True)
+
+# Portable little-endian layouts of the packed geometry stored in Molecules.GEOMETRY
+GEOMETRY_MAGIC = b"MGE1"
+GEOMETRY_HEADER_DTYPE = np.dtype([("magic", "S4"), ("atom_no", "<u4"), ("bond_no", "<u4")])
+GEOMETRY_ATOM_DTYPE = np.dtype([("element", "S3"), ("x", "<f8"), ("y", "<f8"), ("z", "<f8")])
+GEOMETRY_BOND_DTYPE = np.dtype([("a1", "<u4"), ("a2", "<u4"), ("epairs", "u1")])
+
+if ATOM_DTYPE.itemsize != ATOM_SIZE or BOND_DTYPE.itemsize != BOND_SIZE:
+    raise ImportError("mol_display: ATOM_DTYPE/BOND_DTYPE do not match the compiled molecule library")
+
+def radial_gradient(name: str, colour1: str, colour2: str, colour3: str) -> str:
+    """
+    Returns the SVG radial gradient definition used to fill the atoms of one element.
+
+    Args:
+        name (str): The element name, used as the gradient id.
+        colour1 (str): The hex colour at the centre of the gradient.
+        colour2 (str): The hex colour halfway out.
+        colour3 (str): The hex colour at the edge.
+
+    Returns:
+        str: A radialGradient element as a string.
+    """
+    return GRADIENT.format(name, colour1, colour2, colour3)
+
+class RenderContext:
+    __slots__ = ("radius", "element_name", "gradients", "atom_fill", "offset_x", "offset_y", "scale", "version")
+
+    def __init__(self, radius: dict, element_name: dict, gradients: dict=None, offset_x: float=OFFSET_X,
+                 offset_y: float=OFFSET_Y, scale: float=SCALE, version: str=None):
+        """
+        Initializes a new RenderContext holding everything Molecule.svg() needs besides the molecule.
+
+        A context is immutable once built, so one context can be shared by every render of a palette
+        version, including renders running in parallel threads. The radius and fill attributes of
+        each element's circles are formatted once here rather than for every atom.
+
+        Args:
+            radius (dict): Maps element codes to atomic radii.
+            element_name (dict): Maps element codes to element names, which are also the gradient ids.
+            gradients (dict, optional): Maps element codes to their gradient definitions, as returned
+                by radial_gradient(). Defaults to None, which defines no gradients.
+            offset_x (float, optional): The screen x coordinate of the origin. Defaults to OFFSET_X.
+            offset_y (float, optional): The screen y coordinate of the origin. Defaults to OFFSET_Y.
+            scale (float, optional): Screen units per unit of molecule coordinates. Defaults to SCALE.
+            version (str, optional): The version of the Elements table the context was built from.
+                Defaults to None.
+        """
+        set_attribute = super().__setattr__
+        set_attribute("radius", MappingProxyType(dict(radius)))
+        set_attribute("element_name", MappingProxyType(dict(element_name)))
+        set_attribute("gradients", MappingProxyType(dict(gradients or {})))
+        set_attribute("atom_fill", MappingProxyType({element: f'r="{radius[element]}" fill="url(#{name})"'
+                                                      for element, name in element_name.items()
+                                                      if element in radius}))
+        set_attribute("offset_x", offset_x)
+        set_attribute("offset_y", offset_y)
+        set_attribute("scale", scale)
+        set_attribute("version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RenderContext is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("RenderContext is immutable")
+
+    def defs(self, elements) -> str:
+        """
+        Returns the gradient definitions of the given elements, in element code order.
+
+        Args:
+            elements (iterable): The element codes present in a molecule, possibly repeated.
+
+        Returns:
+            str: The radialGradient elements of those elements that have one.
+        """
+        gradients = self.gradients
+        return "".join(gradients[element] for element in sorted(set(elements)) if element in gradients)
+
+    @classmethod
+    def from_elements(cls, rows, version: str=None, **layout) -> "RenderContext":
+        """
+        Builds a RenderContext from rows of the Elements table.
+
+        Args:
+            rows (iterable): (ELEMENT_CODE, ELEMENT_NAME, COLOUR1, COLOUR2, COLOUR3, RADIUS) tuples.
+            version (str, optional): The version of the Elements table. Defaults to None.
+            **layout: offset_x, offset_y and scale, as for the constructor.
+
+        Returns:
+            RenderContext: A new context with the radius, name and gradient of every element.
+        """
+        rows = list(rows)
+        return cls({row[0]: row[5] for row in rows}, {row[0]: row[1] for row in rows},
+                   {row[0]: radial_gradient(*row[1:5]) for row in rows}, version=version, **layout)
+
+def screen_coords(xyz: np.ndarray, context: RenderContext=None) -> tuple:
+    """
+    Transforms molecule coordinates to SVG screen coordinates.
+
+    Args:
+        xyz (ndarray): An (n, 3) array of molecule coordinates.
+        context (RenderContext, optional): The context giving the offsets and scale. Defaults to
+            None, which uses OFFSET_X, OFFSET_Y and SCALE.
+
+    Returns:
+        tuple: A (cx, cy) tuple of screen coordinate arrays.
+    """
+    if context is None:
+        return (xyz[:, 0] * SCALE) + OFFSET_X, (xyz[:, 1] * SCALE) + OFFSET_Y
+    return (xyz[:, 0] * context.scale) + context.offset_x, (xyz[:, 1] * context.scale) + context.offset_y
+
+def bond_geometry(xyz: np.ndarray, pairs: np.ndarray) -> tuple:
+    """
+    Computes the direction, length and depth of every bond, as compute_coords() does for one bond.
+
+    Args:
+        xyz (ndarray): An (n, 3) array of atom coordinates.
+        pairs (ndarray): An (m, 2) array of bonded atom indices.
+
+    Returns:
+        tuple: A (dx, dy, length, z) tuple of arrays, where dx and dy are the components of the
+               unit vector from the first atom to the second in the xy plane and z is the mean
+               depth of the two atoms.
+    """
+    a1 = xyz[pairs[:, 0]]
+    a2 = xyz[pairs[:, 1]]
+
+    delta = a2[:, :2] - a1[:, :2]
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dx = delta[:, 0] / length
+        dy = delta[:, 1] / length
+
+    return dx, dy, length, (a1[:, 2] + a2[:, 2]) / 2.0
+
+def bond_polygons(cx: np.ndarray, cy: np.ndarray, pairs: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """
+    Computes the four screen-space corners of every bond polygon.
+
+    Args:
+        cx (ndarray): The screen x coordinates of the atoms.
+        cy (ndarray): The screen y coordinates of the atoms.
+        pairs (ndarray): An (m, 2) array of bonded atom indices.
+        dx (ndarray): The x components of the bond directions.
+        dy (ndarray): The y components of the bond directions.
+
+    Returns:
+        ndarray: An (m, 8) array of x1, y1, x2, y2, x3, y3, x4, y4 corners.
+    """
+    x1, y1 = cx[pairs[:, 0]], cy[pairs[:, 0]]
+    x2, y2 = cx[pairs[:, 1]], cy[pairs[:, 1]]
+    ox, oy = dy * 10, dx * 10
+
+    return np.column_stack((x1 - ox, y1 + oy, x1 + ox, y1 - oy,
+                            x2 + ox, y2 - oy, x2 - ox, y2 + oy))
+
+def choose_detail(atom_no: int, pixels: int=LOD_PIXELS) -> str:
+    """
+    Chooses the most detailed level at which a molecule stays legible at a given image size.
+
+    Args:
+        atom_no (int): The number of atoms in the molecule.
+        pixels (int, optional): The width and height of the image in pixels. Defaults to LOD_PIXELS.
+
+    Returns:
+        str: One of LOD_LEVELS.
+    """
+    for level, area, most in LOD_LIMITS:
+        if atom_no <= most and atom_no * area <= pixels * pixels:
+            return level
+    return LOD_OVERVIEW
+
+def backbone_paths(cx: np.ndarray, cy: np.ndarray, atoms: np.ndarray, pairs: np.ndarray,
+                   chunk_elements: int=SVG_CHUNK_ELEMENTS):
+    """
+    Draws atoms as dots and bonds as lines, with one path element for all the bonds and one for all the atoms.
+
+    The path data is produced chunk_elements segments at a time, so a path of any length is never
+    held whole.
+
+    Args:
+        cx (ndarray): The screen x coordinates of the atoms.
+        cy (ndarray): The screen y coordinates of the atoms.
+        atoms (ndarray): The indices of the atoms to draw.
+        pairs (ndarray): An (m, 2) array of the bonded atom indices of the bonds to draw.
+        chunk_elements (int, optional): Segments formatted per chunk. Defaults to SVG_CHUNK_ELEMENTS.
+
+    Yields:
+        str: Consecutive pieces of the path elements, bonds first.
+    """
+    if len(pairs):
+        yield '\t<path d="'
+        for start in range(0, len(pairs), chunk_elements):
+            part = pairs[start:start + chunk_elements]
+            segments = np.column_stack((cx[part[:, 0]], cy[part[:, 0]], cx[part[:, 1]], cy[part[:, 1]]))
+            yield "".join(["M%.2f %.2fL%.2f %.2f" % tuple(segment) for segment in segments.tolist()])
+        yield f'" stroke="green" stroke-width="{BACKBONE_BOND_WIDTH}" fill="none"/>\n'
+
+    if len(atoms):
+        yield '\t<path d="'
+        for start in range(0, len(atoms), chunk_elements):
+            part = atoms[start:start + chunk_elements]
+            yield "".join(["M%.2f %.2fh0" % point for point in zip(cx[part].tolist(), cy[part].tolist())])
+        yield f'" stroke="grey" stroke-width="{BACKBONE_ATOM_WIDTH}" stroke-linecap="round" fill="none"/>\n'
+
+def density_bins(cx: np.ndarray, cy: np.ndarray, bounds: tuple, bins: int=OVERVIEW_BINS) -> str:
+    """
+    Draws the density of atom centres as a grid of square bins, shaded by how many atoms each holds.
+
+    Only bins holding atoms are drawn, so the output never exceeds bins * bins elements however
+    large the molecule is.
+
+    Args:
+        cx (ndarray): The screen x coordinates of the atoms.
+        cy (ndarray): The screen y coordinates of the atoms.
+        bounds (tuple): The x, y, width and height of the region to bin, the viewBox.
+        bins (int, optional): Bins along the longer side of the region. Defaults to OVERVIEW_BINS.
+
+    Returns:
+        str: One rect element per occupied bin.
+    """
+    x, y, width, height = (float(value) for value in bounds)
+    size = max(width, height) / bins
+    ix = np.floor((cx - x) / size)
+    iy = np.floor((cy - y) / size)
+    inside = (ix >= 0) & (ix < bins) & (iy >= 0) & (iy < bins)
+
+    counts = np.bincount((iy[inside] * bins + ix[inside]).astype(np.intp), minlength=bins * bins)
+    occupied = np.flatnonzero(counts)
+    if len(occupied) == 0:
+        return ""
+    opacity = 0.2 + 0.8 * counts[occupied] / counts[occupied].max()
+
+    return "".join(['\t<rect x="%.2f" y="%.2f" width="%.2f" height="%.2f" fill="grey" fill-opacity="%.3f"/>\n'
+                    % (x + column * size, y + row * size, size, size, alpha)
+                    for row, column, alpha in zip((occupied // bins).tolist(), (occupied % bins).tolist(),
+                                                  opacity.tolist())])
+
+def _select(index: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Returns the indices in index, or of every item if index is None, whose mask entry is set."""
+    return np.flatnonzero(mask) if index is None else index[mask[index]]
+
+def pack_geometry(elements, xyz, pairs, epairs) -> bytes:
+    """
+    Packs the atoms and bonds of a molecule into the portable binary format of Molecules.GEOMETRY.
+
+    The format is a GEOMETRY_HEADER_DTYPE header followed by one GEOMETRY_ATOM_DTYPE record per
+    atom and one GEOMETRY_BOND_DTYPE record per bond, all little-endian and unpadded.
+
+    Args:
+        elements (sequence): The element code of every atom.
+        xyz (array_like): An (n, 3) array of atom coordinates.
+        pairs (array_like): An (m, 2) array of zero-based atom indices.
+        epairs (sequence): The electron pair count of every bond.
+
+    Returns:
+        bytes: The packed geometry.
+    """
+    xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+    pairs = np.asarray(pairs).reshape(-1, 2)
+
+    header = np.array([(GEOMETRY_MAGIC, len(xyz), len(pairs))], dtype=GEOMETRY_HEADER_DTYPE)
+
+    atoms = np.empty(len(xyz), dtype=GEOMETRY_ATOM_DTYPE)
+    atoms["element"] = elements
+    atoms["x"] = xyz[:, 0]
+    atoms["y"] = xyz[:, 1]
+    atoms["z"] = xyz[:, 2]
+
+    bonds = np.empty(len(pairs), dtype=GEOMETRY_BOND_DTYPE)
+    bonds["a1"] = pairs[:, 0]
+    bonds["a2"] = pairs[:, 1]
+    bonds["epairs"] = epairs
+
+    return header.tobytes() + atoms.tobytes() + bonds.tobytes()
+
+def structure_hash(elements, xyz, pairs, epairs) -> str:
+    """
+    Returns a canonical SHA-256 of a molecule's structure that does not depend on the order its
+    atoms and bonds were listed in.
+
+    Atoms are sorted by element and then by coordinates rounded to COORDINATE_DECIMALS places,
+    bonds are renumbered to that order, their ends sorted, and the bonds sorted in turn. The
+    sorted geometry is hashed in the packed format of pack_geometry().
+
+    Args:
+        elements (sequence): The element code of every atom.
+        xyz (array_like): An (n, 3) array of atom coordinates.
+        pairs (array_like): An (m, 2) array of zero-based atom indices.
+        epairs (sequence): The electron pair count of every bond.
+
+    Returns:
+        str: The hex digest of the canonical structure.
+    """
+    elements = np.asarray(elements, dtype="U3").reshape(-1)
+    # Adding 0.0 turns the -0.0 left by rounding small negative coordinates into 0.0
+    xyz = np.round(np.asarray(xyz, dtype=np.float64).reshape(-1, 3), COORDINATE_DECIMALS) + 0.0
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    epairs = np.asarray(epairs, dtype=np.uint8).reshape(-1)
+
+    order = np.lexsort((xyz[:, 2], xyz[:, 1], xyz[:, 0], elements))
+    rank = np.empty(len(order), dtype=np.intp)
+    rank[order] = np.arange(len(order))
+
+    ends = np.sort(rank[pairs], axis=1)
+    bond_order = np.lexsort((epairs, ends[:, 1], ends[:, 0]))
+
+    geometry = pack_geometry(elements[order], xyz[order], ends[bond_order], epairs[bond_order])
+    return hashlib.sha256(geometry).hexdigest()
+
+class SpatialGrid(spatial_grid):
+    def radius(self, x: float, y: float, z: float, radius: float) -> np.ndarray:
+        """
+        Returns the atoms within a distance of a point, reading only the grid cells around it.
+
+        Args:
+            x (float): The x coordinate of the point.
+            y (float): The y coordinate of the point.
+            z (float): The z coordinate of the point.
+            radius (float): The distance from the point, inclusive.
+
+        Returns:
+            ndarray: The insertion-order indices of the atoms, in no particular order.
+        """
+        return np.frombuffer(self.radius_buffer(x, y, z, radius), dtype=np.uintc)
+
+    def box(self, low, high) -> np.ndarray:
+        """
+        Returns the atoms inside an axis-aligned box, whose bounds may be infinite.
+
+        Args:
+            low (sequence): The lowest x, y and z coordinates of the box, inclusive.
+            high (sequence): The highest x, y and z coordinates of the box, inclusive.
+
+        Returns:
+            ndarray: The insertion-order indices of the atoms, in no particular order.
+        """
+        return np.frombuffer(self.box_buffer(*low, *high), dtype=np.uintc)
+
 class Atom:
     def __init__(self, c_atom):
         """
@@ -25,20 +410,23 @@ class Atom:
         self.atom = c_atom
         self.z = c_atom.z
 
-    def svg(self) -> str:
+    def svg(self, context: RenderContext) -> str:
         """
         Returns an SVG circle element representing this Atom object.
 
         The position, radius, and fill color of the circle are determined by the
         attributes of the underlying Atom object.
 
+        Args:
+            context (RenderContext): The palette and layout to render with.
+
         Returns:
             str: An SVG circle element as a string.
         """
-        x = (self.atom.x * 100.0) + OFFSET_X
-        y = (self.atom.y * 100.0) + OFFSET_Y
-        radi = RADIUS[self.atom.element]
-        color = ELEMENT_NAME[self.atom.element]
+        x = (self.atom.x * context.scale) + context.offset_x
+        y = (self.atom.y * context.scale) + context.offset_y
+        radi = context.radius[self.atom.element]
+        color = context.element_name[self.atom.element]
 
         return f'\t<circle cx="{x}" cy="{y}" r="{radi}" fill="url(#{color})"/>\n\t<text x="{x-10}" y="{y+10}" font-size="24" font-family="Arial" fill="lightgrey">{self.atom.element}</text>\n'
     
@@ -54,138 +442,491 @@ class Bond:
         self.bond = c_bond
         self.z = c_bond.z
 
-    def svg(self) -> str:  
+    def svg(self, context: RenderContext) -> str:
         """
         Returns an SVG polygon element representing this Bond object.
 
         The position and shape of the polygon are determined by the attributes of the
         underlying Bond object.
 
+        Args:
+            context (RenderContext): The palette and layout to render with.
+
         Returns:
             str: An SVG polygon element as a string.
         """
-        x1 = ((self.bond.x1 * 100) + OFFSET_X) - (self.bond.dy * 10)
-        y1 = ((self.bond.y1 * 100) + OFFSET_Y) + (self.bond.dx * 10)
+        scale, offset_x, offset_y = context.scale, context.offset_x, context.offset_y
+
+        x1 = ((self.bond.x1 * scale) + offset_x) - (self.bond.dy * 10)
+        y1 = ((self.bond.y1 * scale) + offset_y) + (self.bond.dx * 10)
         
-        x2 = ((self.bond.x1 * 100) + OFFSET_X) + (self.bond.dy * 10)
-        y2 = ((self.bond.y1 * 100) + OFFSET_Y) - (self.bond.dx * 10)
+        x2 = ((self.bond.x1 * scale) + offset_x) + (self.bond.dy * 10)
+        y2 = ((self.bond.y1 * scale) + offset_y) - (self.bond.dx * 10)
 
-        x3 = ((self.bond.x2 * 100) + OFFSET_X) + (self.bond.dy * 10)
-        y3 = ((self.bond.y2 * 100) + OFFSET_Y) - (self.bond.dx * 10)
+        x3 = ((self.bond.x2 * scale) + offset_x) + (self.bond.dy * 10)
+        y3 = ((self.bond.y2 * scale) + offset_y) - (self.bond.dx * 10)
 
-        x4 = ((self.bond.x2 * 100) + OFFSET_X) - (self.bond.dy * 10)
-        y4 = ((self.bond.y2 * 100) + OFFSET_Y) + (self.bond.dx * 10)
+        x4 = ((self.bond.x2 * scale) + offset_x) - (self.bond.dy * 10)
+        y4 = ((self.bond.y2 * scale) + offset_y) + (self.bond.dx * 10)
 
         return '\t<polygon points="%.2f,%.2f %.2f,%.2f %.2f,%.2f %.2f,%.2f" fill="green"/>\n' % (x1, y1, x2, y2, x3, y3, x4, y4)
 
 class Molecule(molecule):
-    def svg(self) -> str:
+    def atom_view(self) -> np.ndarray:
         """
-        Returns an SVG string representing this Molecule object.
+        Returns a structured ATOM_DTYPE array sharing memory with this Molecule's C atoms array.
 
-        The SVG string is generated from the underlying Atom and Bond objects in the
-        Molecule, sorted by atomic number and bond type, respectively.
+        No data is copied. The view is in insertion order and is only valid until the next atom
+        is appended and while this Molecule is alive.
 
         Returns:
-            str: An SVG string representing this Molecule object.
+            ndarray: A zero-copy view of the atoms.
         """
-        atoms = []
-        for i in range(self.atom_no):
-            atoms.append(Atom(self.get_atom(i)))
-        bonds = []
-        for i in range(self.bond_no):
-            bonds.append(Bond(self.get_bond(i)))
-
-        atoms.sort(key=lambda atom: atom.z)
-        bonds.sort(key=lambda bond: bond.z)
-
-        svg_strings = []
-        while atoms and bonds:
-            a1 = atoms[0]
-            b1 = bonds[0] 
-            if a1.z < b1.z:
-                svg_strings.append(a1.svg())
-                atoms.pop(0)
-            else:
-                svg_strings.append(b1.svg())
-                bonds.pop(0)
-        svg_strings += [atom.svg() for atom in atoms] + [bond.svg() for bond in bonds]
+        return np.frombuffer(self.atom_buffer(), dtype=ATOM_DTYPE)
 
-        return HEADER + "".join(svg_strings) + FOOTER
-    
-    def parse(self, file):
+    def bond_view(self) -> np.ndarray:
+        """
+        Returns a structured BOND_DTYPE array sharing memory with this Molecule's C bonds array.
+
+        No data is copied. The view is in insertion order and is only valid until the next bond
+        is appended and while this Molecule is alive.
+
+        Returns:
+            ndarray: A zero-copy view of the bonds.
+        """
+        return np.frombuffer(self.bond_buffer(), dtype=BOND_DTYPE)
+
+    def atom_arrays(self) -> tuple:
+        """
+        Returns the atoms of this Molecule as NumPy arrays, in insertion order.
+
+        Returns:
+            tuple: An (elements, xyz) tuple, where elements is an array of element codes and
+                   xyz is an (atom_no, 3) float64 array of coordinates.
+        """
+        atoms = self.atom_view()
+        xyz = np.empty((len(atoms), 3), dtype=np.float64)
+        xyz[:, 0] = atoms["x"]
+        xyz[:, 1] = atoms["y"]
+        xyz[:, 2] = atoms["z"]
+
+        # Element codes are NUL-terminated C strings, so clear whatever follows the terminator
+        codes = atoms["element"].copy().view(np.uint8).reshape(-1, 3)
+        codes[np.cumsum(codes == 0, axis=1) > 0] = 0
+
+        return codes.view("S3").ravel().astype("U3"), xyz
+
+    def bond_arrays(self) -> tuple:
+        """
+        Returns the bonds of this Molecule as NumPy arrays, in insertion order.
+
+        Returns:
+            tuple: A (pairs, epairs) tuple, where pairs is a (bond_no, 2) array of atom indices
+                   into atom_arrays() and epairs is an array of electron pair counts.
+        """
+        bonds = self.bond_view()
+        pairs = np.empty((len(bonds), 2), dtype=np.intp)
+        pairs[:, 0] = bonds["a1"]
+        pairs[:, 1] = bonds["a2"]
+
+        return pairs, bonds["epairs"].copy()
+
+    def append_atoms(self, elements, xyz):
         """
-        Parses a sdf data file and populates this Molecule object with Atom and Bond objects.
+        Appends many atoms to this Molecule with a single call into the C library.
 
         Args:
-            file (IO): An IO object representing the molecule data file.
+            elements (sequence): The element code of every atom.
+            xyz (array_like): An (n, 3) array of atom coordinates.
         """
-        atom_count, bond_count = 0, 0
+        xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        atoms = np.zeros(len(xyz), dtype=ATOM_DTYPE)
+        atoms["element"] = elements
+        atoms["x"] = xyz[:, 0]
+        atoms["y"] = xyz[:, 1]
+        atoms["z"] = xyz[:, 2]
 
-        for i in range(3):
-            file.readline()
+        self.append_atom_buffer(atoms)
 
-        line = file.readline().strip()
-        atom_count = int(line.split()[0])
-        bond_count = int(line.split()[1])
+    def append_bonds(self, pairs, epairs):
+        """
+        Appends many bonds to this Molecule with a single call into the C library.
 
-        for i in range(atom_count):
-            line = file.readline().strip()
-            atom_info = line.split()
-            self.append_atom(atom_info[3], float(atom_info[0]), float(atom_info[1]), float(atom_info[2]))
+        Args:
+            pairs (array_like): An (m, 2) array of zero-based atom indices.
+            epairs (sequence): The electron pair count of every bond.
+        """
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        bonds = np.zeros(len(pairs), dtype=BOND_DTYPE)
+        bonds["a1"] = pairs[:, 0]
+        bonds["a2"] = pairs[:, 1]
+        bonds["epairs"] = epairs
+
+        self.append_bond_buffer(bonds)
+
+    def pack(self) -> bytes:
+        """
+        Returns the atoms and bonds of this Molecule in the packed format of pack_geometry().
+
+        Returns:
+            bytes: The packed geometry.
+        """
+        elements, xyz = self.atom_arrays()
+        pairs, epairs = self.bond_arrays()
+        return pack_geometry(elements, xyz, pairs, epairs)
 
-        for i in range(bond_count):
-            line = file.readline().strip()
-            bond_info = line.split()
-            self.append_bond(int(bond_info[0])-1, int(bond_info[1])-1, int(bond_info[2]))
+    def structure_hash(self) -> str:
+        """
+        Returns the order-independent structure_hash() of this Molecule.
+
+        Returns:
+            str: The hex digest of the canonical structure.
+        """
+        elements, xyz = self.atom_arrays()
+        pairs, epairs = self.bond_arrays()
+        return structure_hash(elements, xyz, pairs, epairs)
 
-    def adjust_svg_viewbox(self, svg_file: str) -> str:
+    @classmethod
+    def unpack(cls, data) -> "Molecule":
         """
-        Adjust the viewbox of an SVG file to fit all circle elements, with an additional 200x200 padding.
+        Builds a Molecule from geometry packed by pack_geometry(), with one allocation and one bulk
+        append each for the atoms and the bonds.
 
         Args:
-            svg_file (str): Path to the input SVG file.
+            data (bytes-like): The packed geometry.
 
         Returns:
-            str: The updated SVG content as a string.
+            Molecule: A new Molecule with the packed atoms and bonds.
+
+        Raises:
+            ValueError: If data is not packed geometry or is truncated.
+        """
+        data = memoryview(data)
+        if len(data) < GEOMETRY_HEADER_DTYPE.itemsize:
+            raise ValueError("unpack(): geometry is truncated")
+        header = np.frombuffer(data, dtype=GEOMETRY_HEADER_DTYPE, count=1)[0]
+        atom_no, bond_no = int(header["atom_no"]), int(header["bond_no"])
+        if header["magic"] != GEOMETRY_MAGIC:
+            raise ValueError("unpack(): data is not packed geometry")
+
+        atoms_end = GEOMETRY_HEADER_DTYPE.itemsize + atom_no * GEOMETRY_ATOM_DTYPE.itemsize
+        if len(data) != atoms_end + bond_no * GEOMETRY_BOND_DTYPE.itemsize:
+            raise ValueError("unpack(): geometry is truncated")
+        atoms = np.frombuffer(data, dtype=GEOMETRY_ATOM_DTYPE, count=atom_no, offset=GEOMETRY_HEADER_DTYPE.itemsize)
+        bonds = np.frombuffer(data, dtype=GEOMETRY_BOND_DTYPE, count=bond_no, offset=atoms_end)
+
+        mol = cls(atom_no, bond_no)
+
+        c_atoms = np.zeros(atom_no, dtype=ATOM_DTYPE)
+        for field in ("element", "x", "y", "z"):
+            c_atoms[field] = atoms[field]
+        mol.append_atom_buffer(c_atoms)
+
+        c_bonds = np.zeros(bond_no, dtype=BOND_DTYPE)
+        for field in ("a1", "a2", "epairs"):
+            c_bonds[field] = bonds[field]
+        mol.append_bond_buffer(c_bonds)
+
+        return mol
+
+    def copy(self) -> "Molecule":
         """
-        with open(svg_file, 'r') as file:
-            svg_content = file.read()
+        Returns an independent copy of this Molecule, made with one bulk append of its atoms and bonds.
 
-        root = ElementTree.fromstring(svg_content)
-        circles = root.findall(".//{http://www.w3.org/2000/svg}circle")
-        coords = [(float(circle.get('cx')), float(circle.get('cy'))) for circle in circles]
+        Returns:
+            Molecule: A new Molecule with the same atoms and bonds in the same order.
+        """
+        mol = Molecule(self.atom_no, self.bond_no)
+        mol.append_atom_buffer(self.atom_buffer())
+        mol.append_bond_buffer(self.bond_buffer())
+        return mol
 
-        min_x = min(x for x, y in coords) - 100
-        min_y = min(y for x, y in coords) - 100
-        max_x = max(x for x, y in coords) + 100
-        max_y = max(y for x, y in coords) + 100
+    def transform(self, matrix):
+        """
+        Applies a 3x3 transformation matrix to every atom of this Molecule using mol_xform.
 
-        viewBox = f"{min_x} {min_y} {max_x - min_x} {max_y - min_y}"
-        root.set('viewBox', viewBox)
+        Args:
+            matrix (array_like): A 3x3 matrix, or nine numbers in row-major order.
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        if matrix.size != 9:
+            raise ValueError("transform(): matrix must be 3x3")
+        self.xform_buffer(matrix)
 
-        updated_svg_content = ElementTree.tostring(root, encoding='unicode')
+    def grid(self, cell: float=GRID_CELL) -> SpatialGrid:
+        """
+        Returns a uniform grid index over the current coordinates of this Molecule's atoms.
 
-        return updated_svg_content
+        The grid is a snapshot, so it must be rebuilt after the molecule is transformed.
 
-    
-    def remove_namespace_prefix(self, svg_content: str, prefix: str = "ns0:") -> str:
+        Args:
+            cell (float, optional): The edge length of a grid cell. Defaults to GRID_CELL.
+
+        Returns:
+            SpatialGrid: The grid, answering radius and box queries with atom indices.
+        """
+        return SpatialGrid(self, cell)
+
+    def visible(self, viewport: tuple, context: RenderContext, polygons: np.ndarray) -> tuple:
+        """
+        Returns the atoms and bonds that can show in a viewport.
+
+        Atoms are found with a grid box query over the viewport widened by the largest atom
+        radius, at every depth. Bonds are kept if the bounding box of their polygon overlaps the
+        viewport.
+
+        Args:
+            viewport (tuple): The x, y, width and height of the viewport in screen coordinates.
+            context (RenderContext): The context giving the offsets, scale and atom radii.
+            polygons (ndarray): The bond polygons, as returned by bond_polygons().
+
+        Returns:
+            tuple: The sorted indices of the visible atoms and of the visible bonds.
+        """
+        x, y, width, height = viewport
+        margin = float(max(context.radius.values(), default=0))
+
+        low = ((x - margin - context.offset_x) / context.scale, (y - margin - context.offset_y) / context.scale, -np.inf)
+        high = ((x + width + margin - context.offset_x) / context.scale,
+                (y + height + margin - context.offset_y) / context.scale, np.inf)
+        atoms = np.sort(self.grid().box(low, high))
+
+        xs, ys = polygons[:, 0::2], polygons[:, 1::2]
+        bonds = np.flatnonzero((xs.max(axis=1) >= x) & (xs.min(axis=1) <= x + width) &
+                               (ys.max(axis=1) >= y) & (ys.min(axis=1) <= y + height))
+        return atoms, bonds
+
+    def z_order(self) -> np.ndarray:
+        """
+        Sorts this Molecule with molsort and returns the back-to-front drawing order of its atoms and bonds.
+
+        Returns:
+            ndarray: Indices where values below atom_no are atoms and the rest are bonds offset
+                     by atom_no, both in insertion order. Bonds are drawn before atoms of equal z.
+        """
+        return np.frombuffer(self.z_order_buffer(), dtype=np.uintc)
+
+    def svg(self, context: RenderContext, viewport: tuple=None, detail: str=LOD_FULL) -> str:
         """
-        Removes a specified namespace prefix from an SVG content string.
+        Returns an SVG string representing this Molecule object, the joined chunks of svg_chunks().
 
         Args:
-            svg_content (str): The SVG content string to process.
-            prefix (str, optional): The namespace prefix to remove. Defaults to "ns0:".
+            context (RenderContext): The palette and layout to render with.
+            viewport (tuple, optional): The x, y, width and height, in screen coordinates, of the
+                region to render. Defaults to None, which renders the whole molecule.
+            detail (str, optional): One of LOD_LEVELS, as chosen by choose_detail(). Defaults to LOD_FULL.
 
         Returns:
-            str: The SVG content string with the specified namespace prefix removed.
+            str: An SVG string representing this Molecule object.
+        Raises:
+            ValueError: If detail is not a level of detail.
+        """
+        return "".join(self.svg_chunks(context, viewport, detail))
+
+    def svg_chunks(self, context: RenderContext, viewport: tuple=None, detail: str=LOD_FULL,
+                   chunk_elements: int=SVG_CHUNK_ELEMENTS):
+        """
+        Renders this Molecule as SVG, yielding the document in pieces as it is formatted.
+
+        The atoms are transformed to screen space in one coordinate pass, which also gives the
+        viewBox, computed from the atom centres so that every atom fits with VIEWBOX_PADDING to
+        spare. The header and the gradients of the elements present are yielded first. The drawing
+        order comes from z_order(), which sorts the molecule with molsort and merges the sorted
+        atoms and bonds in C; it is then turned into circles and bond polygons chunk_elements at
+        a time, so only the arrays of the molecule and one chunk of text are held at once,
+        however large the molecule is.
+
+        With a viewport, only the atoms and bonds found by visible() are emitted and the viewport
+        becomes the viewBox, so a zoomed-in view of a huge molecule costs little more than the
+        part of it that is shown.
+
+        Below LOD_FULL, the level of detail drops the element labels (LOD_NO_LABELS), then also
+        the hydrogens and their bonds (LOD_NO_HYDROGENS). LOD_BACKBONE draws the heavy atoms and
+        their bonds as two path elements with backbone_paths(), and LOD_OVERVIEW draws only the
+        density of atoms with density_bins(); neither needs a depth sort. Every level keeps the
+        viewBox of the full render, so they can replace one another as an image is resized.
+
+        Nothing but the molecule itself is modified, so molecules can be rendered in parallel
+        threads with a shared context.
+
+        Args:
+            context (RenderContext): The palette and layout to render with.
+            viewport (tuple, optional): The x, y, width and height, in screen coordinates, of the
+                region to render. Defaults to None, which renders the whole molecule.
+            detail (str, optional): One of LOD_LEVELS, as chosen by choose_detail(). Defaults to LOD_FULL.
+            chunk_elements (int, optional): Atoms and bonds formatted per chunk. Defaults to SVG_CHUNK_ELEMENTS.
+
+        Yields:
+            str: Consecutive pieces of the SVG document.
+        Raises:
+            ValueError: If detail is not a level of detail.
+        """
+        if detail not in LOD_LEVELS:
+            raise ValueError(f"svg(): unknown level of detail {detail!r}")
+
+        with metrics.stage("svg_geometry"):
+            elements, xyz = self.atom_arrays()
+            pairs, _ = self.bond_arrays()
+
+            cx, cy = screen_coords(xyz, context)
+
+        with metrics.stage("viewbox"):
+            bounds = self.bounds(cx, cy) if viewport is None else tuple(float(value) for value in viewport)
+            header = SVG_TAG.format("{} {} {} {}".format(*bounds))
+
+        atom_index = bond_index = None
+        if viewport is not None:
+            with metrics.stage("viewport_cull"):
+                dx, dy, _, _ = bond_geometry(xyz, pairs)
+                atom_index, bond_index = self.visible(viewport, context, bond_polygons(cx, cy, pairs, dx, dy))
+
+        if detail in (LOD_NO_HYDROGENS, LOD_BACKBONE):
+            with metrics.stage("lod_filter"):
+                heavy = elements != "H"
+                atom_index = _select(atom_index, heavy)
+                bond_index = _select(bond_index, heavy[pairs[:, 0]] & heavy[pairs[:, 1]])
+
+        if detail == LOD_OVERVIEW:
+            yield header
+            with metrics.stage("svg_format"):
+                if atom_index is not None:
+                    cx, cy = cx[atom_index], cy[atom_index]
+                body = density_bins(cx, cy, bounds)
+            yield body
+            yield FOOTER
+            return
+
+        if detail == LOD_BACKBONE:
+            yield header
+            yield from backbone_paths(cx, cy, atom_index, pairs[bond_index], chunk_elements)
+            yield FOOTER
+            return
+
+        with metrics.stage("z_order"):
+            order = self.z_order()
+            if atom_index is not None:
+                # Keep only the atoms and bonds that are drawn, in their drawing order
+                drawn = np.zeros(len(order), dtype=bool)
+                drawn[atom_index] = True
+                drawn[self.atom_no + bond_index] = True
+                order = order[drawn[order]]
+
+        yield header + context.defs(np.unique(elements if atom_index is None else elements[atom_index]).tolist())
+
+        # Bond polygons are computed a chunk at a time along with their text, and the chunks are
+        # timed together, so that a render records one svg_format stage however it is split
+        format_seconds = 0.0
+        atom_fill, atom_no = context.atom_fill, self.atom_no
+        for start in range(0, len(order), chunk_elements):
+            chunk_start = time.perf_counter()
+            part = order[start:start + chunk_elements]
+            is_atom = part < atom_no
+            atoms, bonds = part[is_atom], part[~is_atom] - atom_no
+
+            element_codes = elements[atoms].tolist()
+            fills = [atom_fill[element] for element in element_codes]
+            if detail == LOD_FULL:
+                atom_strings = [
+                    f'\t<circle cx="{x}" cy="{y}" {fill}/>\n\t<text x="{x-10}" y="{y+10}" font-size="24" font-family="Arial" fill="lightgrey">{element}</text>\n'
+                    for x, y, fill, element in zip(cx[atoms].tolist(), cy[atoms].tolist(), fills, element_codes)
+                ]
+            else:
+                atom_strings = [f'\t<circle cx="{x}" cy="{y}" {fill}/>\n'
+                                for x, y, fill in zip(cx[atoms].tolist(), cy[atoms].tolist(), fills)]
+
+            dx, dy, _, _ = bond_geometry(xyz, pairs[bonds])
+            svg_strings = atom_strings + [
+                '\t<polygon points="%.2f,%.2f %.2f,%.2f %.2f,%.2f %.2f,%.2f" fill="green"/>\n' % tuple(corners)
+                for corners in bond_polygons(cx, cy, pairs[bonds], dx, dy).tolist()
+            ]
+            # Atoms and bonds keep their drawing order within the chunk
+            slots = np.empty(len(part), dtype=np.intp)
+            slots[is_atom] = np.arange(len(atoms))
+            slots[~is_atom] = len(atoms) + np.arange(len(bonds))
+            chunk = "".join([svg_strings[i] for i in slots.tolist()])
+            format_seconds += time.perf_counter() - chunk_start
+            yield chunk
+
+        if metrics.enabled:
+            metrics.record_stage("svg_format", format_seconds)
+        yield FOOTER
+
+    def bounds(self, cx: np.ndarray, cy: np.ndarray) -> tuple:
+        """
+        Returns the region that fits the given atom centres, with VIEWBOX_PADDING around the outermost ones.
+
+        Args:
+            cx (ndarray): The screen x coordinates of the atom centres.
+            cy (ndarray): The screen y coordinates of the atom centres.
+
+        Returns:
+            tuple: The x, y, width and height of the region.
+        """
+        if len(cx) == 0:
+            return 0, 0, 1000, 1000
+
+        min_x = float(cx.min()) - VIEWBOX_PADDING
+        min_y = float(cy.min()) - VIEWBOX_PADDING
+        max_x = float(cx.max()) + VIEWBOX_PADDING
+        max_y = float(cy.max()) + VIEWBOX_PADDING
+
+        return min_x, min_y, max_x - min_x, max_y - min_y
+
+    def viewbox(self, cx: np.ndarray, cy: np.ndarray) -> str:
+        """
+        Returns the viewBox that fits the given atom centres, with VIEWBOX_PADDING around the outermost ones.
+
+        Args:
+            cx (ndarray): The screen x coordinates of the atom centres.
+            cy (ndarray): The screen y coordinates of the atom centres.
+
+        Returns:
+            str: The value of the SVG viewBox attribute.
+        """
+        return "{} {} {} {}".format(*self.bounds(cx, cy))
+    
+    def parse(self, file):
+        """
+        Parses a sdf data file and populates this Molecule object with its atoms and bonds.
+
+        The file is read into memory and its first record is parsed by the C parser; see parse_bytes().
+
+        Args:
+            file (IO): An IO object representing the molecule data file.
+
+        Raises:
+            ValueError: If the record is malformed.
         """
-        pattern_open = re.compile(rf"<{prefix}(\w+)")
-        svg_content = pattern_open.sub(r"<\1", svg_content)
+        data = file.read()
+        if isinstance(data, str):
+            data = data.encode()
+        self.parse_bytes(data)
 
-        pattern_close = re.compile(rf"</{prefix}(\w+)>")
-        svg_content = pattern_close.sub(r"</\1>", svg_content)
+    def parse_bytes(self, data, offset: int=0, name_field: str="NAME", perceive_bonds: bool=True) -> tuple:
+        """
+        Parses one V2000 or V3000 record of an in-memory SD file into this Molecule with the C parser.
 
-        return svg_content
+        data may be any bytes-like object, such as bytes or an mmap of the file. Blank records are
+        skipped. The offset of the following record is returned by parse_buffer() in the C library;
+        a malformed record raises ValueError instead. A record with several atoms but no bond
+        block, such as a structure converted from an XYZ file, is given single bonds between the
+        atoms whose distance fits their covalent radii, found with a spatial grid in the C library.
 
+        Args:
+            data (bytes-like): The SD file contents.
+            offset (int, optional): The offset of the record to parse. Defaults to 0.
+            name_field (str, optional): The data item holding the molecule name. Defaults to "NAME".
+            perceive_bonds (bool, optional): If False, records without bonds are left without
+                bonds. Defaults to True.
 
+        Returns:
+            tuple: A (name, next_offset) tuple, where name is taken from the name_field data item or
+                   the first line of the record and is None if there were no more records.
+
+        Raises:
+            ValueError: If the record is malformed. This Molecule is left unchanged.
+        """
+        name, next_offset = self.parse_buffer(data, offset, name_field, SDF_PERCEIVE_BONDS if perceive_bonds else 0)
+        if name is not None:
+            name = name.decode("utf-8", errors="replace")
+        return name, next_offset
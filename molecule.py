@@ -108,10 +108,13 @@ class molecule(object):
     bonds = property(_molecule.molecule_bonds_get, _molecule.molecule_bonds_set)
     bond_ptrs = property(_molecule.molecule_bond_ptrs_get, _molecule.molecule_bond_ptrs_set)
 
-    def __init__(self):
-        _molecule.molecule_swiginit(self, _molecule.new_molecule())
+    def __init__(self, atom_max=0, bond_max=0):
+        _molecule.molecule_swiginit(self, _molecule.new_molecule(atom_max, bond_max))
     __swig_destroy__ = _molecule.delete_molecule
 
+    def reserve(self, atom_max, bond_max):
+        return _molecule.molecule_reserve(self, atom_max, bond_max)
+
     def append_atom(self, element, x, y, z):
         return _molecule.molecule_append_atom(self, element, x, y, z)
 
@@ -124,9 +127,36 @@ class molecule(object):
     def get_bond(self, i):
         return _molecule.molecule_get_bond(self, i)
 
+    def get_stored_atom(self, i):
+        return _molecule.molecule_get_stored_atom(self, i)
+
+    def atom_buffer(self):
+        return _molecule.molecule_atom_buffer(self)
+
+    def bond_buffer(self):
+        return _molecule.molecule_bond_buffer(self)
+
+    def append_atom_buffer(self, data):
+        return _molecule.molecule_append_atom_buffer(self, data)
+
+    def append_bond_buffer(self, data):
+        return _molecule.molecule_append_bond_buffer(self, data)
+
+    def rotate(self, xrot, yrot, zrot):
+        return _molecule.molecule_rotate(self, xrot, yrot, zrot)
+
+    def xform_buffer(self, data):
+        return _molecule.molecule_xform_buffer(self, data)
+
     def sort(self):
         return _molecule.molecule_sort(self)
 
+    def parse_buffer(self, data, offset, name_field, flags=0):
+        return _molecule.molecule_parse_buffer(self, data, offset, name_field, flags)
+
+    def z_order_buffer(self):
+        return _molecule.molecule_z_order_buffer(self)
+
 # Register molecule in _molecule:
 _molecule.molecule_swigregister(molecule)
 
@@ -154,15 +184,27 @@ def molcopy(src):
 def molfree(ptr):
     return _molecule.molfree(ptr)
 
+def molreserve(molecule, atom_max, bond_max):
+    return _molecule.molreserve(molecule, atom_max, bond_max)
+
 def molappend_atom(molecule, atom):
     return _molecule.molappend_atom(molecule, atom)
 
 def molappend_bond(molecule, bond):
     return _molecule.molappend_bond(molecule, bond)
 
+def molappend_atoms(molecule, atoms, count):
+    return _molecule.molappend_atoms(molecule, atoms, count)
+
+def molappend_bonds(molecule, bonds, count):
+    return _molecule.molappend_bonds(molecule, bonds, count)
+
 def molsort(molecule):
     return _molecule.molsort(molecule)
 
+def molorder(molecule, order):
+    return _molecule.molorder(molecule, order)
+
 def atom_compare(a, b):
     return _molecule.atom_compare(a, b)
 
@@ -180,4 +222,41 @@ def zrotation(xform_matrix, deg):
 
 def mol_xform(molecule, matrix):
     return _molecule.mol_xform(molecule, matrix)
+ATOM_SIZE = _molecule.ATOM_SIZE
+BOND_SIZE = _molecule.BOND_SIZE
+SDF_PERCEIVE_BONDS = _molecule.SDF_PERCEIVE_BONDS
+BOND_TOLERANCE = _molecule.BOND_TOLERANCE
+BOND_MIN_DISTANCE = _molecule.BOND_MIN_DISTANCE
+DEFAULT_COVALENT_RADIUS = _molecule.DEFAULT_COVALENT_RADIUS
+GRID_CELLS_PER_ATOM = _molecule.GRID_CELLS_PER_ATOM
+class spatial_grid(object):
+    thisown = property(lambda x: x.this.own(), lambda x, v: x.this.own(v), doc="The membership flag")
+    __repr__ = _swig_repr
+    cell = property(_molecule.spatial_grid_cell_get)
+    min_x = property(_molecule.spatial_grid_min_x_get)
+    min_y = property(_molecule.spatial_grid_min_y_get)
+    min_z = property(_molecule.spatial_grid_min_z_get)
+    nx = property(_molecule.spatial_grid_nx_get)
+    ny = property(_molecule.spatial_grid_ny_get)
+    nz = property(_molecule.spatial_grid_nz_get)
+    atom_no = property(_molecule.spatial_grid_atom_no_get)
+
+    def __init__(self, mol, cell):
+        _molecule.spatial_grid_swiginit(self, _molecule.new_spatial_grid(mol, cell))
+    __swig_destroy__ = _molecule.delete_spatial_grid
+
+    def radius_buffer(self, x, y, z, radius):
+        return _molecule.spatial_grid_radius_buffer(self, x, y, z, radius)
+
+    def box_buffer(self, x1, y1, z1, x2, y2, z2):
+        return _molecule.spatial_grid_box_buffer(self, x1, y1, z1, x2, y2, z2)
+
+# Register spatial_grid in _molecule:
+_molecule.spatial_grid_swigregister(spatial_grid)
+
+def covalent_radius(element):
+    return _molecule.covalent_radius(element)
+
+def sdf_offsets(data):
+    return _molecule.sdf_offsets(data)
 
@@ -1,20 +1,386 @@
 import os
+import math
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
 import psycopg2
 from psycopg2 import sql
+from psycopg2 import extensions
+from psycopg2 import extras
 import mol_display
+import fingerprint
+import metrics
+
+# Number of rows sent per multi-row INSERT by Database.add_geometry()
+BULK_PAGE_SIZE = 1000
+
+# Geometry storage modes of Database.add_geometry(): one row per atom and bond, or one packed column per molecule
+STORAGE_ROWS = "rows"
+STORAGE_PACKED = "packed"
+
+# Name matching modes of Database.list_molecules()
+MATCH_PREFIX = "prefix"
+MATCH_SUBSTRING = "substring"
+
+# Orderings of Database.list_molecules(), each paginated by a keyset on a unique column
+SORT_ID = "id"
+SORT_NAME = "name"
+
+# Channel on which the Elements trigger announces each new palette version
+PALETTE_CHANNEL = "palette_changed"
+
+# Key of the advisory lock that serialises Database.create_tables() across processes
+SCHEMA_LOCK = 0x6d6f6c73
+
+# Digest of the Elements table that serves as the palette version
+PALETTE_DIGEST = """SELECT md5(COALESCE(string_agg(
+                        concat_ws('|', ELEMENT_CODE, ELEMENT_NAME, COLOUR1, COLOUR2, COLOUR3, RADIUS),
+                        ',' ORDER BY ELEMENT_CODE), ''))
+                    FROM Elements"""
+
+def connect():
+    """
+    Opens a new connection to the PostgreSQL database named by the DATABASE_URL environment variable.
+
+    The SSL mode defaults to 'require' and can be overridden with the DATABASE_SSLMODE environment
+    variable.
+
+    Returns:
+        connection: A new psycopg2 connection.
+    """
+    DATABASE_URL = os.environ['DATABASE_URL']
+    with metrics.stage("db_connect"):
+        return psycopg2.connect(DATABASE_URL, sslmode=os.environ.get('DATABASE_SSLMODE', 'require'))
+
+class TimedCursor(extensions.cursor):
+    """
+    A cursor that records the duration of every statement it executes with metrics.record_query().
+    Database uses it only while instrumentation is enabled.
+    """
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            metrics.record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            metrics.record_query(query, time.perf_counter() - start)
+
+def list_molecules_query(limit: int, after, query: str, match: str, sort: str) -> tuple:
+    """
+    Builds the keyset-paginated query of Database.list_molecules().
+
+    One row more than limit is selected, so that list_molecules_page() can tell whether another
+    page follows.
+
+    Returns:
+        tuple: The SQL, with %s placeholders, and its parameters.
+    Raises:
+        ValueError: If match or sort is not recognised.
+    """
+    if sort not in (SORT_ID, SORT_NAME):
+        raise ValueError(f"Unknown sort order {sort!r}")
+    if match not in (MATCH_PREFIX, MATCH_SUBSTRING):
+        raise ValueError(f"Unknown match mode {match!r}")
+
+    key = "MOLECULE_ID" if sort == SORT_ID else "NAME"
+    conditions, params = [], []
+    if query:
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        if match == MATCH_PREFIX:
+            conditions.append("lower(NAME) LIKE %s")
+            params.append(pattern.lower() + "%")
+        else:
+            conditions.append("NAME ILIKE %s")
+            params.append("%" + pattern + "%")
+    if after is not None:
+        conditions.append(f"{key} > %s")
+        params.append(after)
+
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    return (f"""SELECT MOLECULE_ID, NAME, ATOM_COUNT, BOND_COUNT FROM Molecules
+                {where} ORDER BY {key} LIMIT %s""", params + [limit + 1])
+
+def list_molecules_page(rows: list, limit: int, sort: str) -> tuple:
+    """
+    Splits the rows selected by list_molecules_query() into a page and the key of the next page.
+
+    Returns:
+        tuple: The (name, atom count, bond count) tuples of the page and the sort key of its last
+               molecule, or None if this is the last page.
+    """
+    page = rows[:limit]
+    following = None
+    if len(rows) > limit:
+        following = page[-1][0] if sort == SORT_ID else page[-1][1]
+    return [tuple(row[1:]) for row in page], following
+
+def search_molecules_query(constraints: dict, reference: int=None, threshold: float=0.0, limit: int=50,
+                           after: int=None) -> tuple:
+    """
+    Builds the query of Database.search_molecules().
+
+    Candidates are first screened on Molecules alone: their fingerprint must contain the bits of
+    every required feature, and for similarity searches their FINGERPRINT_COUNT must lie within
+    the bounds a Tanimoto similarity of at least threshold allows, which the index on
+    FINGERPRINT_COUNT serves. Only the candidates left are checked against the exact counts in
+    MoleculeFeatures. Atoms and Bonds are never read.
+
+    Without a reference, one row more than limit is selected in MOLECULE_ID order, so that
+    search_molecules_page() can tell whether another page follows. With a reference, the limit
+    most similar molecules are selected and there are no further pages.
+
+    Returns:
+        tuple: The SQL, with %s placeholders, and its parameters.
+    """
+    bits = f"bit({fingerprint.FINGERPRINT_BITS})"
+    required = fingerprint.fingerprint({feature: minimum for feature, (minimum, _) in constraints.items()})
+    conditions, params = ["FINGERPRINT IS NOT NULL"], []
+
+    if required:
+        conditions.append(f"FINGERPRINT_COUNT >= %s AND FINGERPRINT & %s::text::{bits} = %s::text::{bits}")
+        params += [required.bit_count(), fingerprint.bit_string(required), fingerprint.bit_string(required)]
+
+    if reference is not None:
+        # Tanimoto similarity t needs t * |reference| <= |candidate| <= |reference| / t
+        count = reference.bit_count()
+        conditions.append("FINGERPRINT_COUNT BETWEEN %s AND %s")
+        params += [math.ceil(count * threshold - 1e-9),
+                   math.floor(count / threshold + 1e-9) if threshold > 0 else fingerprint.FINGERPRINT_BITS]
+
+    for feature, (minimum, maximum) in constraints.items():
+        if minimum > 0:
+            conditions.append("""EXISTS (SELECT 1 FROM MoleculeFeatures
+                                  WHERE MoleculeFeatures.MOLECULE_ID = Molecules.MOLECULE_ID
+                                  AND FEATURE = %s AND COUNT BETWEEN %s AND %s)""")
+            params += [feature, minimum, maximum if maximum is not None else 2**31 - 1]
+        elif maximum is not None:
+            conditions.append("""NOT EXISTS (SELECT 1 FROM MoleculeFeatures
+                                      WHERE MoleculeFeatures.MOLECULE_ID = Molecules.MOLECULE_ID
+                                      AND FEATURE = %s AND COUNT > %s)""")
+            params += [feature, maximum]
+
+    if reference is None:
+        if after is not None:
+            conditions.append("MOLECULE_ID > %s")
+            params.append(after)
+        return (f"""SELECT MOLECULE_ID, NAME, ATOM_COUNT, BOND_COUNT, NULL FROM Molecules
+                    WHERE {" AND ".join(conditions)} ORDER BY MOLECULE_ID LIMIT %s""", params + [limit + 1])
+
+    reference_bits = fingerprint.bit_string(reference)
+    return (f"""SELECT * FROM
+                    (SELECT MOLECULE_ID, NAME, ATOM_COUNT, BOND_COUNT,
+                     COALESCE(bit_count(FINGERPRINT & %s::text::{bits})::float8
+                              / NULLIF(bit_count(FINGERPRINT | %s::text::{bits}), 0), 1.0) AS SIMILARITY
+                     FROM Molecules WHERE {" AND ".join(conditions)}) AS candidates
+                WHERE SIMILARITY >= %s ORDER BY SIMILARITY DESC, MOLECULE_ID LIMIT %s""",
+            [reference_bits, reference_bits] + params + [threshold, limit])
+
+def search_molecules_page(rows: list, limit: int, reference: int=None) -> tuple:
+    """
+    Splits the rows selected by search_molecules_query() into a page and the key of the next page.
+
+    Returns:
+        tuple: The (name, atom count, bond count, similarity) tuples of the page, with a similarity
+               of None unless a reference was given, and the MOLECULE_ID of its last molecule, or
+               None if this is the last page.
+    """
+    page = rows[:limit]
+    following = page[-1][0] if reference is None and len(rows) > limit else None
+    return [tuple(row[1:]) for row in page], following
+
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout.
+    """
+
+class ConnectionPool:
+    def __init__(self, minconn: int=1, maxconn: int=10, timeout: float=5.0, health_check_interval: float=30.0):
+        """
+        Initializes a new pool of PostgreSQL connections shared by every thread of the process.
+
+        Connections are opened lazily, so creating a pool does not touch the database. bootstrap()
+        opens minconn connections up front, more are opened on demand, and at most maxconn
+        connections are open at once.
+
+        Args:
+            minconn (int, optional): The number of connections opened by bootstrap(). Defaults to 1.
+            maxconn (int, optional): The maximum number of open connections. Defaults to 10.
+            timeout (float, optional): The number of seconds a checkout waits for a free connection
+                before raising PoolTimeout. Defaults to 5.0.
+            health_check_interval (float, optional): Connections idle for longer than this many
+                seconds are pinged before being handed out. Defaults to 30.0.
+        """
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._in_use = 0
+        self._bootstrapped = False
+        self._cond = threading.Condition()
+
+    def getconn(self, timeout: float=None):
+        """
+        Checks a connection out of the pool, opening a new one if none is idle and the pool is not full.
+
+        Idle connections that have been closed or that fail a health check are discarded and replaced.
+
+        Args:
+            timeout (float, optional): Overrides the pool's checkout timeout. Defaults to None.
+
+        Returns:
+            connection: A psycopg2 connection that must be returned with putconn().
+
+        Raises:
+            PoolTimeout: If no connection becomes available in time.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while not self._idle and self._in_use >= self.maxconn:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise PoolTimeout(f"no database connection available after {timeout} seconds")
+            self._in_use += 1
+            idle = self._idle.pop() if self._idle else None
+
+        try:
+            if idle is not None:
+                conn, returned_at = idle
+                if self._healthy(conn, time.monotonic() - returned_at):
+                    return conn
+                self._close(conn)
+            return connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, discard: bool=False):
+        """
+        Returns a connection to the pool, rolling back any transaction left open on it.
+
+        Args:
+            conn (connection): A connection previously checked out with getconn().
+            discard (bool, optional): If True, closes the connection instead of keeping it.
+                Defaults to False.
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            keep = not discard and not conn.closed
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if not keep:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self, timeout: float=None):
+        """
+        Checks out a connection for the duration of a with block and wraps it in a Database.
+
+        Args:
+            timeout (float, optional): Overrides the pool's checkout timeout. Defaults to None.
+
+        Yields:
+            Database: A Database using the checked out connection.
+        """
+        conn = self.getconn(timeout)
+        try:
+            yield Database(conn=conn)
+        finally:
+            self.putconn(conn)
+
+    def bootstrap(self):
+        """
+        Creates the database tables and opens minconn connections, once for this process.
+        """
+        with self._cond:
+            if self._bootstrapped:
+                return
+            self._bootstrapped = True
+
+        conns = [self.getconn() for _ in range(max(1, min(self.minconn, self.maxconn)))]
+        Database(conn=conns[0]).create_tables()
+        for conn in conns:
+            self.putconn(conn)
+
+    def closeall(self):
+        """
+        Closes every idle connection in the pool.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        """
+        Returns the current utilisation of the pool.
+
+        Returns:
+            dict: A dictionary with the number of idle and checked out connections and the pool limits.
+        """
+        with self._cond:
+            return {"idle": len(self._idle), "in_use": self._in_use,
+                    "minconn": self.minconn, "maxconn": self.maxconn}
+
+    def _healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
 
 class Database:
-    def __init__(self, reset: bool=False):
+    def __init__(self, reset: bool=False, conn=None, storage: str=None):
         """
-        Initializes a new Database object and connects to an SQLite database.
+        Initializes a new Database object and connects to the PostgreSQL database.
 
         Args:
-            reset (bool, optional): If True, deletes the existing database file and creates
-                a new one. Defaults to False.
+            reset (bool, optional): If True, drops the existing tables and creates new ones.
+                Defaults to False.
+            conn (connection, optional): An open connection to use, such as one checked out of a
+                ConnectionPool. Defaults to None, which opens a new connection.
+            storage (str, optional): How add_geometry() stores new molecules, STORAGE_ROWS or
+                STORAGE_PACKED. Defaults to None, which uses the GEOMETRY_STORAGE environment
+                variable or STORAGE_ROWS if it is not set.
         """
-        DATABASE_URL = os.environ['DATABASE_URL']
-        self.conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        self.cursor = self.conn.cursor()
+        self.conn = conn if conn is not None else connect()
+        self.cursor = self.conn.cursor(cursor_factory=TimedCursor) if metrics.enabled else self.conn.cursor()
+        self.storage = storage or os.environ.get("GEOMETRY_STORAGE", STORAGE_ROWS)
+
+        if self.storage not in (STORAGE_ROWS, STORAGE_PACKED):
+            raise ValueError(f"Unknown geometry storage mode {self.storage!r}")
         
         if reset:
             self.drop_tables()
@@ -24,7 +390,8 @@ class Database:
         """
         Drops all tables from the database.
         """
-        tables = ["Elements", "Atoms", "Bonds", "Molecules", "MoleculeAtom", "MoleculeBond"]
+        tables = ["Frames", "MoleculeFeatures", "Elements", "PaletteVersion", "Atoms", "Bonds", "Molecules",
+                  "MoleculeAtom", "MoleculeBond"]
         for table in tables:
             self.cursor.execute(f"DROP TABLE IF EXISTS {table}")
         self.conn.commit()
@@ -32,8 +399,32 @@ class Database:
     def create_tables(self):
         """
         Creates the necessary tables in the PostgreSQL database for storing Elements, Atoms, Bonds, Molecules,
-        and their relationships.
+        their relationships, and pre-rendered rotation Frames.
+
+        Molecules stored in packed mode keep their geometry in the GEOMETRY column of their Molecules
+        row instead of in Atoms and Bonds, every molecule records a SHA-256 of its packed geometry
+        in CONTENT_HASH, and its atom and bond counts in ATOM_COUNT and BOND_COUNT. These columns are
+        added to Molecules tables created before they existed, and the counts are backfilled.
+        STRUCTURE_HASH holds the order-independent mol_display.structure_hash() of a molecule, and
+        ALIAS_OF marks a molecule whose structure was already stored under another name and whose
+        atoms, bonds and frames are those of that molecule.
+
+        For structural search, MoleculeFeatures holds the count of every element and bond pattern
+        of each molecule, and FINGERPRINT the fingerprint.fingerprint() of those counts, with the
+        number of bits it sets in FINGERPRINT_COUNT.
+
+        Names are indexed for the prefix and substring searches of list_molecules(): a btree on
+        lower(NAME) serves prefix matches, and a pg_trgm GIN index serves substring matches where the
+        extension can be installed. Without it substring searches still work but scan the table.
+
+        The palette version is kept in the single row of PaletteVersion by a statement trigger on
+        Elements, which also announces every new version on PALETTE_CHANNEL.
+
+        Every server worker calls this at boot, so the DDL runs under the SCHEMA_LOCK advisory lock
+        and the trigger and its function are only created when missing; concurrent catalog updates
+        would otherwise fail with "tuple concurrently updated".
         """
+        self.cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,))
         self.cursor.execute("""CREATE TABLE IF NOT EXISTS Elements
                             (ELEMENT_NO   INTEGER,
                             ELEMENT_CODE VARCHAR(3) PRIMARY KEY,
@@ -43,6 +434,31 @@ class Database:
                             COLOUR3      CHAR(6),
                             RADIUS       DECIMAL(3,1));""")  
 
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS PaletteVersion
+                            (ID      BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (ID),
+                            VERSION CHAR(32) NOT NULL);""")
+
+        self.cursor.execute("SELECT to_regprocedure('palette_changed()')")
+        if self.cursor.fetchone()[0] is None:
+            self.cursor.execute(f"""CREATE FUNCTION palette_changed() RETURNS trigger AS $$
+                                    DECLARE
+                                        version TEXT := ({PALETTE_DIGEST});
+                                    BEGIN
+                                        INSERT INTO PaletteVersion (ID, VERSION) VALUES (TRUE, version)
+                                            ON CONFLICT (ID) DO UPDATE SET VERSION = EXCLUDED.VERSION;
+                                        PERFORM pg_notify('{PALETTE_CHANNEL}', version);
+                                        RETURN NULL;
+                                    END;
+                                    $$ LANGUAGE plpgsql""")
+        self.cursor.execute("""SELECT 1 FROM pg_trigger WHERE tgname = 'elements_palette_version'
+                               AND tgrelid = 'elements'::regclass""")
+        if self.cursor.fetchone() is None:
+            self.cursor.execute("""CREATE TRIGGER elements_palette_version
+                                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON Elements
+                                    FOR EACH STATEMENT EXECUTE FUNCTION palette_changed()""")
+        self.cursor.execute(f"""INSERT INTO PaletteVersion (ID, VERSION) VALUES (TRUE, ({PALETTE_DIGEST}))
+                                ON CONFLICT (ID) DO UPDATE SET VERSION = EXCLUDED.VERSION""")
+
         self.cursor.execute("""CREATE TABLE IF NOT EXISTS Atoms
                             (ATOM_ID      SERIAL PRIMARY KEY,
                             ELEMENT_CODE VARCHAR(3) REFERENCES Elements(ELEMENT_CODE),
@@ -56,9 +472,37 @@ class Database:
                             A2      INTEGER,
                             EPAIRS  INTEGER);""")  
 
-        self.cursor.execute("""CREATE TABLE IF NOT EXISTS Molecules
+        self.cursor.execute(f"""CREATE TABLE IF NOT EXISTS Molecules
                             (MOLECULE_ID SERIAL PRIMARY KEY,
-                            NAME        TEXT UNIQUE);""") 
+                            NAME         TEXT UNIQUE,
+                            GEOMETRY     BYTEA,
+                            CONTENT_HASH CHAR(64),
+                            ATOM_COUNT   INTEGER,
+                            BOND_COUNT   INTEGER,
+                            STRUCTURE_HASH CHAR(64),
+                            ALIAS_OF     INTEGER REFERENCES Molecules(MOLECULE_ID),
+                            FINGERPRINT  BIT({fingerprint.FINGERPRINT_BITS}),
+                            FINGERPRINT_COUNT INTEGER);""") 
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS GEOMETRY BYTEA")
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS CONTENT_HASH CHAR(64)")
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS ATOM_COUNT INTEGER")
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS BOND_COUNT INTEGER")
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS STRUCTURE_HASH CHAR(64)")
+        self.cursor.execute("""ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS
+                               ALIAS_OF INTEGER REFERENCES Molecules(MOLECULE_ID)""")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS molecules_name_prefix ON Molecules (lower(NAME) text_pattern_ops)")
+        self.cursor.execute("""CREATE INDEX IF NOT EXISTS molecules_structure_hash ON Molecules (STRUCTURE_HASH)
+                               WHERE ALIAS_OF IS NULL""")
+        self.cursor.execute(f"ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS FINGERPRINT BIT({fingerprint.FINGERPRINT_BITS})")
+        self.cursor.execute("ALTER TABLE Molecules ADD COLUMN IF NOT EXISTS FINGERPRINT_COUNT INTEGER")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS molecules_fingerprint_count ON Molecules (FINGERPRINT_COUNT)")
+
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS MoleculeFeatures
+                            (MOLECULE_ID INTEGER REFERENCES Molecules(MOLECULE_ID),
+                            FEATURE     TEXT,
+                            COUNT       INTEGER,
+                            PRIMARY KEY (MOLECULE_ID, FEATURE));""")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS molecule_features_count ON MoleculeFeatures (FEATURE, COUNT)")
 
         self.cursor.execute("""CREATE TABLE IF NOT EXISTS MoleculeAtom
                             (MOLECULE_ID INTEGER,
@@ -73,8 +517,39 @@ class Database:
                             PRIMARY KEY (MOLECULE_ID, BOND_ID),
                             FOREIGN KEY (MOLECULE_ID) REFERENCES Molecules(MOLECULE_ID),
                             FOREIGN KEY (BOND_ID) REFERENCES Bonds(BOND_ID));""")
+
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS Frames
+                            (MOLECULE_ID     INTEGER,
+                            AXIS            CHAR(1),
+                            DEGREE          SMALLINT,
+                            PALETTE_VERSION CHAR(32),
+                            SVG             BYTEA,
+                            PRIMARY KEY (MOLECULE_ID, AXIS, DEGREE, PALETTE_VERSION),
+                            FOREIGN KEY (MOLECULE_ID) REFERENCES Molecules(MOLECULE_ID));""")
+
+        # Packed geometry stores the counts as little-endian u4s after its 4-byte magic
+        self.cursor.execute("""UPDATE Molecules SET
+                                ATOM_COUNT = CASE WHEN GEOMETRY IS NOT NULL
+                                    THEN get_byte(GEOMETRY, 4) | (get_byte(GEOMETRY, 5) << 8)
+                                         | (get_byte(GEOMETRY, 6) << 16) | (get_byte(GEOMETRY, 7) << 24)
+                                    ELSE (SELECT COUNT(*) FROM MoleculeAtom
+                                          WHERE MoleculeAtom.MOLECULE_ID = Molecules.MOLECULE_ID) END,
+                                BOND_COUNT = CASE WHEN GEOMETRY IS NOT NULL
+                                    THEN get_byte(GEOMETRY, 8) | (get_byte(GEOMETRY, 9) << 8)
+                                         | (get_byte(GEOMETRY, 10) << 16) | (get_byte(GEOMETRY, 11) << 24)
+                                    ELSE (SELECT COUNT(*) FROM MoleculeBond
+                                          WHERE MoleculeBond.MOLECULE_ID = Molecules.MOLECULE_ID) END
+                                WHERE ATOM_COUNT IS NULL OR BOND_COUNT IS NULL""")
         self.conn.commit()
 
+        try:
+            self.cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,))
+            self.cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS molecules_name_trgm ON Molecules USING GIN (NAME gin_trgm_ops)")
+            self.conn.commit()
+        except psycopg2.Error:
+            self.conn.rollback()
+
         
     def __setitem__(self, table: str, values: tuple):
         """
@@ -148,6 +623,9 @@ class Database:
         """
         Adds a new molecule to the database with the given name and file pointer.
 
+        The molecule row and all of its atoms and bonds are inserted in a single transaction
+        using add_geometry().
+
         Args:
             name (str): The name of the molecule to add.
             fp (IO): A file pointer to the molecule data file.
@@ -155,55 +633,181 @@ class Database:
         molecule = mol_display.Molecule()
         molecule.parse(fp)
 
-        self.cursor.execute(
-            "INSERT INTO Molecules (NAME) VALUES (%s) RETURNING MOLECULE_ID",
-            (name,))
-        mol_id = self.cursor.fetchone()[0]
+        elements, xyz = molecule.atom_arrays()
+        pairs, epairs = molecule.bond_arrays()
+        atoms = [(element, x, y, z) for element, (x, y, z) in zip(elements.tolist(), xyz.tolist())]
+        bonds = [(a1, a2, e) for (a1, a2), e in zip(pairs.tolist(), epairs.tolist())]
 
-        for i in range(molecule.atom_no):
-            atom = mol_display.Atom(molecule.get_atom(i))
-            self.add_atom(mol_id, atom)
+        self.add_geometry(name, atoms, bonds)
 
-        for i in range(molecule.bond_no):
-            bond = mol_display.Bond(molecule.get_bond(i))
-            self.add_bond(mol_id, bond)
+    def add_geometry(self, name: str, atoms: list, bonds: list, commit: bool=True) -> int:
+        """
+        Inserts a molecule row together with its atoms and bonds using batched multi-row inserts.
 
-        self.conn.commit()
+        If a molecule with the same structure_hash() is already stored, only an alias row pointing
+        at it is inserted, and the atoms and bonds are not stored again. The element and bond
+        pattern counts and fingerprint searched by search_molecules() are stored in either case.
+
+        Atoms and MoleculeAtom rows (and likewise Bonds and MoleculeBond rows) are written by one
+        statement per page of BULK_PAGE_SIZE rows, so a molecule costs a handful of round trips
+        rather than several per atom. In packed storage mode the atoms and bonds are instead packed
+        with mol_display.pack_geometry() into the molecule row itself. If any insert fails and commit
+        is True, the whole transaction is rolled back; otherwise recovering the transaction is left
+        to the caller.
+
+        Args:
+            name (str): The name of the molecule to add.
+            atoms (list): A list of (element, x, y, z) tuples in atom index order.
+            bonds (list): A list of (a1, a2, epairs) tuples with zero-based atom indices.
+            commit (bool, optional): If False, leaves the transaction open so that several
+                molecules can be committed together. Defaults to True.
+
+        Returns:
+            int: The MOLECULE_ID of the new molecule.
+        """
+        geometry = mol_display.pack_geometry([atom[0] for atom in atoms],
+                                             [atom[1:] for atom in atoms],
+                                             [bond[:2] for bond in bonds],
+                                             [bond[2] for bond in bonds])
+        content_hash = hashlib.sha256(geometry).hexdigest()
+        structure_hash = mol_display.structure_hash([atom[0] for atom in atoms],
+                                                    [atom[1:] for atom in atoms],
+                                                    [bond[:2] for bond in bonds],
+                                                    [bond[2] for bond in bonds])
+        counts = fingerprint.features([atom[0] for atom in atoms], [bond[:2] for bond in bonds],
+                                      [bond[2] for bond in bonds])
+        bits = fingerprint.fingerprint(counts)
+
+        try:
+            self.cursor.execute("""SELECT MOLECULE_ID, CONTENT_HASH FROM Molecules
+                                   WHERE STRUCTURE_HASH = %s AND ALIAS_OF IS NULL
+                                   ORDER BY MOLECULE_ID LIMIT 1""", (structure_hash,))
+            original = self.cursor.fetchone()
+
+            columns = {"NAME": name, "CONTENT_HASH": content_hash, "ATOM_COUNT": len(atoms),
+                       "BOND_COUNT": len(bonds), "STRUCTURE_HASH": structure_hash,
+                       "FINGERPRINT": fingerprint.bit_string(bits), "FINGERPRINT_COUNT": bits.bit_count()}
+            if original is not None:
+                columns.update(CONTENT_HASH=original[1] or content_hash, ALIAS_OF=original[0])
+            elif self.storage == STORAGE_PACKED:
+                columns["GEOMETRY"] = psycopg2.Binary(geometry)
+
+            self.cursor.execute(f"""INSERT INTO Molecules ({", ".join(columns)})
+                                    VALUES ({", ".join(["%s"] * len(columns))}) RETURNING MOLECULE_ID""",
+                                list(columns.values()))
+            mol_id = self.cursor.fetchone()[0]
+            if original is not None or self.storage == STORAGE_PACKED:
+                atoms, bonds = [], []
 
+            if counts:
+                self.cursor.execute("""INSERT INTO MoleculeFeatures (MOLECULE_ID, FEATURE, COUNT)
+                                       SELECT %s, * FROM unnest(%s::text[], %s::int[])""",
+                                    (mol_id, list(counts), list(counts.values())))
+
+            if atoms:
+                extras.execute_values(self.cursor, sql.SQL(
+                    """WITH inserted AS (INSERT INTO Atoms (ELEMENT_CODE, X, Y, Z) VALUES %s RETURNING ATOM_ID)
+                       INSERT INTO MoleculeAtom (MOLECULE_ID, ATOM_ID) SELECT {}, ATOM_ID FROM inserted"""
+                    ).format(sql.Literal(mol_id)), atoms, page_size=BULK_PAGE_SIZE)
+
+            if bonds:
+                extras.execute_values(self.cursor, sql.SQL(
+                    """WITH inserted AS (INSERT INTO Bonds (A1, A2, EPAIRS) VALUES %s RETURNING BOND_ID)
+                       INSERT INTO MoleculeBond (MOLECULE_ID, BOND_ID) SELECT {}, BOND_ID FROM inserted"""
+                    ).format(sql.Literal(mol_id)), bonds, page_size=BULK_PAGE_SIZE)
+
+            if commit:
+                self.conn.commit()
+        except Exception:
+            if commit:
+                self.conn.rollback()
+            raise
+
+        return mol_id
+
+    def pack_molecule(self, name: str, drop_rows: bool=False) -> bool:
+        """
+        Converts a molecule stored as Atoms and Bonds rows to packed geometry in its Molecules row.
+
+        The caller commits, so that many molecules can be converted in one transaction.
+
+        Args:
+            name (str): The name of the molecule to convert.
+            drop_rows (bool, optional): If True, deletes the molecule's Atoms, Bonds, MoleculeAtom
+                and MoleculeBond rows once it is packed. Defaults to False.
+
+        Returns:
+            bool: True if the molecule was converted, False if it was already packed, is an alias or
+                  does not exist.
+        """
+        self.cursor.execute("""SELECT MOLECULE_ID, GEOMETRY IS NOT NULL OR ALIAS_OF IS NOT NULL
+                               FROM Molecules WHERE NAME = %s""", (name,))
+        row = self.cursor.fetchone()
+        if row is None or row[1]:
+            return False
+        mol_id = row[0]
+
+        self.cursor.execute("UPDATE Molecules SET GEOMETRY = %s WHERE MOLECULE_ID = %s",
+                            (psycopg2.Binary(self.load_mol(name).pack()), mol_id))
+
+        if drop_rows:
+            self.cursor.execute("DELETE FROM MoleculeAtom WHERE MOLECULE_ID = %s RETURNING ATOM_ID", (mol_id,))
+            self.cursor.execute("DELETE FROM Atoms WHERE ATOM_ID = ANY(%s)", ([r[0] for r in self.cursor.fetchall()],))
+            self.cursor.execute("DELETE FROM MoleculeBond WHERE MOLECULE_ID = %s RETURNING BOND_ID", (mol_id,))
+            self.cursor.execute("DELETE FROM Bonds WHERE BOND_ID = ANY(%s)", ([r[0] for r in self.cursor.fetchall()],))
+
+        return True
 
     def load_mol(self, name) -> mol_display.Molecule:
         """
         Retrieves a molecule from the database with the given name, and returns a corresponding
         mol_display.Molecule object.
 
+        Molecules with packed geometry are decoded from their single Molecules row; others are
+        loaded from their Atoms and Bonds rows. An alias loads the molecule it is an alias of.
+
         Args:
             name (str): The name of the molecule to retrieve.
 
         Returns:
             mol_display.Molecule: A mol_display.Molecule object representing the specified molecule.
         """
+        with metrics.stage("load_mol"):
+            return self._load_mol(name)
+
+    def _load_mol(self, name) -> mol_display.Molecule:
+        self.cursor.execute("""SELECT Source.MOLECULE_ID, Source.GEOMETRY
+                                FROM Molecules
+                                JOIN Molecules AS Source
+                                ON Source.MOLECULE_ID = COALESCE(Molecules.ALIAS_OF, Molecules.MOLECULE_ID)
+                                WHERE Molecules.NAME = %s""", (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return mol_display.Molecule(0, 0)
+        if row[1] is not None:
+            return mol_display.Molecule.unpack(row[1])
+
         query = """SELECT Atoms.*, Elements.*
                     FROM Atoms
                     JOIN Elements ON Atoms.ELEMENT_CODE = Elements.ELEMENT_CODE
                     JOIN MoleculeAtom ON Atoms.ATOM_ID = MoleculeAtom.ATOM_ID
-                    JOIN Molecules ON Molecules.MOLECULE_ID = MoleculeAtom.MOLECULE_ID
-                    WHERE Molecules.NAME = %s
+                    WHERE MoleculeAtom.MOLECULE_ID = %s
                     ORDER BY Atoms.ATOM_ID ASC"""
-        atoms_result = self.cursor.execute(query, (name,)).fetchall()
+        self.cursor.execute(query, (row[0],))
+        atoms_result = self.cursor.fetchall()
 
         query = """SELECT Bonds.*
                     FROM Bonds
                     JOIN MoleculeBond ON Bonds.BOND_ID = MoleculeBond.BOND_ID
-                    JOIN Molecules ON Molecules.MOLECULE_ID = MoleculeBond.MOLECULE_ID
-                    WHERE Molecules.NAME = %s
+                    WHERE MoleculeBond.MOLECULE_ID = %s
                     ORDER BY Bonds.BOND_ID ASC"""
-        bonds_result = self.cursor.execute(query, (name,)).fetchall()
+        self.cursor.execute(query, (row[0],))
+        bonds_result = self.cursor.fetchall()
 
-        mol = mol_display.Molecule()
-        for atom in atoms_result:
-            mol.append_atom(atom[1], atom[2], atom[3], atom[4])
-        for bond in bonds_result:
-            mol.append_bond(bond[1], bond[2], bond[3])
+        mol = mol_display.Molecule(len(atoms_result), len(bonds_result))
+        mol.append_atoms([atom[1] for atom in atoms_result],
+                         [(float(atom[2]), float(atom[3]), float(atom[4])) for atom in atoms_result])
+        mol.append_bonds([(bond[1], bond[2]) for bond in bonds_result], [bond[3] for bond in bonds_result])
 
         return mol
 
@@ -238,12 +842,230 @@ class Database:
         Returns:
             str: A string containing the XML definitions for radial gradients based on element colors.
         """
-        gradients = ""
         self.cursor.execute("SELECT ELEMENT_NAME, COLOUR1, COLOUR2, COLOUR3 FROM Elements")
-        elements = self.cursor.fetchall()
+        return "".join(mol_display.radial_gradient(*row) for row in self.cursor.fetchall())
+
+    def render_context(self, version: str=None) -> mol_display.RenderContext:
+        """
+        Returns a RenderContext with the radius, name and gradient of every element, read in one query.
+
+        Args:
+            version (str, optional): The version of the Elements table, as returned by
+                elements_version(), recorded in the context. Defaults to None.
+
+        Returns:
+            RenderContext: A new immutable render context.
+        """
+        self.cursor.execute("SELECT ELEMENT_CODE, ELEMENT_NAME, COLOUR1, COLOUR2, COLOUR3, RADIUS FROM Elements")
+        return mol_display.RenderContext.from_elements(self.cursor.fetchall(), version)
+
+    def elements_version(self) -> str:
+        """
+        Returns a version string for the Elements table that changes whenever any element's
+        name, colours or radius changes.
+
+        The version is computed by a trigger when Elements is written and read here from its
+        PaletteVersion row, so it costs a single-row lookup rather than a scan of Elements.
+
+        Returns:
+            str: An MD5 digest of the contents of the Elements table.
+        """
+        with metrics.stage("palette_version"):
+            self.cursor.execute("SELECT VERSION FROM PaletteVersion")
+        return self.cursor.fetchone()[0]
+
+    def atom_count(self, name: str) -> int:
+        """
+        Returns the number of atoms in the given molecule, counting them for molecules added before
+        ATOM_COUNT existed.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            int: The number of atoms, or None if there is no such molecule.
+        """
+        self.cursor.execute("SELECT ATOM_COUNT FROM Molecules WHERE NAME = %s", (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return row[0] if row[0] is not None else self.load_mol(name).atom_no
+
+    def content_hash(self, name: str) -> str:
+        """
+        Returns the SHA-256 of the packed geometry of the given molecule, computing and storing it
+        first for molecules added before CONTENT_HASH existed.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            str: The hex digest of the molecule's packed geometry, or None if there is no such molecule.
+        """
+        self.cursor.execute("SELECT MOLECULE_ID, CONTENT_HASH FROM Molecules WHERE NAME = %s", (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        if row[1] is not None:
+            return row[1]
+
+        content_hash = hashlib.sha256(self.load_mol(name).pack()).hexdigest()
+        self.cursor.execute("UPDATE Molecules SET CONTENT_HASH = %s WHERE MOLECULE_ID = %s", (content_hash, row[0]))
+        self.conn.commit()
+        return content_hash
+
+    def molecules_version(self) -> str:
+        """
+        Returns a version string for the list of molecules that changes whenever a molecule is added or removed.
+
+        Returns:
+            str: The number of molecules and the largest MOLECULE_ID, joined by a hyphen.
+        """
+        self.cursor.execute("SELECT COUNT(*), COALESCE(MAX(MOLECULE_ID), 0) FROM Molecules")
+        return "%d-%d" % self.cursor.fetchone()
+
+    def list_molecules(self, limit: int=50, after=None, query: str=None, match: str=MATCH_SUBSTRING,
+                       sort: str=SORT_ID) -> tuple:
+        """
+        Returns one page of molecules, optionally filtered by name, using keyset pagination.
+
+        Pages are ordered by MOLECULE_ID or by NAME, both unique, and the next page starts after the
+        last key of the previous one, so every page costs an index range scan however deep into the
+        list it is. Prefix matches are case-insensitive and use the lower(NAME) index; substring
+        matches are case-insensitive and use the trigram index when pg_trgm is installed.
+
+        Args:
+            limit (int, optional): The maximum number of molecules returned. Defaults to 50.
+            after (int or str, optional): The sort key of the last molecule of the previous page.
+                Defaults to None, which starts from the first molecule.
+            query (str, optional): The text molecule names must match. Defaults to None, which
+                matches every molecule.
+            match (str, optional): MATCH_PREFIX or MATCH_SUBSTRING. Defaults to MATCH_SUBSTRING.
+            sort (str, optional): SORT_ID or SORT_NAME. Defaults to SORT_ID.
+
+        Returns:
+            tuple: A list of (name, atom count, bond count) tuples, and the sort key to pass as after
+                   for the next page, or None if this is the last page.
+        Raises:
+            ValueError: If match or sort is not recognised.
+        """
+        self.cursor.execute(*list_molecules_query(limit, after, query, match, sort))
+        return list_molecules_page(self.cursor.fetchall(), limit, sort)
+
+    def fingerprint(self, name: str) -> int:
+        """
+        Returns the structural fingerprint of the given molecule.
 
-        for row in elements:
-            gradient = f"""\t<radialGradient id="{row[0]}" cx="-50%" cy="-50%" r="220%" fx="20%" fy="20%">\n\t\t<stop offset="0%" stop-color="#{row[1]}"/>\n\t\t<stop offset="50%" stop-color="#{row[2]}"/>\n\t\t<stop offset="100%" stop-color="#{row[3]}"/>\n\t</radialGradient>\n"""
-            gradients += gradient
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            int: The fingerprint, as returned by fingerprint.fingerprint(), or None if there is no
+                 such molecule or it has not been fingerprinted.
+        """
+        self.cursor.execute("SELECT FINGERPRINT FROM Molecules WHERE NAME = %s", (name,))
+        row = self.cursor.fetchone()
+        return fingerprint.from_bit_string(row[0]) if row is not None and row[0] is not None else None
+
+    def search_molecules(self, constraints: dict, reference: int=None, threshold: float=0.0, limit: int=50,
+                         after: int=None) -> tuple:
+        """
+        Returns one page of the molecules matching element and bond pattern counts, optionally
+        ranked by fingerprint similarity to a reference.
+
+        Args:
+            constraints (dict): Maps element codes and bond patterns, as named by
+                fingerprint.bond_feature(), to (minimum, maximum) counts, where a maximum of None
+                means unbounded and a minimum of 0 allows the feature to be absent.
+            reference (int, optional): A fingerprint to rank the matches by Tanimoto similarity to.
+                Defaults to None, which returns matches in MOLECULE_ID order.
+            threshold (float, optional): The lowest similarity returned when reference is given.
+                Defaults to 0.0.
+            limit (int, optional): The maximum number of molecules returned. Defaults to 50.
+            after (int, optional): The MOLECULE_ID returned with the previous page. Defaults to None.
+
+        Returns:
+            tuple: A list of (name, atom count, bond count, similarity) tuples, and the key of the
+                   next page or None if this is the last page or reference was given.
+        """
+        query, params = search_molecules_query(constraints, reference, threshold, limit, after)
+        self.cursor.execute(query, params)
+        return search_molecules_page(self.cursor.fetchall(), limit, reference)
+
+    def get_frame(self, name: str, axis: str, degree: int, version: str) -> bytes:
+        """
+        Returns a stored rotation frame of the given molecule. Aliases share the frames of the
+        molecule they are an alias of.
+
+        Args:
+            name (str): The name of the molecule.
+            axis (str): The rotation axis, "x", "y" or "z".
+            degree (int): The rotation in whole degrees.
+            version (str): The version of the Elements table the frame was rendered with.
 
-        return gradients
+        Returns:
+            bytes: The gzip-compressed SVG of the frame, or None if it is not stored.
+        """
+        self.cursor.execute("""SELECT Frames.SVG
+                                FROM Frames
+                                JOIN Molecules ON COALESCE(Molecules.ALIAS_OF, Molecules.MOLECULE_ID) = Frames.MOLECULE_ID
+                                WHERE Molecules.NAME = %s AND Frames.AXIS = %s
+                                AND Frames.DEGREE = %s AND Frames.PALETTE_VERSION = %s""",
+                            (name, axis, degree, version))
+        row = self.cursor.fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def add_frames(self, name: str, version: str, frames: list):
+        """
+        Stores rotation frames of the given molecule, keeping any that are already stored. Frames
+        of an alias are stored for the molecule it is an alias of.
+
+        Args:
+            name (str): The name of the molecule.
+            version (str): The version of the Elements table the frames were rendered with.
+            frames (list): A list of (axis, degree, gzip-compressed SVG) tuples.
+        """
+        self.cursor.execute("SELECT COALESCE(ALIAS_OF, MOLECULE_ID) FROM Molecules WHERE NAME = %s", (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return
+
+        extras.execute_values(self.cursor, sql.SQL(
+            """INSERT INTO Frames (MOLECULE_ID, AXIS, DEGREE, PALETTE_VERSION, SVG)
+               SELECT {}, AXIS, DEGREE, {}, SVG FROM (VALUES %s) AS data (AXIS, DEGREE, SVG)
+               ON CONFLICT DO NOTHING"""
+            ).format(sql.Literal(row[0]), sql.Literal(version)),
+            [(axis, degree, psycopg2.Binary(svg)) for axis, degree, svg in frames])
+        self.conn.commit()
+
+    def molecules_missing_frames(self, version: str, frame_count: int) -> list:
+        """
+        Returns the names of molecules with fewer than frame_count frames stored for the given
+        version. Aliases are left out, since they share the frames of the molecule they alias.
+
+        Args:
+            version (str): The current version of the Elements table.
+            frame_count (int): The number of frames in a complete rotation set.
+
+        Returns:
+            list: The names of the molecules whose rotation set is incomplete.
+        """
+        self.cursor.execute("""SELECT Molecules.NAME
+                                FROM Molecules
+                                LEFT JOIN Frames ON Frames.MOLECULE_ID = Molecules.MOLECULE_ID
+                                AND Frames.PALETTE_VERSION = %s
+                                WHERE Molecules.ALIAS_OF IS NULL
+                                GROUP BY Molecules.MOLECULE_ID, Molecules.NAME
+                                HAVING COUNT(Frames.MOLECULE_ID) < %s
+                                ORDER BY Molecules.MOLECULE_ID""", (version, frame_count))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def delete_stale_frames(self, version: str):
+        """
+        Deletes every stored frame rendered with a version of the Elements table other than the given one.
+
+        Args:
+            version (str): The current version of the Elements table.
+        """
+        self.cursor.execute("DELETE FROM Frames WHERE PALETTE_VERSION <> %s", (version,))
+        self.conn.commit()
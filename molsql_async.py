@@ -0,0 +1,283 @@
+import os
+import re
+import itertools
+import hashlib
+import asyncpg
+from molsql import (STORAGE_ROWS, STORAGE_PACKED, list_molecules_query, list_molecules_page, search_molecules_query,
+                    search_molecules_page)
+import mol_display
+import fingerprint
+
+async def create_pool(minconn: int=1, maxconn: int=10) -> asyncpg.Pool:
+    """
+    Opens a pool of asyncpg connections to the PostgreSQL database named by the DATABASE_URL
+    environment variable, with the SSL mode given by DATABASE_SSLMODE as for molsql.connect().
+
+    Args:
+        minconn (int, optional): The number of connections opened up front. Defaults to 1.
+        maxconn (int, optional): The maximum number of open connections. Defaults to 10.
+
+    Returns:
+        Pool: A new asyncpg connection pool.
+    """
+    return await asyncpg.create_pool(os.environ['DATABASE_URL'], min_size=minconn, max_size=maxconn,
+                                     ssl=os.environ.get('DATABASE_SSLMODE', 'require'))
+
+def numbered(query: str) -> str:
+    """
+    Converts the %s placeholders of a psycopg2 query to the $1, $2, ... placeholders of asyncpg.
+
+    Args:
+        query (str): A query with %s placeholders and no literal percent signs.
+
+    Returns:
+        str: The same query with numbered placeholders.
+    """
+    count = itertools.count(1)
+    return re.sub(r"%s", lambda _: f"${next(count)}", query)
+
+class AsyncDatabase:
+    def __init__(self, conn: asyncpg.Connection, storage: str=None):
+        """
+        Initializes a new AsyncDatabase, the asyncpg counterpart of molsql.Database used by the
+        async server. Only the queries the async routes need are provided; the schema is created
+        by molsql.Database.create_tables().
+
+        Args:
+            conn (Connection): An asyncpg connection, such as one acquired from create_pool().
+            storage (str, optional): How add_geometry() stores new molecules, STORAGE_ROWS or
+                STORAGE_PACKED. Defaults to None, which uses the GEOMETRY_STORAGE environment
+                variable or STORAGE_ROWS if it is not set.
+        """
+        self.conn = conn
+        self.storage = storage or os.environ.get("GEOMETRY_STORAGE", STORAGE_ROWS)
+
+        if self.storage not in (STORAGE_ROWS, STORAGE_PACKED):
+            raise ValueError(f"Unknown geometry storage mode {self.storage!r}")
+
+    async def elements_version(self) -> str:
+        """
+        Returns the version string of the Elements table, as Database.elements_version() does.
+
+        Returns:
+            str: An MD5 digest of the contents of the Elements table, kept in PaletteVersion by a trigger.
+        """
+        return await self.conn.fetchval("SELECT VERSION FROM PaletteVersion")
+
+    async def molecules_version(self) -> str:
+        """
+        Returns the version string of the list of molecules, as Database.molecules_version() does.
+
+        Returns:
+            str: The number of molecules and the largest MOLECULE_ID, joined by a hyphen.
+        """
+        row = await self.conn.fetchrow("SELECT COUNT(*), COALESCE(MAX(MOLECULE_ID), 0) FROM Molecules")
+        return "%d-%d" % tuple(row)
+
+    async def molecule_names(self) -> list:
+        """
+        Returns the name of every molecule.
+
+        Returns:
+            list: The names of all molecules.
+        """
+        return [row[0] for row in await self.conn.fetch("SELECT NAME FROM Molecules")]
+
+    async def molecule_exists(self, name: str) -> bool:
+        """
+        Returns whether a molecule with the given name exists.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            bool: True if the molecule exists.
+        """
+        return await self.conn.fetchval("SELECT MOLECULE_ID FROM Molecules WHERE NAME = $1", name) is not None
+
+    async def list_molecules(self, limit: int=50, after=None, query: str=None, match: str="substring",
+                             sort: str="id") -> tuple:
+        """
+        Returns one page of molecules, as Database.list_molecules() does.
+
+        Returns:
+            tuple: A list of (name, atom count, bond count) tuples, and the sort key of the next page
+                   or None if this is the last page.
+        """
+        statement, params = list_molecules_query(limit, after, query, match, sort)
+        return list_molecules_page(await self.conn.fetch(numbered(statement), *params), limit, sort)
+
+    async def fingerprint(self, name: str) -> int:
+        """
+        Returns the structural fingerprint of the given molecule, as Database.fingerprint() does.
+
+        Returns:
+            int: The fingerprint, or None if there is no such molecule or it has not been fingerprinted.
+        """
+        bits = await self.conn.fetchval("SELECT FINGERPRINT::text FROM Molecules WHERE NAME = $1", name)
+        return fingerprint.from_bit_string(bits) if bits is not None else None
+
+    async def search_molecules(self, constraints: dict, reference: int=None, threshold: float=0.0, limit: int=50,
+                               after: int=None) -> tuple:
+        """
+        Returns one page of the molecules matching a structural search, as Database.search_molecules() does.
+
+        Returns:
+            tuple: A list of (name, atom count, bond count, similarity) tuples, and the key of the
+                   next page or None if this is the last page or reference was given.
+        """
+        query, params = search_molecules_query(constraints, reference, threshold, limit, after)
+        return search_molecules_page(await self.conn.fetch(numbered(query), *params), limit, reference)
+
+    async def load_geometry(self, name: str) -> bytes:
+        """
+        Returns the packed geometry of the given molecule, packing it from its Atoms and Bonds rows
+        if it is not stored packed.
+
+        Like Database.load_mol(), an alias yields the geometry of the molecule it is an alias of,
+        and an unknown name yields an empty molecule.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            bytes: The geometry, as returned by mol_display.pack_geometry().
+        """
+        row = await self.conn.fetchrow("""SELECT Source.MOLECULE_ID, Source.GEOMETRY
+                                           FROM Molecules
+                                           JOIN Molecules AS Source
+                                           ON Source.MOLECULE_ID = COALESCE(Molecules.ALIAS_OF, Molecules.MOLECULE_ID)
+                                           WHERE Molecules.NAME = $1""", name)
+        if row is None:
+            return mol_display.pack_geometry([], [], [], [])
+        if row[1] is not None:
+            return bytes(row[1])
+
+        atoms = await self.conn.fetch("""SELECT Atoms.ELEMENT_CODE, Atoms.X, Atoms.Y, Atoms.Z
+                                          FROM Atoms
+                                          JOIN Elements ON Atoms.ELEMENT_CODE = Elements.ELEMENT_CODE
+                                          JOIN MoleculeAtom ON Atoms.ATOM_ID = MoleculeAtom.ATOM_ID
+                                          WHERE MoleculeAtom.MOLECULE_ID = $1
+                                          ORDER BY Atoms.ATOM_ID ASC""", row[0])
+        bonds = await self.conn.fetch("""SELECT Bonds.A1, Bonds.A2, Bonds.EPAIRS
+                                          FROM Bonds
+                                          JOIN MoleculeBond ON Bonds.BOND_ID = MoleculeBond.BOND_ID
+                                          WHERE MoleculeBond.MOLECULE_ID = $1
+                                          ORDER BY Bonds.BOND_ID ASC""", row[0])
+
+        return mol_display.pack_geometry([atom[0] for atom in atoms],
+                                         [(float(atom[1]), float(atom[2]), float(atom[3])) for atom in atoms],
+                                         [(bond[0], bond[1]) for bond in bonds],
+                                         [bond[2] for bond in bonds])
+
+    async def atom_count(self, name: str) -> int:
+        """
+        Returns the number of atoms in the given molecule, as Database.atom_count() does.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            int: The number of atoms, or None if there is no such molecule.
+        """
+        row = await self.conn.fetchrow("SELECT ATOM_COUNT FROM Molecules WHERE NAME = $1", name)
+        if row is None:
+            return None
+        if row[0] is not None:
+            return row[0]
+        return mol_display.Molecule.unpack(await self.load_geometry(name)).atom_no
+
+    async def content_hash(self, name: str) -> str:
+        """
+        Returns the SHA-256 of the packed geometry of the given molecule, as Database.content_hash() does.
+
+        Args:
+            name (str): The name of the molecule.
+
+        Returns:
+            str: The hex digest of the molecule's packed geometry, or None if there is no such molecule.
+        """
+        row = await self.conn.fetchrow("SELECT MOLECULE_ID, CONTENT_HASH FROM Molecules WHERE NAME = $1", name)
+        if row is None:
+            return None
+        if row[1] is not None:
+            return row[1]
+
+        content_hash = hashlib.sha256(await self.load_geometry(name)).hexdigest()
+        await self.conn.execute("UPDATE Molecules SET CONTENT_HASH = $1 WHERE MOLECULE_ID = $2", content_hash, row[0])
+        return content_hash
+
+    async def add_geometry(self, name: str, atoms: list, bonds: list) -> int:
+        """
+        Inserts a molecule row together with its atoms and bonds in one transaction, as
+        Database.add_geometry() does, or only an alias row if the same structure is already
+        stored, and in either case its search features. Atoms and bonds are sent as arrays and
+        unnested by the server, so a molecule costs a handful of statements whatever its size.
+
+        Args:
+            name (str): The name of the molecule to add.
+            atoms (list): A list of (element, x, y, z) tuples in atom index order.
+            bonds (list): A list of (a1, a2, epairs) tuples with zero-based atom indices.
+
+        Returns:
+            int: The MOLECULE_ID of the new molecule.
+        """
+        geometry = mol_display.pack_geometry([atom[0] for atom in atoms],
+                                             [atom[1:] for atom in atoms],
+                                             [bond[:2] for bond in bonds],
+                                             [bond[2] for bond in bonds])
+        content_hash = hashlib.sha256(geometry).hexdigest()
+        structure_hash = mol_display.structure_hash([atom[0] for atom in atoms],
+                                                    [atom[1:] for atom in atoms],
+                                                    [bond[:2] for bond in bonds],
+                                                    [bond[2] for bond in bonds])
+        counts = fingerprint.features([atom[0] for atom in atoms], [bond[:2] for bond in bonds],
+                                      [bond[2] for bond in bonds])
+        bits = fingerprint.fingerprint(counts)
+
+        async with self.conn.transaction():
+            original = await self.conn.fetchrow("""SELECT MOLECULE_ID, CONTENT_HASH FROM Molecules
+                                                   WHERE STRUCTURE_HASH = $1 AND ALIAS_OF IS NULL
+                                                   ORDER BY MOLECULE_ID LIMIT 1""", structure_hash)
+
+            columns = {"NAME": name, "CONTENT_HASH": content_hash, "ATOM_COUNT": len(atoms),
+                       "BOND_COUNT": len(bonds), "STRUCTURE_HASH": structure_hash,
+                       "FINGERPRINT": fingerprint.bit_string(bits), "FINGERPRINT_COUNT": bits.bit_count()}
+            if original is not None:
+                columns.update(CONTENT_HASH=original[1] or content_hash, ALIAS_OF=original[0])
+            elif self.storage == STORAGE_PACKED:
+                columns["GEOMETRY"] = geometry
+
+            # asyncpg only binds BIT values from BitString, so the fingerprint is sent as text
+            placeholders = [f"${i}::text::bit({fingerprint.FINGERPRINT_BITS})" if column == "FINGERPRINT" else f"${i}"
+                            for i, column in enumerate(columns, 1)]
+            mol_id = await self.conn.fetchval(f"""INSERT INTO Molecules ({", ".join(columns)})
+                                                  VALUES ({", ".join(placeholders)}) RETURNING MOLECULE_ID""",
+                                              *columns.values())
+            if original is not None or self.storage == STORAGE_PACKED:
+                atoms, bonds = [], []
+
+            if counts:
+                await self.conn.execute("""INSERT INTO MoleculeFeatures (MOLECULE_ID, FEATURE, COUNT)
+                                           SELECT $1, * FROM unnest($2::text[], $3::int[])""",
+                                        mol_id, list(counts), list(counts.values()))
+
+            if atoms:
+                elements, xs, ys, zs = (list(column) for column in zip(*atoms))
+                await self.conn.execute(
+                    """WITH inserted AS (INSERT INTO Atoms (ELEMENT_CODE, X, Y, Z)
+                                         SELECT * FROM unnest($2::varchar[], $3::float8[], $4::float8[], $5::float8[])
+                                         RETURNING ATOM_ID)
+                       INSERT INTO MoleculeAtom (MOLECULE_ID, ATOM_ID) SELECT $1, ATOM_ID FROM inserted""",
+                    mol_id, elements, xs, ys, zs)
+
+            if bonds:
+                a1, a2, epairs = (list(column) for column in zip(*bonds))
+                await self.conn.execute(
+                    """WITH inserted AS (INSERT INTO Bonds (A1, A2, EPAIRS)
+                                         SELECT * FROM unnest($2::int[], $3::int[], $4::int[])
+                                         RETURNING BOND_ID)
+                       INSERT INTO MoleculeBond (MOLECULE_ID, BOND_ID) SELECT $1, BOND_ID FROM inserted""",
+                    mol_id, a1, a2, epairs)
+
+        return mol_id
@@ -0,0 +1,113 @@
+import select
+import logging
+import threading
+import psycopg2
+from molsql import Database, PALETTE_CHANNEL, connect
+import mol_display
+import metrics
+
+# Seconds the listener waits for a notification before checking whether it was stopped
+POLL_INTERVAL = 1.0
+# Seconds the listener waits before reconnecting after losing its connection
+RETRY_INTERVAL = 5.0
+
+logger = logging.getLogger("molvis.palette")
+
+class Palette:
+    def __init__(self):
+        """
+        Initializes a new Palette holding the render context of the current version of the Elements table.
+
+        The context is built once per version and reused until the version changes. Versions are
+        read from the PaletteVersion row, or, once start() has been called, taken from the
+        notifications the Elements trigger sends on PALETTE_CHANNEL, so no query is needed at all
+        while the listener is connected.
+        """
+        self._context = None
+        self._version = None
+        self._listening = False
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def version(self, db: Database) -> str:
+        """
+        Returns the current version of the Elements table.
+
+        Args:
+            db (Database): The database to read the version from if the listener is not connected.
+
+        Returns:
+            str: The palette version, as returned by Database.elements_version().
+        """
+        version = self._version
+        if self._listening and version is not None:
+            return version
+        return db.elements_version()
+
+    def context(self, db: Database, version: str) -> mol_display.RenderContext:
+        """
+        Returns the render context of the given palette version, building it only if the Elements
+        table changed since the last one was built.
+
+        Contexts are immutable and replaced rather than modified, so concurrent renders can keep
+        using the context they started with.
+
+        Args:
+            db (Database): The database to read the Elements table from.
+            version (str): The current version of the Elements table.
+
+        Returns:
+            RenderContext: The render context of that version.
+        """
+        context = self._context
+        if context is None or context.version != version:
+            with metrics.stage("palette_load"):
+                context = db.render_context(version)
+            self._context = context
+        return context
+
+    def start(self):
+        """
+        Starts a background thread that listens for palette changes on its own database connection.
+        """
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._listen, name="palette-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops the listener thread and closes its connection.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = connect()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    # Listen before reading the version so that no change can fall in between
+                    cursor.execute(f"LISTEN {PALETTE_CHANNEL}")
+                    cursor.execute("SELECT VERSION FROM PaletteVersion")
+                    self._version = cursor.fetchone()[0]
+                self._listening = True
+
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], POLL_INTERVAL)[0]:
+                        conn.poll()
+                        if conn.notifies:
+                            self._version = conn.notifies[-1].payload
+                            conn.notifies.clear()
+            except (psycopg2.Error, OSError, TypeError) as error:
+                self._listening = False
+                logger.warning("palette listener disconnected: %s", error)
+                self._stopped.wait(RETRY_INTERVAL)
+            finally:
+                self._listening = False
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,368 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import metrics
+
+def _remove(path: str):
+    """Removes a file that another worker process may already have removed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _listdir(directory: str) -> list:
+    """Lists a directory that another worker process may already have emptied or removed."""
+    try:
+        return os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+class RenderCache:
+    def __init__(self, max_bytes: int=64*1024*1024, disk_dir: str=None, disk_max_bytes: int=256*1024*1024):
+        """
+        Initializes a new RenderCache holding finished SVG renders as bytes.
+
+        Entries are kept in memory and evicted in least-recently-used order once the total size
+        of the cached renders exceeds max_bytes. If disk_dir is given, every render is also written
+        to that directory so that other worker processes on the same machine can reuse it.
+
+        The on-disk tier is shared by every worker process, so files may disappear at any time
+        under another process's clear() or trim. Each process counts the bytes it writes, and once
+        its count passes disk_max_bytes it scans the directory and deletes the least recently used
+        renders, by modification time, until the tier is back under the limit. The tier can
+        therefore overshoot by the bytes other processes wrote since their own last scan.
+
+        Args:
+            max_bytes (int, optional): The maximum number of bytes held in memory. Defaults to 64 MiB.
+            disk_dir (str, optional): A directory used as a shared on-disk tier. Defaults to None,
+                which disables the on-disk tier.
+            disk_max_bytes (int, optional): The number of bytes the on-disk tier is trimmed to.
+                Defaults to 256 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_evictions = 0
+        self._disk_size = None
+        self.version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(name: str, version: str, **options) -> tuple:
+        """
+        Builds a cache key for a render of the given molecule.
+
+        Args:
+            name (str): The name of the molecule.
+            version (str): The version of the Elements table the render was produced with.
+            **options: Any render options that change the output.
+
+        Returns:
+            tuple: A hashable key identifying the render.
+        """
+        return (name, version, tuple(sorted(options.items())))
+
+    def set_version(self, version: str):
+        """
+        Records the current version of the Elements table, dropping the renders held in memory if it changed.
+
+        The on-disk tier is shared with other workers that may already have written renders of the
+        new version, so it is left alone. Keys include the version, so old renders on disk are
+        never served and are aged out by the trim.
+
+        Args:
+            version (str): The current version of the Elements table.
+        """
+        if version != self.version:
+            if self.version is not None:
+                with self._lock:
+                    self._entries.clear()
+                    self.size = 0
+            self.version = version
+
+    def get(self, key: tuple) -> bytes:
+        """
+        Returns the cached render for the given key, checking memory first and then the on-disk tier.
+
+        Args:
+            key (tuple): A key built with RenderCache.key().
+
+        Returns:
+            bytes: The cached SVG, or None if the render is not cached.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._disk_read(key)
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, data)
+        return data
+
+    def put(self, key: tuple, data: bytes):
+        """
+        Adds a render to the cache, evicting the least recently used renders if needed.
+
+        Args:
+            key (tuple): A key built with RenderCache.key().
+            data (bytes): The finished SVG.
+        """
+        with self._lock:
+            self._store(key, data)
+        self._disk_write(key, data)
+
+    def invalidate(self, name: str):
+        """
+        Removes every cached render of the given molecule, in memory and on disk.
+
+        Args:
+            name (str): The name of the molecule.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name]:
+                self.size -= len(self._entries.pop(key))
+
+        if self.disk_dir is not None:
+            directory = self._disk_dir_for(name)
+            for filename in _listdir(directory):
+                if not filename.endswith(".tmp"):
+                    _remove(os.path.join(directory, filename))
+
+    def clear(self):
+        """
+        Removes every cached render, in memory and on disk.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+        if self.disk_dir is not None:
+            # Renders still being written by other processes are left to their os.replace()
+            for directory in _listdir(self.disk_dir):
+                directory = os.path.join(self.disk_dir, directory)
+                for filename in _listdir(directory):
+                    if not filename.endswith(".tmp"):
+                        _remove(os.path.join(directory, filename))
+            with self._lock:
+                self._disk_size = None
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counts of the cache along with its current size.
+
+        Returns:
+            dict: A dictionary of cache statistics.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "disk_evictions": self.disk_evictions,
+            }
+
+    def _store(self, key: tuple, data: bytes):
+        """
+        Stores a render in memory and evicts old renders until the cache fits in max_bytes.
+        The caller must hold the lock.
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+
+        self._entries[key] = data
+        self.size += len(data)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def _disk_dir_for(self, name: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(name.encode()).hexdigest())
+
+    def _disk_path(self, key: tuple) -> str:
+        return os.path.join(self._disk_dir_for(key[0]), hashlib.sha256(repr(key).encode()).hexdigest() + ".svg")
+
+    def _disk_read(self, key: tuple) -> bytes:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with metrics.stage("cache_disk_read"), open(path, "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return None
+
+        # Reads count as uses for the least-recently-used trim
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def _disk_write(self, key: tuple, data: bytes):
+        if self.disk_dir is None:
+            return
+        with metrics.stage("cache_disk_write"):
+            path = self._disk_path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(temp_path, "wb") as fp:
+                    fp.write(data)
+                os.replace(temp_path, path)
+            except FileNotFoundError:
+                # Another process cleared the tier mid-write; the render is simply not shared
+                _remove(temp_path)
+                return
+
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+            trim = self._disk_size is None or self._disk_size > self.disk_max_bytes
+        if trim:
+            self._disk_trim()
+
+    def _disk_trim(self):
+        """
+        Scans the on-disk tier and deletes the least recently used renders until it fits in
+        disk_max_bytes, then records its size as this process's count.
+        """
+        with metrics.stage("cache_disk_trim"):
+            files = []
+            for directory in _listdir(self.disk_dir):
+                directory = os.path.join(self.disk_dir, directory)
+                for filename in _listdir(directory):
+                    if filename.endswith(".tmp"):
+                        continue
+                    path = os.path.join(directory, filename)
+                    try:
+                        info = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((info.st_mtime, info.st_size, path))
+
+            size = sum(file_size for _, file_size, _ in files)
+            evicted = 0
+            if size > self.disk_max_bytes:
+                files.sort()
+                for _, file_size, path in files:
+                    if size <= self.disk_max_bytes:
+                        break
+                    _remove(path)
+                    size -= file_size
+                    evicted += 1
+
+        with self._lock:
+            self._disk_size = size
+            self.disk_evictions += evicted
+
+class MoleculeCache:
+    def __init__(self, max_entries: int=32):
+        """
+        Initializes a new MoleculeCache holding recently loaded Molecule objects of this worker.
+
+        Cached molecules are shared between requests and must not be modified; callers that
+        transform a molecule should work on a copy.
+
+        Args:
+            max_entries (int, optional): The maximum number of molecules kept, evicted in
+                least-recently-used order. Defaults to 32.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, loader=None):
+        """
+        Returns the cached molecule with the given name, calling loader to load it on a miss.
+
+        Args:
+            name (str): The name of the molecule.
+            loader (callable, optional): Called with the name to load the molecule when it is not
+                cached. Defaults to None, which returns None on a miss so that callers which load
+                asynchronously can add the molecule with put().
+
+        Returns:
+            Molecule: The cached or newly loaded molecule.
+        """
+        with self._lock:
+            mol = self._entries.get(name)
+            if mol is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return mol
+            self.misses += 1
+
+        if loader is None:
+            return None
+
+        mol = loader(name)
+        self.put(name, mol)
+        return mol
+
+    def put(self, name: str, mol):
+        """
+        Adds a molecule to the cache, evicting the least recently used molecules if needed.
+
+        Args:
+            name (str): The name of the molecule.
+            mol (Molecule): The loaded molecule.
+        """
+        with self._lock:
+            self._entries[name] = mol
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: str):
+        """
+        Removes the molecule with the given name from the cache.
+
+        Args:
+            name (str): The name of the molecule.
+        """
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counts of the cache along with its current size.
+
+        Returns:
+            dict: A dictionary of cache statistics.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "max_entries": self.max_entries}
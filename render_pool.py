@@ -0,0 +1,191 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from molsql import Database
+from http_common import compress
+from palette import Palette
+import mol_display
+
+class RenderPoolBusy(Exception):
+    """
+    Raised when a job is submitted while the render pool's queue is full.
+    """
+
+class RenderPoolTimeout(Exception):
+    """
+    Raised when a job does not finish within the render pool's timeout.
+    """
+
+# State of a pool worker process, set up by _init_worker()
+_db = None
+_palette = Palette()
+
+def _init_worker():
+    """
+    Opens the worker's own database connection, loads the current palette and renders a small
+    molecule once, so that the first real job does not pay for loading the C library and NumPy.
+    """
+    global _db
+    _db = Database()
+    context = _load_palette(_db.elements_version())
+
+    if context.radius:
+        element = next(iter(context.radius))
+        geometry = mol_display.pack_geometry([element, element], [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0)], [(0, 1)], [1])
+        mol_display.Molecule.unpack(geometry).svg(context)
+
+def _load_palette(version: str) -> mol_display.RenderContext:
+    """
+    Returns the render context of the given palette version in this worker, building it only if
+    the Elements table changed since it was last built.
+    """
+    context = _palette.context(_db, version)
+    _db.conn.rollback()
+    return context
+
+def _render_one(mol: mol_display.Molecule, context: mol_display.RenderContext, options: dict) -> bytes:
+    if options.keys() - {"viewport", "lod"}:
+        mol = mol.copy()
+        if "matrix" in options:
+            mol.transform(options["matrix"])
+        else:
+            mol.rotate(options.get("rx", 0), options.get("ry", 0), options.get("rz", 0))
+    return mol.svg(context, options.get("viewport"), options.get("lod", mol_display.LOD_FULL)).encode()
+
+def render(geometry: bytes, version: str, options: dict, encoding: str="identity") -> tuple:
+    """
+    Renders a molecule in a pool worker.
+
+    Args:
+        geometry (bytes): The packed geometry of the molecule, as returned by mol_display.pack_geometry().
+        version (str): The current version of the Elements table.
+        options (dict): Rotation options as returned by http_common.parse_rotation().
+        encoding (str, optional): The content encoding of the compressed copy. Defaults to "identity".
+
+    Returns:
+        tuple: The SVG and its copy compressed with encoding.
+    """
+    svg = _render_one(mol_display.Molecule.unpack(geometry), _load_palette(version), options)
+    return svg, compress(svg, encoding)
+
+def render_frames(geometry: bytes, version: str, frame_options: list) -> list:
+    """
+    Renders several rotations of a molecule in a pool worker, unpacking it only once.
+
+    Args:
+        geometry (bytes): The packed geometry of the molecule.
+        version (str): The current version of the Elements table.
+        frame_options (list): The rotation options of each frame.
+
+    Returns:
+        list: The SVG of each frame.
+    """
+    context = _load_palette(version)
+    mol = mol_display.Molecule.unpack(geometry)
+    return [_render_one(mol, context, options) for options in frame_options]
+
+def parse(sdf_content: str) -> tuple:
+    """
+    Parses an uploaded SD file in a pool worker, as Database.add_molecule() does.
+
+    Args:
+        sdf_content (str): The text of the SD file.
+
+    Returns:
+        tuple: A list of (element, x, y, z) atom tuples and a list of (a1, a2, epairs) bond tuples.
+    """
+    mol = mol_display.Molecule()
+    mol.parse_bytes(sdf_content.encode("utf-8"))
+
+    elements, xyz = mol.atom_arrays()
+    pairs, epairs = mol.bond_arrays()
+    atoms = [(element, x, y, z) for element, (x, y, z) in zip(elements.tolist(), xyz.tolist())]
+    bonds = [(a1, a2, e) for (a1, a2), e in zip(pairs.tolist(), epairs.tolist())]
+    return atoms, bonds
+
+class RenderPool:
+    def __init__(self, workers: int=None, max_queue: int=None, timeout: float=30.0):
+        """
+        Initializes a new pool of worker processes for CPU-bound parsing and rendering.
+
+        Every worker holds its own database connection, palette and loaded C library, set up when
+        the worker starts. At most max_queue jobs are queued or running at once; further jobs are
+        rejected with RenderPoolBusy rather than queued without bound. A job that outlives its
+        timeout is abandoned with RenderPoolTimeout, but keeps its queue slot until its worker
+        finishes it, so slow renders still hold back new work.
+
+        Args:
+            workers (int, optional): The number of worker processes. Defaults to None, which uses
+                the number of CPUs.
+            max_queue (int, optional): The maximum number of queued and running jobs. Defaults to
+                None, which allows four per worker.
+            timeout (float, optional): The number of seconds a caller waits for a job. Defaults to 30.0.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or 4 * self.workers
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._queued = 0
+        self._executor = None
+
+    def start(self):
+        """
+        Starts the worker processes. Workers are spawned rather than forked, so they do not inherit
+        the event loop or open connections of the server process.
+        """
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             mp_context=multiprocessing.get_context("spawn"))
+
+    async def submit(self, fn, *args):
+        """
+        Runs fn(*args) in a worker process and waits for its result.
+
+        Args:
+            fn (callable): A module-level function of this module, such as render().
+            *args: The picklable arguments of fn.
+
+        Returns:
+            The return value of fn.
+        Raises:
+            RenderPoolBusy: If max_queue jobs are already queued or running.
+            RenderPoolTimeout: If the job does not finish within the timeout.
+        """
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise RenderPoolBusy(f"render queue is full ({self.max_queue} jobs)")
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(fn, *args)
+        self._queued += 1
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._finished, done))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise RenderPoolTimeout(f"render did not finish within {self.timeout} seconds")
+
+    def stats(self) -> dict:
+        """
+        Returns the current queue depth and job counts of the pool.
+
+        Returns:
+            dict: A dictionary of render pool statistics.
+        """
+        return {"workers": self.workers, "queued": self._queued, "max_queue": self.max_queue,
+                "completed": self.completed, "rejected": self.rejected, "timeouts": self.timeouts}
+
+    def shutdown(self):
+        """
+        Stops the worker processes once their current jobs finish.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _finished(self, future):
+        self._queued -= 1
+        if not future.cancelled():
+            self.completed += 1
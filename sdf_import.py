@@ -0,0 +1,207 @@
+import io
+import os
+import sys
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import psycopg2
+from molsql import Database
+from mol_display import Molecule
+
+RECORD_DELIMITER = "$$$$"
+
+def iter_records(file):
+    """
+    Lazily splits a multi-record SD file into its records.
+
+    Lines are read one at a time, so only the record currently being built is held in memory.
+
+    Args:
+        file (IO): A text IO object positioned at the start of an SD file.
+
+    Yields:
+        str: The text of each record, without its '$$$$' delimiter line.
+    """
+    lines = []
+    for line in file:
+        if line.rstrip() == RECORD_DELIMITER:
+            yield "".join(lines)
+            lines = []
+        else:
+            lines.append(line)
+
+    if "".join(lines).strip():
+        yield "".join(lines)
+
+def parse_record(text: str, name_field: str="NAME") -> tuple:
+    """
+    Parses a single V2000 or V3000 SD record into plain Python data with the C parser.
+
+    The molecule name is taken from the data item called name_field, falling back to the first
+    line of the record's header block.
+
+    Args:
+        text (str): The text of one record, as yielded by iter_records().
+        name_field (str, optional): The data item holding the molecule name. Defaults to "NAME".
+
+    Returns:
+        tuple: A (name, atoms, bonds) tuple, where atoms is a list of (element, x, y, z) tuples and
+               bonds is a list of (a1, a2, epairs) tuples with zero-based atom indices.
+
+    Raises:
+        ValueError: If the record is truncated or its counts, atom or bond lines are malformed.
+    """
+    mol = Molecule()
+    name, _ = mol.parse_bytes(text.encode("utf-8"), 0, name_field)
+    if name is None:
+        raise ValueError("record is missing its header or counts line")
+    if not name:
+        raise ValueError("record has no name")
+
+    elements, xyz = mol.atom_arrays()
+    pairs, epairs = mol.bond_arrays()
+    atoms = [(element, x, y, z) for element, (x, y, z) in zip(elements.tolist(), xyz.tolist())]
+    bonds = [(a1, a2, e) for (a1, a2), e in zip(pairs.tolist(), epairs.tolist())]
+
+    return name, atoms, bonds
+
+def _parse_indexed(item: tuple) -> tuple:
+    """
+    Parses one (index, text, name_field) item in a worker process, returning the error message
+    instead of raising so that one bad record does not abort a batch.
+    """
+    index, text, name_field = item
+    try:
+        return index, parse_record(text, name_field), None
+    except (ValueError, IndexError) as e:
+        return index, None, str(e)
+
+def import_sdf(file, db: Database, commit_size: int=500, workers: int=None, name_field: str="NAME",
+               progress=None, on_import=None) -> dict:
+    """
+    Imports every record of a multi-record SD file into the database.
+
+    Records are read lazily with iter_records(), parsed commit_size at a time in a process pool
+    and inserted with Database.add_geometry(), committing once per batch. Records whose name already
+    exists, or that fail to parse or insert, are skipped and reported without aborting the run.
+
+    Args:
+        file (IO): A text IO object positioned at the start of an SD file.
+        db (Database): The database to import into.
+        commit_size (int, optional): The number of records parsed and committed together. Defaults to 500.
+        workers (int, optional): The number of parser processes. 0 parses in this process.
+            Defaults to None, which uses one process per CPU.
+        name_field (str, optional): The data item holding each molecule's name. Defaults to "NAME".
+        progress (callable, optional): Called with the running summary after every batch. Defaults to None.
+        on_import (callable, optional): Called with the name of every imported molecule. Defaults to None.
+
+    Returns:
+        dict: A summary with the number of records read and imported, and lists of the duplicate
+              names and malformed records that were skipped.
+    """
+    summary = {"records": 0, "imported": 0, "duplicates": [], "malformed": []}
+    records = enumerate(iter_records(file))
+    workers = os.cpu_count() if workers is None else workers
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    try:
+        while True:
+            batch = [(index, text, name_field) for index, text in itertools.islice(records, commit_size)]
+            if not batch:
+                break
+
+            if pool is not None:
+                results = pool.map(_parse_indexed, batch, chunksize=max(1, len(batch) // (4 * workers)))
+            else:
+                results = map(_parse_indexed, batch)
+
+            parsed = []
+            for index, result, error in results:
+                if error is not None:
+                    summary["malformed"].append({"record": index, "error": error})
+                else:
+                    parsed.append((index, result))
+
+            _insert_batch(db, parsed, summary, on_import)
+            summary["records"] += len(batch)
+
+            if progress is not None:
+                progress(summary)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return summary
+
+def _insert_batch(db: Database, parsed: list, summary: dict, on_import):
+    """
+    Inserts one batch of parsed records in a single transaction, using a savepoint per record so
+    that a failing record is rolled back on its own.
+    """
+    db.cursor.execute("SELECT NAME FROM Molecules WHERE NAME = ANY(%s)",
+                      ([name for _, (name, _, _) in parsed],))
+    existing = {row[0] for row in db.cursor.fetchall()}
+
+    imported = []
+    for index, (name, atoms, bonds) in parsed:
+        if name in existing:
+            summary["duplicates"].append({"record": index, "name": name})
+            continue
+
+        db.cursor.execute("SAVEPOINT import_record")
+        try:
+            db.add_geometry(name, atoms, bonds, commit=False)
+        except psycopg2.Error as e:
+            db.cursor.execute("ROLLBACK TO SAVEPOINT import_record")
+            summary["malformed"].append({"record": index, "error": str(e).strip()})
+            continue
+        db.cursor.execute("RELEASE SAVEPOINT import_record")
+
+        existing.add(name)
+        imported.append(name)
+
+    db.conn.commit()
+    summary["imported"] += len(imported)
+
+    if on_import is not None:
+        for name in imported:
+            on_import(name)
+
+def main(argv: list=None):
+    """
+    Command-line entry point: imports an SD file into the database named by DATABASE_URL.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to None, which uses sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Bulk import a multi-record SD file.")
+    parser.add_argument("file", help="path to the SD file, or - for standard input")
+    parser.add_argument("--commit-size", type=int, default=500, help="records committed per transaction")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (0 parses inline)")
+    parser.add_argument("--name-field", default="NAME", help="data item holding the molecule name")
+    args = parser.parse_args(argv)
+
+    def report(summary):
+        print(f"{summary['records']} records read, {summary['imported']} imported, "
+              f"{len(summary['duplicates'])} duplicates, {len(summary['malformed'])} malformed",
+              file=sys.stderr)
+
+    db = Database(reset=False)
+    db.create_tables()
+
+    if args.file == "-":
+        file = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    else:
+        file = open(args.file, "r", encoding="utf-8", errors="replace")
+
+    with file:
+        summary = import_sdf(file, db, commit_size=args.commit_size, workers=args.workers,
+                             name_field=args.name_field, progress=report)
+
+    for duplicate in summary["duplicates"]:
+        print(f"record {duplicate['record']}: duplicate name {duplicate['name']!r}", file=sys.stderr)
+    for malformed in summary["malformed"]:
+        print(f"record {malformed['record']}: {malformed['error']}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
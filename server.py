@@ -1,10 +1,123 @@
-from flask import Flask, request, send_from_directory, jsonify, abort
+from flask import Flask, Response, request, send_from_directory, jsonify, abort, g, stream_with_context
+import io
 import os
-from molsql import Database
-import mol_display
+import json
+from molsql import ConnectionPool, Database, PoolTimeout
+import sdf_import
+from render_cache import RenderCache, MoleculeCache
+from frame_store import FrameStore
+from mol_display import Molecule, LOD_FULL
+from http_common import (SVG_MAX_AGE, MOLECULES_MAX_AGE, LOD_AUTO, sdf_name, parse_rotation, resolve_detail,
+                         parse_frames, parse_listing, listing_page, parse_search, search_page, select_encoding,
+                         compress, compress_stream, make_etag, cache_headers)
+from palette import Palette
+import metrics
 
 app = Flask(__name__)
 
+pool = ConnectionPool(minconn=int(os.environ.get("DATABASE_POOL_MIN", 1)),
+                      maxconn=int(os.environ.get("DATABASE_POOL_MAX", 10)),
+                      timeout=float(os.environ.get("DATABASE_POOL_TIMEOUT", 5.0)))
+pool.bootstrap()
+
+svg_cache = RenderCache(max_bytes=int(os.environ.get("SVG_CACHE_BYTES", 64*1024*1024)),
+                        disk_dir=os.environ.get("SVG_CACHE_DIR"),
+                        disk_max_bytes=int(os.environ.get("SVG_CACHE_DISK_BYTES", 256*1024*1024)))
+molecule_cache = MoleculeCache(max_entries=int(os.environ.get("MOLECULE_CACHE_ENTRIES", 32)))
+
+# Molecules with at least this many atoms are streamed to the client while they render, see stream_svg()
+STREAM_MIN_ATOMS = int(os.environ.get("STREAM_MIN_ATOMS", 10000))
+
+# Largest streamed render that is also kept in the render cache
+STREAM_CACHE_BYTES = int(os.environ.get("STREAM_CACHE_BYTES", 4*1024*1024))
+
+# Render context of the current palette version, kept current by a LISTEN on the palette channel
+palette = Palette()
+if os.environ.get("PALETTE_LISTEN", "1") != "0":
+    palette.start()
+
+frame_store = FrameStore(pool, lambda *args, **options: warm_frame(*args, **options),
+                         axes=os.environ.get("FRAME_AXES", "xyz"),
+                         step=int(os.environ.get("FRAME_STEP", 10)),
+                         workers=int(os.environ.get("FRAME_WORKERS", 1)))
+
+metrics.REGISTRY.add_collector(lambda: [
+    ("molvis_db_pool_connections", "gauge", "Pooled database connections by state.",
+     [({"state": state}, pool.stats()[state]) for state in ("idle", "in_use")]),
+    ("molvis_db_pool_max_connections", "gauge", "Maximum number of pooled database connections.",
+     [({}, pool.maxconn)]),
+    ("molvis_frame_store_pending", "gauge", "Molecules queued for frame warming.",
+     [({}, frame_store.stats()["pending"])]),
+])
+metrics.REGISTRY.add_collector(metrics.cache_collector({"svg": svg_cache.stats, "molecule": molecule_cache.stats,
+                                                        "frame": frame_store.stats}))
+
+def get_db() -> Database:
+    """
+    Returns the Database for the current request, checking a connection out of the pool on first use.
+
+    The connection is returned to the pool by release_db() when the request ends.
+
+    Returns:
+        Database: A Database using a pooled connection.
+    Raises:
+        HTTPException: A 503 error if no connection becomes available before the checkout timeout.
+    """
+    if "db" not in g:
+        try:
+            with metrics.stage("pool_checkout"):
+                g.db = Database(conn=pool.getconn())
+        except PoolTimeout:
+            abort(503, description="Database is busy")
+    return g.db
+
+@app.before_request
+def begin_request_metrics():
+    """
+    Starts timing the request and collecting its stage breakdown, if instrumentation is enabled.
+    """
+    g.metrics_token = metrics.begin_request()
+
+@app.after_request
+def end_request_metrics(response):
+    """
+    Records the duration of the request and logs it if it was slow, if instrumentation is enabled.
+
+    Args:
+        response (Response): The response of the request.
+
+    Returns:
+        Response: The same response.
+    """
+    metrics.end_request(g.pop("metrics_token", None), request.method,
+                        request.url_rule.rule if request.url_rule else "unmatched", response.status_code, request.path)
+    return response
+
+@app.teardown_request
+def end_failed_request_metrics(exception):
+    """
+    Records a request that ended with an unhandled exception, which skips end_request_metrics().
+
+    Args:
+        exception (Exception): The exception that ended the request, or None.
+    """
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        metrics.end_request(token, request.method, request.url_rule.rule if request.url_rule else "unmatched",
+                            500, request.path)
+
+@app.teardown_appcontext
+def release_db(exception):
+    """
+    Returns the current request's database connection to the pool, if one was checked out.
+
+    Args:
+        exception (Exception): The exception that ended the request, or None.
+    """
+    db = g.pop("db", None)
+    if db is not None:
+        pool.putconn(db.conn)
+
 @app.route('/', methods=['GET'])
 def index():
     """
@@ -45,17 +158,27 @@ def get_molecules():
     """
     Retrieves a list of molecules from the database and returns them as a JSON response.
 
-    This function connects to the database, creates tables if necessary, and queries for all
+    This function checks out a pooled database connection and queries for all
     records in the Molecules table. It then formats the results into a list of dictionaries,
     with each dictionary representing a single molecule, and returns the list as a JSON response.
+    The response carries an ETag derived from the number of molecules and the newest one, so a
+    matching If-None-Match is answered with 304 before the list is queried, and it is compressed
+    with brotli or gzip when the client accepts them.
 
     Returns:
         Response object: A JSON response containing a list of molecule dictionaries, with each
-                         dictionary containing the molecule's name.
+                         dictionary containing the molecule's name, or a 304 response.
     """
-    db = Database(reset=False)
-    db.create_tables()
-    molecules = db.conn.execute("SELECT * FROM Molecules")
+    db = get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(db.molecules_version(), encoding)
+
+    response = cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    db.cursor.execute("SELECT MOLECULE_ID, NAME FROM Molecules")
+    molecules = db.cursor.fetchall()
 
     molecule_dicts = []
     for molecule in molecules:
@@ -64,7 +187,88 @@ def get_molecules():
         }
         molecule_dicts.append(molecule_dict)
 
-    return jsonify(molecule_dicts)
+    body = compress(json.dumps(molecule_dicts).encode(), encoding)
+    return cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, lambda: body)
+
+@app.route('/molecules', methods=['GET'])
+def molecules():
+    """
+    Returns one page of the molecule list, optionally filtered by name, as a JSON response.
+
+    The query string may contain "limit", the page size (at most 500), "q", the
+    text molecule names must contain, "match", "substring" or "prefix", "sort", "id" or "name", and
+    "cursor", the "next" value of the previous page. Pages are fetched with keyset pagination by
+    Database.list_molecules(), so deep pages are as cheap as the first. The response carries an
+    ETag derived from the molecule list version and the query, as for /get-molecules.
+
+    Returns:
+        Response object: A JSON object whose "molecules" list holds the name, atom count and bond
+                         count of each molecule, and whose "next" is the cursor of the following
+                         page or null on the last page, or a 304 response.
+    Raises:
+        HTTPException: A 400 error if the limit, match mode, sort order or cursor is malformed.
+    """
+    listing = parse_listing(request.args)
+
+    db = get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(db.molecules_version(), listing["limit"], listing["query"], listing["match"],
+                     listing["sort"], listing["cursor"], encoding)
+
+    response = cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    rows, following = db.list_molecules(listing["limit"], listing["after"], listing["query"],
+                                        listing["match"], listing["sort"])
+    page = listing_page(rows, following, listing["sort"])
+
+    body = compress(json.dumps(page).encode(), encoding)
+    return cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, lambda: body)
+
+@app.route('/search', methods=['GET'])
+def search():
+    """
+    Returns one page of the molecules matching element counts, bond pattern counts or similarity
+    to another molecule, as a JSON response.
+
+    The query string may contain "elements", such as "S:2-,C:1-6", and "bonds", such as "C=O,O-H:2-",
+    whose count ranges are parsed by http_common.parse_search(), "similar", the name of a molecule
+    to rank matches by Tanimoto similarity of their fingerprints to, "threshold", the lowest
+    similarity returned, and "limit" and "cursor" as for /molecules. Matches are found by
+    Database.search_molecules() from the features stored at upload, without reading any atoms or
+    bonds. The response carries an ETag derived from the molecule list version and the query.
+
+    Returns:
+        Response object: A JSON object whose "molecules" list holds the name, atom count, bond count
+                         and, for similarity searches, the similarity of each match, and whose
+                         "next" is the cursor of the following page or null, or a 304 response.
+    Raises:
+        HTTPException: A 400 error if the query is malformed, or a 404 error if the similar
+                       molecule is not found.
+    """
+    search = parse_search(request.args)
+
+    db = get_db()
+    encoding = accepted_encoding()
+    etag = make_etag(db.molecules_version(), request.query_string, encoding)
+
+    response = cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding)
+    if response is not None:
+        return response
+
+    reference = None
+    if search["similar"] is not None:
+        reference = db.fingerprint(search["similar"])
+        if reference is None:
+            abort(404, description="Molecule not found")
+
+    rows, following = db.search_molecules(search["constraints"], reference, search["threshold"],
+                                          search["limit"], search["after"])
+    page = search_page(rows, following)
+
+    body = compress(json.dumps(page).encode(), encoding)
+    return cached_response(etag, "application/json", MOLECULES_MAX_AGE, encoding, lambda: body)
 
 @app.route('/upload-sdf', methods=['POST'])
 def upload_sdf():
@@ -86,50 +290,372 @@ def upload_sdf():
         abort(400, description="No file provided")
 
     file_data = request.files['sdf_file']
+    sdf_content = file_data.read().decode("utf-8", errors="replace")
 
-    with open("temp.sdf", "wb") as f:
-        f.write(file_data.read())
-
-    with open("temp.sdf", "r") as f:
-        found = False
-        name = ""
-        for line in f:
-            if found:
-                name = line.strip()
-                break
-            if "<NAME>" in line:
-                found = True
-    fp = open("temp.sdf", "r")
-    found = False
-
-    db = Database(reset=False)
-    db.create_tables()
-    query = "SELECT * FROM Molecules WHERE NAME = ?"
-    result = db.conn.execute(query, (name,)).fetchone()
+    name = sdf_name(sdf_content)
+
+    db = get_db()
+    query = "SELECT MOLECULE_ID FROM Molecules WHERE NAME = %s"
+    db.cursor.execute(query, (name,))
+    result = db.cursor.fetchone()
 
     if result is not None:
-        os.remove("temp.sdf")
         abort(400, description="Name already exists in the database")
 
-    db.add_molecule(name, fp)
+    db.add_molecule(name, io.StringIO(sdf_content))
+    svg_cache.invalidate(name)
+    molecule_cache.invalidate(name)
+    frame_store.warm(name)
 
-    os.remove("temp.sdf")
     return "File uploaded successfully."
 
+@app.route('/import-sdf', methods=['POST'])
+def import_sdf():
+    """
+    Imports every record of an uploaded multi-record SDF file into the database.
+
+    This function streams the uploaded file through sdf_import.import_sdf(), which parses the
+    '$$$$'-delimited records in batches and commits each batch in one transaction. Records whose
+    name already exists in the database, or that are malformed, are skipped and reported. Frames
+    of the imported molecules are not warmed here; the scheduled frame_store.py run picks them up.
+
+    Returns:
+        Response object: A JSON response summarising how many records were read and imported,
+                         with the duplicate and malformed records that were skipped.
+    Raises:
+        HTTPException: A 400 error if the SDF file is not provided.
+    """
+    if 'sdf_file' not in request.files:
+        abort(400, description="No file provided")
+
+    commit_size = request.form.get("commit_size", 500, type=int)
+    name_field = request.form.get("name_field", "NAME")
+    file = io.TextIOWrapper(request.files['sdf_file'].stream, encoding="utf-8", errors="replace")
+
+    def report(summary):
+        app.logger.info("import-sdf: %d records read, %d imported", summary["records"], summary["imported"])
+
+    # Frames of bulk imports are left to the scheduled `python frame_store.py` run, since warming
+    # every record here would queue ~100 renders each on this worker
+    def invalidate(name):
+        svg_cache.invalidate(name)
+        molecule_cache.invalidate(name)
+
+    summary = sdf_import.import_sdf(file, get_db(), commit_size=commit_size, name_field=name_field,
+                                    workers=int(os.environ.get("IMPORT_WORKERS", 2)),
+                                    progress=report, on_import=invalidate)
+    return jsonify(summary)
+
+def pose_molecule(db: Database, name: str, options: dict) -> Molecule:
+    """
+    Returns a molecule from the per-worker molecule cache, copied and transformed with mol_xform
+    if a rotation was requested.
+
+    Args:
+        db (Database): The database to load the molecule from.
+        name (str): The name of the molecule.
+        options (dict): Render options as returned by parse_rotation().
+
+    Returns:
+        Molecule: The molecule to render, which is shared with other requests if it is not rotated.
+    """
+    mol = molecule_cache.get(name, db.load_mol)
+    if options.keys() - {"viewport", "lod"}:
+        mol = mol.copy()
+        if "matrix" in options:
+            mol.transform(options["matrix"])
+        else:
+            mol.rotate(options.get("rx", 0), options.get("ry", 0), options.get("rz", 0))
+
+    if metrics.enabled:
+        metrics.record_molecule(mol.atom_no, mol.bond_no)
+    return mol
+
+def render_molecule(db: Database, name: str, version: str, **options) -> bytes:
+    """
+    Renders the SVG of a molecule with the given rotation, bypassing the render cache and frame store.
+
+    The molecule is posed by pose_molecule() and rendered, only in part if a viewport was
+    requested and at the requested level of detail.
+
+    Args:
+        db (Database): The database to load the molecule from.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        **options: Rotation options as returned by parse_rotation().
+
+    Returns:
+        bytes: The finished SVG.
+    """
+    context = palette.context(db, version)
+    mol = pose_molecule(db, name, options)
+    return mol.svg(context, options.get("viewport"), options.get("lod", LOD_FULL)).encode()
+
+def warm_frame(db: Database, name: str, version: str, **options) -> bytes:
+    """
+    Returns a frame for frame_store.warm(), taking it from the render cache if a request has just
+    rendered it and rendering it otherwise.
+
+    Args:
+        db (Database): The database to load the molecule from.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        **options: Rotation options as returned by FrameStore.options().
+
+    Returns:
+        bytes: The finished SVG.
+    """
+    svg_content = svg_cache.get(svg_cache.key(name, version, **options))
+    if svg_content is None:
+        svg_content = render_molecule(db, name, version, **options)
+    return svg_content
+
+def stream_svg(db: Database, name: str, version: str, encoding: str, **options):
+    """
+    Renders the SVG of a molecule with the given rotation as a stream of chunks, compressed with the
+    given content encoding as they are produced.
+
+    The molecule is loaded and posed before this returns, and rendered with Molecule.svg_chunks()
+    as the stream is read, so the whole document is never held by the worker. A render that turns
+    out to be no larger than STREAM_CACHE_BYTES once encoded is added to the render cache.
+
+    Args:
+        db (Database): The database to load the molecule from.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        encoding (str): "gzip" or "identity".
+        **options: Rotation options as returned by parse_rotation().
+
+    Returns:
+        generator: The encoded SVG in chunks of bytes.
+    """
+    context = palette.context(db, version)
+    mol = pose_molecule(db, name, options)
+    if encoding == "identity":
+        key = svg_cache.key(name, version, **options)
+    else:
+        key = svg_cache.key(name, version, encoding=encoding, **options)
+
+    chunks = (chunk.encode() for chunk in mol.svg_chunks(context, options.get("viewport"), options.get("lod", LOD_FULL)))
+
+    def generate():
+        kept, size = [], 0
+        for data in compress_stream(chunks, encoding):
+            if kept is not None:
+                kept.append(data)
+                size += len(data)
+                if size > STREAM_CACHE_BYTES:
+                    kept = None
+            yield data
+        if kept is not None:
+            svg_cache.put(key, b"".join(kept))
+    return generate()
+
+def stored_svg(db: Database, name: str, version: str, encoding: str, options: dict) -> bytes:
+    """
+    Returns the SVG of a molecule if it is already in the render cache or stored in the frame store.
+
+    A frame-store hit is added to the render cache, as render_svg() does after rendering.
+
+    Args:
+        db (Database): The database holding the frame store.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        encoding (str): "br", "gzip" or "identity".
+        options (dict): Rotation options as returned by parse_rotation().
+
+    Returns:
+        bytes: The encoded SVG, or None if it has not been rendered.
+    """
+    if encoding == "identity":
+        key = svg_cache.key(name, version, **options)
+    else:
+        key = svg_cache.key(name, version, encoding=encoding, **options)
+    data = svg_cache.get(key)
+    if data is None and encoding in ("identity", "gzip"):
+        with metrics.stage("frame_store"):
+            data = frame_store.get(db, name, version, options, compressed=encoding == "gzip")
+        if data is not None:
+            svg_cache.put(key, data)
+    return data
+
+def render_svg(db: Database, name: str, version: str, **options) -> bytes:
+    """
+    Returns the SVG of a molecule with the given rotation, rendering it only if it is neither in
+    the render cache nor stored in the frame store.
+
+    A freshly rendered frame of the standard rotation set queues the molecule for frame_store.warm(),
+    which stores its rotation set in the background rather than on the request's connection.
+
+    Args:
+        db (Database): The database to load the molecule from on a miss.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        **options: Rotation options as returned by parse_rotation().
+
+    Returns:
+        bytes: The finished SVG.
+    """
+    key = svg_cache.key(name, version, **options)
+    with metrics.stage("render_cache"):
+        svg_content = svg_cache.get(key)
+    if svg_content is not None:
+        return svg_content
+
+    with metrics.stage("frame_store"):
+        svg_content = frame_store.get(db, name, version, options)
+    if svg_content is None:
+        svg_content = render_molecule(db, name, version, **options)
+        if frame_store.frame_key(options) is not None:
+            frame_store.warm(name)
+
+    svg_cache.put(key, svg_content)
+    return svg_content
+
+def accepted_encoding(streamed: bool=False) -> str:
+    """
+    Picks the content encoding of a response from the request's Accept-Encoding header.
+
+    Args:
+        streamed (bool, optional): Whether the body will be streamed, which rules out brotli. Defaults to False.
+
+    Returns:
+        str: "br" if brotli is installed and accepted, otherwise "gzip" if accepted, otherwise "identity".
+    """
+    return select_encoding(request.accept_encodings, streamed)
+
+def cached_response(etag: str, content_type: str, max_age: int, encoding: str, body=None) -> Response:
+    """
+    Builds a cacheable response, or a 304 response if the client already has this representation.
+
+    Args:
+        etag (str): The strong ETag of the representation, as returned by make_etag().
+        content_type (str): The Content-Type of the body.
+        max_age (int): The Cache-Control max-age in seconds.
+        encoding (str): The content encoding of the body, as returned by accepted_encoding().
+        body (callable, optional): Called with no arguments to produce the encoded body when the
+            client does not have it. Defaults to None, which only checks If-None-Match.
+
+    Returns:
+        Response: A 304 response if If-None-Match matches etag, a 200 response with the body
+                  otherwise, or None if the client does not have it and no body was given.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif body is None:
+        return None
+    else:
+        response = Response(body(), content_type=content_type)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    cache_headers(response, etag, max_age)
+    return response
+
+def render_encoded(db: Database, name: str, version: str, encoding: str, **options) -> bytes:
+    """
+    Returns the SVG of a molecule with the given rotation, compressed with the given content encoding.
+
+    Compressed variants are kept in the render cache alongside the plain render, and gzip-compressed
+    standard frames are served straight from the frame store without recompressing them.
+
+    Args:
+        db (Database): The database to load the molecule from on a miss.
+        name (str): The name of the molecule.
+        version (str): The current version of the Elements table.
+        encoding (str): "br", "gzip" or "identity".
+        **options: Rotation options as returned by parse_rotation().
+
+    Returns:
+        bytes: The encoded SVG.
+    """
+    if encoding == "identity":
+        return render_svg(db, name, version, **options)
+
+    key = svg_cache.key(name, version, encoding=encoding, **options)
+    data = svg_cache.get(key)
+    if data is not None:
+        return data
+
+    if encoding == "gzip":
+        with metrics.stage("frame_store"):
+            data = frame_store.get(db, name, version, options, compressed=True)
+    if data is None:
+        svg_content = render_svg(db, name, version, **options)
+        with metrics.stage("compress"):
+            data = compress(svg_content, encoding)
+
+    svg_cache.put(key, data)
+    return data
+
+@app.route('/svg/<path:name>', methods=['GET'])
+def svg(name):
+    """
+    Returns the SVG rendering of a molecule as a cacheable GET response.
+
+    The query string may contain whole-degree rotations "rx", "ry" and "rz", or a "matrix" of nine
+    comma-separated numbers, a "viewport" of four, and a level of detail "lod" or pixel width "px",
+    as for /get-svg. The response carries a strong ETag derived from the molecule's content hash,
+    the palette version, the rotation, the resolved level of detail and the content encoding, so a
+    matching If-None-Match is answered with 304 without rendering. Bodies are compressed with
+    brotli or gzip when the client accepts them, and the compressed variants are cached. Molecules
+    of STREAM_MIN_ATOMS atoms or more that have not been rendered yet are streamed by stream_svg()
+    with chunked transfer encoding, and compressed with gzip rather than brotli.
+
+    Args:
+        name (str): The name of the molecule.
+
+    Returns:
+        Response object: The SVG document with an image/svg+xml content type, or a 304 response.
+    Raises:
+        HTTPException: A 404 error if there is no such molecule, or a 400 error if the rotation is malformed.
+    """
+    options = parse_rotation(request.args)
+
+    db = get_db()
+    content_hash = db.content_hash(name)
+    if content_hash is None:
+        abort(404, description="Molecule not found")
+    atom_count = db.atom_count(name)
+    if options.get("lod") == LOD_AUTO:
+        options = resolve_detail(options, atom_count)
+
+    version = palette.version(db)
+    svg_cache.set_version(version)
+
+    streamed = atom_count >= STREAM_MIN_ATOMS
+    encoding = accepted_encoding(streamed)
+    etag = make_etag(content_hash, version, sorted(options.items()), encoding)
+
+    def body():
+        if not streamed:
+            return render_encoded(db, name, version, encoding, **options)
+        data = stored_svg(db, name, version, encoding, options)
+        if data is not None:
+            return data
+        return stream_with_context(stream_svg(db, name, version, encoding, **options))
+    return cached_response(etag, "image/svg+xml", SVG_MAX_AGE, encoding, body)
+
 @app.route('/get-svg', methods=['POST'])
 def get_svg():
     """
-    Uploads a given SDF file and adds its data to the Molecules table in the database.
-    This function first checks if the SDF file is provided in the request. If not, it raises a 400
-    error. It then extracts the molecule name from the file and checks if it already exists in the
-    database. If it does, a 400 error is raised. Otherwise, the molecule is added to the database,
-    and a success message is returned.
+    Returns the SVG rendering of a molecule, optionally rotated on the server.
+
+    The JSON body must contain the molecule "name". It may also contain whole-degree rotations
+    "rx", "ry" and "rz", applied about the x, y and z axes in that order, or a 3x3 "matrix"
+    applied to every atom, and a "viewport" [x, y, width, height] in the coordinates of the
+    full render's viewBox, which renders only the atoms and bonds in that region and uses it as
+    the viewBox. A "lod" of no-labels, no-hydrogens, backbone or overview renders less detail, and
+    "auto", or a pixel width "px" at which the image will be shown, picks the level from the atom
+    count and the pixel width. Renders are served from the render cache when possible, and
+    molecules of STREAM_MIN_ATOMS atoms or more are otherwise streamed with chunked transfer
+    encoding as they render.
 
     Returns:
-        str: A success message indicating that the file has been uploaded successfully.
+        Response object: The SVG document with an image/svg+xml content type.
     Raises:
-        HTTPException: A 400 error if the SDF file is not provided or if the name already exists
-                    in the database.
+        HTTPException: A 400 error if the molecule name is not provided or the rotation is malformed,
+                       or a 404 error if there is no such molecule.
     """
     data = request.get_json()
 
@@ -137,26 +663,89 @@ def get_svg():
         abort(400, description="Molecule name not provided")
 
     molecule_name = data["name"]
+    options = parse_rotation(data)
+
+    db = get_db()
+    version = palette.version(db)
+    svg_cache.set_version(version)
+    atom_count = db.atom_count(molecule_name)
+    if atom_count is None:
+        abort(404, description="Molecule not found")
+    if options.get("lod") == LOD_AUTO:
+        options = resolve_detail(options, atom_count)
 
-    db = Database(reset=False)
-    mol_display.RADIUS = db.radius()
-    mol_display.ELEMENT_NAME = db.element_name()
-    mol_display.HEADER += db.radial_gradients()
-    mol = db.load_mol(molecule_name)
-    mol.sort()
-    svg_filename = molecule_name + ".svg"
-    with open(svg_filename, "w") as fp:
-        fp.write(mol.svg())
-    updated_svg_content = mol.adjust_svg_viewbox(svg_filename)
-    clean_svg_content = mol.remove_namespace_prefix(updated_svg_content, "ns0:")
-    with open(svg_filename, "w") as fp:
-        fp.write(clean_svg_content)
-
-    with open(svg_filename, "r") as fp:
-        svg_content = fp.read()
-    
-    os.remove(svg_filename)
+    if atom_count >= STREAM_MIN_ATOMS:
+        svg_content = stored_svg(db, molecule_name, version, "identity", options)
+        if svg_content is None:
+            return Response(stream_with_context(stream_svg(db, molecule_name, version, "identity", **options)),
+                            content_type="image/svg+xml")
+    else:
+        svg_content = render_svg(db, molecule_name, version, **options)
     return svg_content, 200, {"Content-Type": "image/svg+xml"}
 
+@app.route('/get-frames', methods=['POST'])
+def get_frames():
+    """
+    Returns a sequence of SVG frames of a molecule rotating about one axis, such as a turntable.
+
+    The JSON body must contain the molecule "name" and may contain the "axis" ("x", "y" or "z",
+    default "y"), the "step" between frames in whole degrees (default 10) and the number of
+    frames "count" (default enough for a full turn). The molecule is loaded once and every
+    frame is rendered from it with mol_xform.
+
+    Returns:
+        Response object: A JSON response with the name, axis, step and the list of SVG frames.
+    Raises:
+        HTTPException: A 400 error if the molecule name is not provided or the frame options are invalid,
+                       or a 404 error if there is no such molecule.
+    """
+    data = request.get_json()
+
+    if not data or "name" not in data:
+        abort(400, description="Molecule name not provided")
+
+    axis, step, frame_options = parse_frames(data)
+    molecule_name = data["name"]
+
+    db = get_db()
+    if db.atom_count(molecule_name) is None:
+        abort(404, description="Molecule not found")
+    version = palette.version(db)
+    svg_cache.set_version(version)
+
+    frames = [render_svg(db, molecule_name, version, **options).decode() for options in frame_options]
+
+    return jsonify({"name": molecule_name, "axis": axis, "step": step, "frames": frames})
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """
+    Returns the hit and miss counts of the SVG render cache, molecule cache and frame store as a JSON response.
+
+    Returns:
+        Response object: A JSON response containing the render cache statistics of this worker,
+                         with the molecule cache statistics under "molecules" and the frame store
+                         statistics under "frames".
+    """
+    return jsonify({**svg_cache.stats(), "molecules": molecule_cache.stats(), "frames": frame_store.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Returns the metrics of this worker in the Prometheus text exposition format.
+
+    Stage, query, request and molecule size histograms are recorded while METRICS_ENABLED is set;
+    database pool and cache statistics are read when the endpoint is scraped. Each worker process
+    keeps its own metrics, so every worker has to be scraped.
+
+    Returns:
+        Response object: The exposition with a text/plain content type.
+    Raises:
+        HTTPException: A 404 error if METRICS_ENABLED is not set.
+    """
+    if not metrics.METRICS_ENABLED:
+        abort(404, description="Metrics are disabled")
+    return Response(metrics.REGISTRY.expose(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 8000)))
\ No newline at end of file
@@ -6,7 +6,9 @@ c_molecule_directory = "C-molecule-library"
 
 molecule_module = Extension('_molecule',
                             sources=[os.path.join(c_molecule_directory, 'molecule_wrap.c'),
-                                     os.path.join(c_molecule_directory, 'molecule.c')],
+                                     os.path.join(c_molecule_directory, 'molecule.c'),
+                                     os.path.join(c_molecule_directory, 'sdfparse.c'),
+                                     os.path.join(c_molecule_directory, 'spatial.c')],
                             include_dirs=[sysconfig.get_path('include')],
                             extra_compile_args=['-Wall', '-std=c99', '-pedantic'],
                             extra_link_args=[os.path.join(os.path.dirname(__file__), c_molecule_directory, 'libmol.so')],
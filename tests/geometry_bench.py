@@ -0,0 +1,61 @@
+# Compares load_mol() latency and on-disk size of row storage against packed geometry
+# usage: python tests/geometry_bench.py [atom_count] [repeats]
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from molsql import Database, STORAGE_ROWS, STORAGE_PACKED
+
+atom_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+rows_db = Database(reset=False, storage=STORAGE_ROWS)
+rows_db.create_tables()
+packed_db = Database(reset=False, conn=rows_db.conn, storage=STORAGE_PACKED)
+
+# Build a synthetic chain molecule
+atoms = [(random.choice(['C', 'N', 'O', 'H']), round(random.uniform(-5, 5), 4),
+          round(random.uniform(-5, 5), 4), round(random.uniform(-5, 5), 4)) for i in range(atom_count)]
+bonds = [(i, i + 1, 1) for i in range(atom_count - 1)]
+
+def relation_bytes(db, tables):
+    db.cursor.execute("SELECT SUM(pg_total_relation_size(t::regclass)) FROM UNNEST(%s::text[]) AS t", (tables,))
+    return int(db.cursor.fetchone()[0])
+
+def timeit(db, name):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        db.load_mol(name)
+    return (time.perf_counter() - start) / repeats * 1000
+
+row_tables = ["Atoms", "Bonds", "MoleculeAtom", "MoleculeBond"]
+suffix = time.time()
+
+rows_name = f"geometry-bench-rows-{suffix}"
+before = relation_bytes(rows_db, row_tables)
+rows_db.add_geometry(rows_name, atoms, bonds)
+rows_size = relation_bytes(rows_db, row_tables) - before
+
+packed_name = f"geometry-bench-packed-{suffix}"
+# Shifted so that the copy is not stored as an alias of the row-stored molecule
+packed_db.add_geometry(packed_name, [(e, x + 100, y, z) for e, x, y, z in atoms], bonds)
+packed_db.cursor.execute("SELECT pg_column_size(GEOMETRY) FROM Molecules WHERE NAME = %s", (packed_name,))
+packed_size = packed_db.cursor.fetchone()[0]
+
+rows_ms = timeit(rows_db, rows_name)
+packed_ms = timeit(packed_db, packed_name)
+
+# Remove both molecules again
+rows_db.pack_molecule(rows_name, drop_rows=True)
+rows_db.cursor.execute("""DELETE FROM MoleculeFeatures WHERE MOLECULE_ID IN
+                          (SELECT MOLECULE_ID FROM Molecules WHERE NAME = ANY(%s))""", ([rows_name, packed_name],))
+rows_db.cursor.execute("DELETE FROM Molecules WHERE NAME = ANY(%s)", ([rows_name, packed_name],))
+rows_db.conn.commit()
+
+print(f"{atom_count} atoms, {len(bonds)} bonds, {repeats} repeats")
+print(f"rows:   {rows_ms:.2f} ms/load, ~{rows_size / 1024:.0f} KiB in Atoms, Bonds and link tables")
+print(f"packed: {packed_ms:.2f} ms/load, {packed_size / 1024:.0f} KiB in Molecules.GEOMETRY")
+print(f"speedup: {rows_ms / packed_ms:.1f}x, size ratio: {rows_size / packed_size:.1f}x")
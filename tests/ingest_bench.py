@@ -0,0 +1,62 @@
+# Compares rows/sec of the per-row insert path against Database.add_geometry()
+# usage: python tests/ingest_bench.py [atom_count]
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from molsql import Database
+import mol_display
+
+atom_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+db = Database(reset=False)
+db.create_tables()
+
+# Build a synthetic chain molecule
+mol = mol_display.Molecule()
+for i in range(atom_count):
+    mol.append_atom(random.choice(['C', 'N', 'O', 'H']), random.uniform(-5, 5), random.uniform(-5, 5), random.uniform(-5, 5))
+for i in range(atom_count - 1):
+    mol.append_bond(i, i + 1, 1)
+
+atoms = [(a.element, a.x, a.y, a.z) for a in (mol.get_atom(i) for i in range(mol.atom_no))]
+bonds = [(b.a1, b.a2, b.epairs) for b in (mol.get_bond(i) for i in range(mol.bond_no))]
+rows = 2 * (len(atoms) + len(bonds))
+
+def remove(name):
+    db.cursor.execute("SELECT MOLECULE_ID FROM Molecules WHERE NAME = %s", (name,))
+    mol_id = db.cursor.fetchone()[0]
+    db.cursor.execute("DELETE FROM MoleculeAtom WHERE MOLECULE_ID = %s RETURNING ATOM_ID", (mol_id,))
+    db.cursor.execute("DELETE FROM Atoms WHERE ATOM_ID = ANY(%s)", ([r[0] for r in db.cursor.fetchall()],))
+    db.cursor.execute("DELETE FROM MoleculeBond WHERE MOLECULE_ID = %s RETURNING BOND_ID", (mol_id,))
+    db.cursor.execute("DELETE FROM Bonds WHERE BOND_ID = ANY(%s)", ([r[0] for r in db.cursor.fetchall()],))
+    db.cursor.execute("DELETE FROM MoleculeFeatures WHERE MOLECULE_ID = %s", (mol_id,))
+    db.cursor.execute("DELETE FROM Molecules WHERE MOLECULE_ID = %s", (mol_id,))
+    db.conn.commit()
+
+# Per-row path: one INSERT, one molecule lookup and one commit per atom and bond
+name = f"ingest-bench-rows-{time.time()}"
+start = time.perf_counter()
+db.cursor.execute("INSERT INTO Molecules (NAME) VALUES (%s)", (name,))
+db.conn.commit()
+for i in range(mol.atom_no):
+    db.add_atom(name, mol_display.Atom(mol.get_atom(i)))
+for i in range(mol.bond_no):
+    db.add_bond(name, mol_display.Bond(mol.get_bond(i)))
+per_row = time.perf_counter() - start
+remove(name)
+
+# Bulk path: batched multi-row inserts in one transaction
+name = f"ingest-bench-bulk-{time.time()}"
+start = time.perf_counter()
+db.add_geometry(name, atoms, bonds)
+bulk = time.perf_counter() - start
+remove(name)
+
+print(f"{atom_count} atoms, {len(bonds)} bonds, {rows} rows")
+print(f"per-row: {per_row:.3f}s ({rows / per_row:.0f} rows/sec)")
+print(f"bulk:    {bulk:.3f}s ({rows / bulk:.0f} rows/sec)")
+print(f"speedup: {per_row / bulk:.1f}x")
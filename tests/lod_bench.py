@@ -0,0 +1,33 @@
+# Measures the output size and render time of Molecule.svg() at every level of detail
+# usage: python tests/lod_bench.py [repeats]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mol_display
+import synthetic_sdf
+
+repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+sizes = [100, 1000, 10000, 50000]
+
+context = mol_display.RenderContext({'C': 40, 'N': 40, 'O': 40, 'H': 25, 'S': 50},
+                                     {'C': 'Carbon', 'N': 'Nitrogen', 'O': 'Oxygen', 'H': 'Hydrogen', 'S': 'Sulfur'})
+
+def timeit(fn):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+print(f"{'atoms':>7} {'level':>13} {'bytes':>10} {'svg ms':>9}  {'auto at 1000px / 4000px':>24}")
+for atom_count in sizes:
+    mol = mol_display.Molecule()
+    mol.parse_bytes(synthetic_sdf.generate(atom_count, 1).encode())
+    auto = f"{mol_display.choose_detail(mol.atom_no)} / {mol_display.choose_detail(mol.atom_no, 4000)}"
+    for level in mol_display.LOD_LEVELS:
+        size = len(mol.svg(context, detail=level))
+        render = timeit(lambda: mol.svg(context, detail=level))
+        print(f"{atom_count:>7} {level:>13} {size:>10} {render:>9.2f}  {auto:>24}")
+        auto = ""
@@ -0,0 +1,65 @@
+# Compares SD parsing throughput of the old Python line parser against the C parser
+# usage: python tests/parse_bench.py [record_count] [atom_count]
+import io
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mol_display
+from molecule import sdf_offsets
+
+record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+atom_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+# Build a synthetic multi-record V2000 file of chain molecules
+records = []
+for r in range(record_count):
+    lines = [f"bench{r}", "  synthetic", "", f"{atom_count:3d}{atom_count - 1:3d}  0  0  0  0  0  0  0  0999 V2000"]
+    for i in range(atom_count):
+        lines.append("%10.4f%10.4f%10.4f %-3s 0  0  0  0  0  0  0  0  0  0  0  0" %
+                     (random.uniform(-5, 5), random.uniform(-5, 5), random.uniform(-5, 5), random.choice(['C', 'N', 'O', 'H'])))
+    for i in range(atom_count - 1):
+        lines.append(f"{i + 1:3d}{i + 2:3d}  1  0  0  0  0")
+    lines += ["M  END", "> <NAME>", f"bench{r}", "", "$$$$"]
+    records.append("\n".join(lines) + "\n")
+text = "".join(records)
+data = text.encode()
+
+def legacy():
+    # Split on '$$$$', then readline/split/float every line and append atoms and bonds one at a time
+    for record in text.split("$$$$\n"):
+        if not record.strip():
+            continue
+        file = io.StringIO(record)
+        mol = mol_display.Molecule()
+        for i in range(3):
+            file.readline()
+        line = file.readline().strip()
+        counts = line.split()
+        for i in range(int(counts[0])):
+            atom_info = file.readline().strip().split()
+            mol.append_atom(atom_info[3], float(atom_info[0]), float(atom_info[1]), float(atom_info[2]))
+        for i in range(int(counts[1])):
+            bond_info = file.readline().strip().split()
+            mol.append_bond(int(bond_info[0]) - 1, int(bond_info[1]) - 1, int(bond_info[2]))
+
+def native():
+    for offset in sdf_offsets(data):
+        mol = mol_display.Molecule()
+        mol.parse_bytes(data, offset)
+
+def timeit(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+before = timeit(legacy)
+after = timeit(native)
+
+print(f"{record_count} records of {atom_count} atoms, {len(data) / 1e6:.1f} MB")
+print(f"python parser: {before:.3f}s ({record_count / before:.0f} records/sec, {len(data) / 1e6 / before:.1f} MB/s)")
+print(f"C parser:      {after:.3f}s ({record_count / after:.0f} records/sec, {len(data) / 1e6 / after:.1f} MB/s)")
+print(f"speedup: {before / after:.1f}x")
@@ -0,0 +1,216 @@
+# Times every stage of the upload-to-SVG pipeline on synthetic molecules and writes the results as JSON
+# usage: python tests/pipeline_bench.py [--sizes 10,100,1000,10000,100000] [--repeats 5] [--output results.json]
+#                                       [--compare baseline.json] [--threshold 1.25] [--min-ms 1.0]
+#                                       [--storage rows|packed]
+# Uses the database named by DATABASE_URL if it is set, and otherwise a throwaway embedded Postgres
+# (pip install pgserver). Benchmark molecules are deleted again afterwards.
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import synthetic_sdf
+
+STAGES = ["parse", "add_molecule", "add_duplicate", "load_mol", "molsort", "mol_xform", "svg", "viewbox", "get_svg", "get_svg_cached"]
+BENCH_ELEMENTS = [(1, "H", "Hydrogen", "FFFFFF", "050505", "020202", 25),
+                  (6, "C", "Carbon", "808080", "010101", "000000", 40),
+                  (7, "N", "Nitrogen", "3050F8", "010101", "000000", 40),
+                  (8, "O", "Oxygen", "FF0D0D", "010101", "000000", 40)]
+
+def start_database() -> tuple:
+    """
+    Returns the database URL to benchmark against and a handle that keeps an embedded server alive.
+    """
+    if "DATABASE_URL" in os.environ:
+        return os.environ["DATABASE_URL"], None, "external"
+
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("Set DATABASE_URL or install pgserver for an embedded throwaway database")
+
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="pipeline-bench-"), cleanup_mode="delete")
+    os.environ["DATABASE_URL"] = server.get_uri()
+    os.environ["DATABASE_SSLMODE"] = "disable"
+    return os.environ["DATABASE_URL"], server, "embedded"
+
+def measure(fn, repeats: int, setup=None) -> dict:
+    """
+    Times fn repeats times, calling setup untimed before each run and passing its result to fn.
+    """
+    runs = []
+    for _ in range(repeats):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(runs), "median_ms": statistics.median(runs), "mean_ms": statistics.fmean(runs),
+            "runs_ms": runs}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def delete_molecules(db, names: list):
+    for name in names:
+        db.pack_molecule(name, drop_rows=True)
+    db.cursor.execute("""DELETE FROM Frames WHERE MOLECULE_ID IN
+                         (SELECT MOLECULE_ID FROM Molecules WHERE NAME = ANY(%s))""", (names,))
+    db.cursor.execute("""DELETE FROM MoleculeFeatures WHERE MOLECULE_ID IN
+                         (SELECT MOLECULE_ID FROM Molecules WHERE NAME = ANY(%s))""", (names,))
+    db.cursor.execute("DELETE FROM Molecules WHERE NAME = ANY(%s)", (names,))
+    db.conn.commit()
+
+def bench_size(db, client, server, context, atom_count: int, repeats: int, seed: int) -> dict:
+    import mol_display
+
+    prefix = f"pipeline-bench-{os.getpid()}-{atom_count}"
+    text = synthetic_sdf.generate(atom_count, seed, name=prefix)
+    stages = {}
+
+    stages["parse"] = measure(lambda: mol_display.Molecule().parse(io.StringIO(text)), repeats)
+
+    # Identical structures are stored as aliases, so every timed insert gets a structure of its own
+    names = [f"{prefix}-{i}" for i in range(repeats)]
+    texts = [text] + [synthetic_sdf.generate(atom_count, seed + i, name=prefix) for i in range(1, repeats)]
+    duplicates = [f"{prefix}-duplicate-{i}" for i in range(repeats)]
+    pending = iter(zip(names, texts))
+    pending_duplicates = iter(duplicates)
+    try:
+        stages["add_molecule"] = measure(lambda item: db.add_molecule(item[0], io.StringIO(item[1])), repeats,
+                                         setup=lambda: next(pending))
+        stages["add_duplicate"] = measure(lambda name: db.add_molecule(name, io.StringIO(text)), repeats,
+                                          setup=lambda: next(pending_duplicates))
+
+        name = names[0]
+        stages["load_mol"] = measure(lambda: db.load_mol(name), repeats)
+
+        mol = db.load_mol(name)
+        stages["molsort"] = measure(lambda copy: copy.sort(), repeats, setup=mol.copy)
+        stages["mol_xform"] = measure(lambda copy: copy.rotate(30, 45, 60), repeats, setup=mol.copy)
+        stages["svg"] = measure(lambda: mol.svg(context), repeats)
+
+        _, xyz = mol.atom_arrays()
+        cx, cy = mol_display.screen_coords(xyz, context)
+        stages["viewbox"] = measure(lambda: mol.viewbox(cx, cy), repeats)
+
+        # rx=1 is not a stored rotation frame, so a cold request loads and renders the molecule
+        def cold():
+            server.svg_cache.clear()
+            server.molecule_cache.invalidate(name)
+
+        def get_svg(_=None):
+            response = client.post("/get-svg", json={"name": name, "rx": 1})
+            assert response.status_code == 200, response.status_code
+
+        stages["get_svg"] = measure(get_svg, repeats, setup=cold)
+        stages["get_svg_cached"] = measure(get_svg, repeats)
+    finally:
+        db.conn.rollback()
+        delete_molecules(db, names + duplicates)
+
+    return {"atoms": atom_count, "bonds": max(atom_count - 1, 0), "sdf_bytes": len(text), "stages": stages}
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float) -> list:
+    """
+    Prints the median time of every stage against a baseline run and returns the regressions.
+    Stages faster than min_ms in the baseline are too noisy to be reported as regressions.
+    """
+    previous = {(entry["atoms"], stage): timing["median_ms"]
+                for entry in baseline["results"] for stage, timing in entry["stages"].items()}
+    regressions = []
+
+    print(f"\n{'atoms':>7} {'stage':<15} {'baseline ms':>12} {'now ms':>10} {'ratio':>7}")
+    for entry in results["results"]:
+        for stage, timing in entry["stages"].items():
+            before = previous.get((entry["atoms"], stage))
+            if before is None:
+                continue
+            ratio = timing["median_ms"] / before if before > 0 else float("inf")
+            flag = " REGRESSION" if ratio > threshold and before >= min_ms else ""
+            print(f"{entry['atoms']:>7} {stage:<15} {before:>12.3f} {timing['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+            if flag:
+                regressions.append((entry["atoms"], stage, ratio))
+    return regressions
+
+def main(argv: list=None):
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the upload-to-SVG pipeline.")
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="comma-separated atom counts")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per stage")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic molecules")
+    parser.add_argument("--storage", choices=["rows", "packed"], default="rows", help="geometry storage mode")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against the results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="median slowdown ratio reported as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="baseline median below which a stage is never reported as a regression")
+    args = parser.parse_args(argv)
+
+    _, handle, database = start_database()
+    os.environ["GEOMETRY_STORAGE"] = args.storage
+
+    import server
+    from molsql import Database
+
+    db = Database()
+    db.create_tables()
+    for element in BENCH_ELEMENTS:
+        db.cursor.execute("INSERT INTO Elements VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT DO NOTHING", element)
+    db.conn.commit()
+
+    context = db.render_context()
+
+    client = server.app.test_client()
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "database": database,
+            "storage": args.storage,
+            "repeats": args.repeats,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+
+    print(f"{'atoms':>7} " + " ".join(f"{stage:>14}" for stage in STAGES) + "   (median ms)")
+    for atom_count in [int(size) for size in args.sizes.split(",")]:
+        entry = bench_size(db, client, server, context, atom_count, args.repeats, args.seed)
+        results["results"].append(entry)
+        print(f"{atom_count:>7} " + " ".join(f"{entry['stages'][stage]['median_ms']:>14.3f}" for stage in STAGES))
+
+    server.frame_store.shutdown()
+    db.conn.close()
+    server.pool.closeall()
+    if handle is not None:
+        handle.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(results, json.load(fp), args.threshold, args.min_ms)
+        if regressions:
+            sys.exit(f"{len(regressions)} stages slowed down by more than {args.threshold}x")
+
+if __name__ == "__main__":
+    main()
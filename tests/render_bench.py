@@ -0,0 +1,65 @@
+# Compares per-request render latency of the old temp-file pipeline against Molecule.svg()
+# usage: python tests/render_bench.py [atom_count] [repeats]
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mol_display
+
+atom_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+context = mol_display.RenderContext({'C': 40, 'N': 40, 'O': 40, 'H': 25},
+                                     {'C': 'Carbon', 'N': 'Nitrogen', 'O': 'Oxygen', 'H': 'Hydrogen'})
+
+# Build a synthetic chain molecule
+mol = mol_display.Molecule()
+for i in range(atom_count):
+    mol.append_atom(random.choice(['C', 'N', 'O', 'H']), random.uniform(-5, 5), random.uniform(-5, 5), random.uniform(-5, 5))
+for i in range(atom_count - 1):
+    mol.append_bond(i, i + 1, 1)
+mol.sort()
+
+def legacy(svg_filename):
+    # Write the SVG, re-parse it to find the circle centres, strip the namespace prefix and write it again
+    with open(svg_filename, "w") as fp:
+        fp.write(mol.svg(context))
+    with open(svg_filename, "r") as fp:
+        root = ElementTree.fromstring(fp.read())
+    coords = [(float(c.get('cx')), float(c.get('cy'))) for c in root.findall(".//{http://www.w3.org/2000/svg}circle")]
+    min_x, min_y = min(x for x, y in coords) - 100, min(y for x, y in coords) - 100
+    max_x, max_y = max(x for x, y in coords) + 100, max(y for x, y in coords) + 100
+    root.set('viewBox', f"{min_x} {min_y} {max_x - min_x} {max_y - min_y}")
+    content = ElementTree.tostring(root, encoding='unicode')
+    content = re.sub(r"<ns0:(\w+)", r"<\1", content)
+    content = re.sub(r"</ns0:(\w+)>", r"</\1>", content)
+    with open(svg_filename, "w") as fp:
+        fp.write(content)
+    with open(svg_filename, "rb") as fp:
+        data = fp.read()
+    os.remove(svg_filename)
+    return data
+
+def in_memory():
+    return mol.svg(context).encode()
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(*args)
+    return (time.perf_counter() - start) / repeats * 1000
+
+with tempfile.TemporaryDirectory() as directory:
+    before = timeit(legacy, os.path.join(directory, "bench.svg"))
+after = timeit(in_memory)
+
+print(f"{atom_count} atoms, {mol.bond_no} bonds, {repeats} repeats")
+print(f"temp-file pipeline: {before:.2f} ms/request")
+print(f"in-memory svg():    {after:.2f} ms/request")
+print(f"speedup: {before / after:.1f}x")
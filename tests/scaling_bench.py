@@ -0,0 +1,40 @@
+# Measures how Molecule.svg() and its C-side z-ordering scale with molecule size
+# usage: python tests/scaling_bench.py [repeats]
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mol_display
+
+repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+sizes = [10, 100, 1000, 10000, 100000]
+
+context = mol_display.RenderContext({'C': 40, 'N': 40, 'O': 40, 'H': 25},
+                                     {'C': 'Carbon', 'N': 'Nitrogen', 'O': 'Oxygen', 'H': 'Hydrogen'})
+
+rng = np.random.default_rng(0)
+
+def build(atom_count):
+    # Build a synthetic chain molecule
+    mol = mol_display.Molecule(atom_count, atom_count - 1)
+    mol.append_atoms(rng.choice(['C', 'N', 'O', 'H'], atom_count), rng.uniform(-5, 5, (atom_count, 3)))
+    chain = np.arange(atom_count - 1)
+    mol.append_bonds(np.column_stack((chain, chain + 1)), np.ones(atom_count - 1, dtype=np.uint8))
+    return mol
+
+def timeit(fn):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+print(f"{'atoms':>7} {'elements':>9} {'z_order ms':>11} {'svg ms':>9} {'us/element':>11}")
+for atom_count in sizes:
+    mol = build(atom_count)
+    elements = mol.atom_no + mol.bond_no
+    order = timeit(mol.z_order)
+    render = timeit(lambda: mol.svg(context))
+    print(f"{atom_count:>7} {elements:>9} {order:>11.3f} {render:>9.2f} {render * 1000 / elements:>11.2f}")
@@ -0,0 +1,48 @@
+# Checks the spatial grid and bond perception of the C library against brute-force distance scans
+# usage: python tests/spatial_test.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import mol_display
+import synthetic_sdf
+
+mol = mol_display.Molecule()
+mol.parse_bytes(synthetic_sdf.generate(3000, 7).encode())
+_, xyz = mol.atom_arrays()
+grid = mol.grid()
+
+rng = np.random.default_rng(0)
+for _ in range(100):
+    centre, radius = rng.normal(size=3) * 5, rng.uniform(0, 6)
+    expected = np.flatnonzero(((xyz - centre) ** 2).sum(axis=1) <= radius * radius)
+    assert np.array_equal(np.sort(grid.radius(*centre, radius)), expected)
+
+    low = rng.normal(size=3) * 5
+    high = low + rng.uniform(0, 8, 3)
+    expected = np.flatnonzero(((xyz >= low) & (xyz <= high)).all(axis=1))
+    assert np.array_equal(np.sort(grid.box(low, high)), expected)
+
+# Water without its bond block gets its two O-H bonds back
+water = b"""Water
+  test
+
+  3  0  0  0  0  0  0  0  0  0999 V2000
+    2.5369   -0.1550    0.0000 O   0  0  0  0  0  0  0  0  0  0  0  0
+    3.0739    0.1550    0.0000 H   0  0  0  0  0  0  0  0  0  0  0  0
+    2.0000    0.1550    0.0000 H   0  0  0  0  0  0  0  0  0  0  0  0
+M  END
+$$$$
+"""
+mol = mol_display.Molecule()
+mol.parse_bytes(water)
+pairs, epairs = mol.bond_arrays()
+assert pairs.tolist() == [[0, 1], [0, 2]] and epairs.tolist() == [1, 1]
+
+mol = mol_display.Molecule()
+mol.parse_bytes(water, perceive_bonds=False)
+assert mol.bond_no == 0
+
+print("spatial grid ok")
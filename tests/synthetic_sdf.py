@@ -0,0 +1,66 @@
+# Generates synthetic SD records of any size for the benchmarks
+# usage: python tests/synthetic_sdf.py atom_count [seed] > molecule.sdf
+import sys
+import numpy as np
+
+ELEMENTS = ['C', 'H', 'N', 'O']
+ELEMENT_WEIGHTS = [0.60, 0.25, 0.08, 0.07]
+BOND_LENGTH = 1.5
+# Each new atom bonds to one of the previous BRANCH_WINDOW atoms, giving a branched, compact tree
+BRANCH_WINDOW = 8
+DOUBLE_BOND_RATIO = 0.15
+
+def generate(atom_count: int, seed: int=0, name: str=None, version: str=None) -> str:
+    """
+    Returns one SD record of a synthetic molecule with atom_count atoms and atom_count - 1 bonds.
+
+    Atoms are placed by a random walk with bond-length steps, each bonded to one of the last few
+    atoms, so molecules stay roughly spherical and their bonds short, as in real structures. The
+    same arguments always give the same record.
+
+    Args:
+        atom_count (int): The number of atoms.
+        seed (int, optional): The random seed. Defaults to 0.
+        name (str, optional): The molecule name. Defaults to None, which uses "synthetic-<atom_count>".
+        version (str, optional): "V2000" or "V3000". Defaults to None, which uses V2000 when the
+            counts fit in its three-digit fields and V3000 otherwise.
+
+    Returns:
+        str: The record, ending with its '$$$$' delimiter line.
+    """
+    rng = np.random.default_rng(seed)
+    name = name or f"synthetic-{atom_count}"
+    bond_count = max(atom_count - 1, 0)
+    if version is None:
+        version = "V2000" if atom_count <= 999 else "V3000"
+
+    elements = rng.choice(ELEMENTS, atom_count, p=ELEMENT_WEIGHTS)
+    parents = np.maximum(np.arange(atom_count) - rng.integers(1, BRANCH_WINDOW + 1, atom_count), 0)
+    steps = rng.normal(size=(atom_count, 3))
+    steps *= BOND_LENGTH / np.linalg.norm(steps, axis=1, keepdims=True)
+    xyz = np.zeros((atom_count, 3))
+    for i in range(1, atom_count):
+        xyz[i] = xyz[parents[i]] + steps[i]
+    xyz -= xyz.mean(axis=0) if atom_count else 0
+    orders = np.where(rng.random(bond_count) < DOUBLE_BOND_RATIO, 2, 1)
+
+    lines = [name, "  synthetic", ""]
+    if version == "V2000":
+        lines.append(f"{atom_count:3d}{bond_count:3d}  0  0  0  0  0  0  0  0999 V2000")
+        lines += ["%10.4f%10.4f%10.4f %-3s 0  0  0  0  0  0  0  0  0  0  0  0" % (x, y, z, element)
+                  for (x, y, z), element in zip(xyz.tolist(), elements.tolist())]
+        lines += [f"{parents[i] + 1:3d}{i + 1:3d}{orders[i - 1]:3d}  0  0  0  0" for i in range(1, atom_count)]
+    else:
+        lines.append("  0  0  0     0  0            999 V3000")
+        lines += ["M  V30 BEGIN CTAB", f"M  V30 COUNTS {atom_count} {bond_count} 0 0 0", "M  V30 BEGIN ATOM"]
+        lines += ["M  V30 %d %s %.4f %.4f %.4f 0" % (i + 1, element, x, y, z)
+                  for i, ((x, y, z), element) in enumerate(zip(xyz.tolist(), elements.tolist()))]
+        lines += ["M  V30 END ATOM", "M  V30 BEGIN BOND"]
+        lines += [f"M  V30 {i} {orders[i - 1]} {parents[i] + 1} {i + 1}" for i in range(1, atom_count)]
+        lines += ["M  V30 END BOND", "M  V30 END CTAB"]
+    lines += ["M  END", "> <NAME>", name, "", "$$$$"]
+
+    return "\n".join(lines) + "\n"
+
+if __name__ == "__main__":
+    sys.stdout.write(generate(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 0))